@@ -1,371 +1,50 @@
 import os
-import threading
 import time
 import random
-import urllib.request
 import math
-from collections import deque
 import sys
 
 import cv2
+import numpy as np
 import mediapipe as mp
 from mediapipe.tasks import python
 from mediapipe.tasks.python import vision
 
 import arcade
 
+from pose_tracker import MAX_PEOPLE
+from shared_tracker import create_tracker
+from frame_stats import FrameTimeHistogram
+from gestures import GESTURES, POSE_RULES
+from gesture_state import END
+
 ACCURACY = 0.04
 WIDTH, HEIGHT = 1280, 720
 FPS = 60
-MAX_PEOPLE = 5
+# Pontos por segundo de gesto ativo = pontos que antes se somavam por frame, a 60 fps
+SCORE_RATE = FPS
+GESTURE_SCORES = POSE_RULES.scores
+ELEVATE_RIGHT = GESTURES.index("ELEVATE_RIGHT")
+ELEVATE_LEFT = GESTURES.index("ELEVATE_LEFT")
+
+# Modo da cena: 'gestures' (o mundo só avança enquanto há gestos) ou 'energy' (avança ao ritmo do movimento do grupo)
+SCENE_MODES = ('gestures', 'energy')
+SCENE_MODE = os.environ.get('POSE_SCENE_MODE', 'gestures')
+if SCENE_MODE not in SCENE_MODES:
+    raise ValueError(f"Modo de cena desconhecido: {SCENE_MODE} (opções: {', '.join(SCENE_MODES)})")
+# Energia do grupo (soma das pessoas, em troncos por segundo): abaixo de IDLE o mundo está parado,
+# em FULL anda à velocidade normal, e nunca passa de MAX_DRIVE vezes essa velocidade
+ENERGY_IDLE = 0.15
+ENERGY_FULL = 1.5
+ENERGY_MAX_DRIVE = 2.0
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 IMG_DIR = os.path.join(SCRIPT_DIR, "img")
-MODEL_FILE = os.path.join(SCRIPT_DIR, 'pose_landmarker_full.task')
-
-def ensure_model(path: str):
-    if os.path.exists(path):
-        return
-    url = 'https://storage.googleapis.com/mediapipe-models/pose_landmarker/pose_landmarker_full/float16/1/pose_landmarker_full.task'
-    try:
-        urllib.request.urlretrieve(url, path)
-    except Exception as e:
-        raise
-
-def calculate_angle(a, b, c):
-    radians = math.atan2(c[1] - b[1], c[0] - b[0]) - math.atan2(a[1] - b[1], a[0] - b[0])
-    angle = abs(radians * (180 / math.pi))
-    return angle if angle <= 180 else 360 - angle
-
-def detect_gesture(landmarks):
-    LEFT_SHOULDER, RIGHT_SHOULDER = 11, 12
-    LEFT_ELBOW, RIGHT_ELBOW = 13, 14
-    LEFT_WRIST, RIGHT_WRIST = 15, 16
-    LEFT_HIP, RIGHT_HIP = 23, 24
-    LEFT_KNEE, RIGHT_KNEE = 25, 26
-    LEFT_ANKLE, RIGHT_ANKLE = 27, 28
-
-    if len(landmarks) <= RIGHT_WRIST:
-        return None, 0
-    
-    right_shoulder = [landmarks[RIGHT_SHOULDER].x, landmarks[RIGHT_SHOULDER].y]
-    right_elbow = [landmarks[RIGHT_ELBOW].x, landmarks[RIGHT_ELBOW].y]
-    right_wrist = [landmarks[RIGHT_WRIST].x, landmarks[RIGHT_WRIST].y]
-    angle = calculate_angle(right_shoulder, right_elbow, right_wrist)
-    
-    height_diff = right_shoulder[1] - right_wrist[1]
-    if angle > 120 and height_diff > 0.05:
-        return "ELEVATE_RIGHT", 15
-
-    left_shoulder = [landmarks[LEFT_SHOULDER].x, landmarks[LEFT_SHOULDER].y]
-    left_elbow = [landmarks[LEFT_ELBOW].x, landmarks[LEFT_ELBOW].y]
-    left_wrist = [landmarks[LEFT_WRIST].x, landmarks[LEFT_WRIST].y]
-    angle = calculate_angle(left_shoulder, left_elbow, left_wrist)
-    height_diff = left_shoulder[1] - left_wrist[1]
-    if angle > 120 and height_diff > 0.05:
-        return "ELEVATE_LEFT", 15
-
-    angle = calculate_angle(right_shoulder, right_elbow, right_wrist)
-    y_diff = abs(right_wrist[1] - right_shoulder[1])
-    if angle > 160 and y_diff < 0.1:
-        return "T_STOP_RIGHT", 20
-
-    angle = calculate_angle(left_shoulder, left_elbow, left_wrist)
-    y_diff = abs(left_wrist[1] - left_shoulder[1])
-    if angle > 160 and y_diff < 0.1:
-        return "T_STOP_LEFT", 20
-
-    angle = calculate_angle(right_shoulder, right_elbow, right_wrist)
-    height_diff = right_shoulder[1] - right_wrist[1]
-    if 60 < angle < 120 and height_diff > 0.1:
-        return "WAVE_RIGHT", 10
-
-    angle = calculate_angle(left_shoulder, left_elbow, left_wrist)
-    height_diff = left_shoulder[1] - left_wrist[1]
-    if 60 < angle < 120 and height_diff > 0.1:
-        return "WAVE_LEFT", 10
-
-    shoulder_distance = abs(landmarks[LEFT_SHOULDER].x - landmarks[RIGHT_SHOULDER].x)
-    if shoulder_distance < 0.008:
-        return "ROTATION", 25
-
-    right_hip = [landmarks[RIGHT_HIP].x, landmarks[RIGHT_HIP].y]
-    right_knee = [landmarks[RIGHT_KNEE].x, landmarks[RIGHT_KNEE].y]
-    right_ankle = [landmarks[RIGHT_ANKLE].x, landmarks[RIGHT_ANKLE].y]
-    knee_angle = calculate_angle(right_hip, right_knee, right_ankle)
-    if knee_angle < 170:
-        return "MARCH_RIGHT", 15
-
-    left_hip = [landmarks[LEFT_HIP].x, landmarks[LEFT_HIP].y]
-    left_knee = [landmarks[LEFT_KNEE].x, landmarks[LEFT_KNEE].y]
-    left_ankle = [landmarks[LEFT_ANKLE].x, landmarks[LEFT_ANKLE].y]
-    knee_angle = calculate_angle(left_hip, left_knee, left_ankle)
-    if knee_angle < 170:
-        return "MARCH_LEFT", 15
-
-    return None, 0
-
-# ------------------------ POSE TRACKER (THREAD) ------------------------
-class PoseTracker:
-
-    def __init__(self, max_people=MAX_PEOPLE):
-        ensure_model(MODEL_FILE)
-
-        from mediapipe.tasks.python import BaseOptions
-        from mediapipe.tasks.python.vision import PoseLandmarker, PoseLandmarkerOptions, RunningMode
-
-        base_options = BaseOptions(model_asset_path=MODEL_FILE, delegate='GPU')
-        options = PoseLandmarkerOptions(
-            base_options=base_options,
-            running_mode=RunningMode.VIDEO,
-            num_poses=MAX_PEOPLE,
-            min_pose_detection_confidence=0.6,
-            min_pose_presence_confidence=0.6,
-            min_tracking_confidence=0.6,
-        )
-        self.detector = PoseLandmarker.create_from_options(options)
-        
-        self.mp_hands = mp.solutions.hands
-        self.hands_detector = self.mp_hands.Hands(
-            max_num_hands=1,
-            min_detection_confidence=0.7,
-            min_tracking_confidence=0.7
-        )
-
-        self.lock = threading.Lock()
-        self.people = []
-        self.gestures = []
-        self.running = False
-        self.thread = None
-        self.max_people = max_people
-        
-        self.tracks = {}
-        self.next_track_id = 0
-        
-        self.swipe_start_x = None
-        self.swipe_detected = False
-        self.swipe_direction = None
-        self.swipe_threshold = 0.2
-
-    def start(self):
-        if self.running:
-            return
-        self.running = True
-        self.thread = threading.Thread(target=self._capture_loop, daemon=True)
-        self.thread.start()
-
-    def stop(self):
-        self.running = False
-        if self.thread is not None:
-            self.thread.join(timeout=1.0)
-        try:
-            self.detector.close()
-        except Exception:
-            pass
-        try:
-            self.hands_detector.close()
-        except Exception:
-            pass
-
-    def get_smoothed_poses(self):
-        with self.lock:
-            out = []
-            for person in self.people:
-                lm_list = []
-                for p in person:
-                    try:
-                        x, y = p
-                        lm_list.append({'x': x, 'y': y, 'visibility': 1.0})
-                    except Exception:
-                        lm_list.append({'x': 0.0, 'y': 0.0, 'visibility': 0.0})
-                out.append(lm_list)
-            return out
-
-    def get_gestures(self):
-        with self.lock:
-            return list(self.gestures)
-    
-    def get_swipe(self):
-        with self.lock:
-            result = (self.swipe_detected, self.swipe_direction)
-            self.swipe_detected = False
-            self.swipe_direction = None
-            return result
-
-    def _capture_loop(self):
-        cap = None
-        # Tentar múltiplos backends e índices de câmera
-        backends = [
-            (cv2.CAP_DSHOW, "DirectShow"),
-            (cv2.CAP_MSMF, "Media Foundation"),
-            (cv2.CAP_ANY, "Auto")
-        ]
-        camera_indices = [0, 1, 2]
-        
-        for idx in camera_indices:
-            for backend, backend_name in backends:
-                try:
-                    print(f"Tentando câmera {idx} com {backend_name}...")
-                    cap = cv2.VideoCapture(idx, backend)
-                    if cap.isOpened():
-                        ret, frame = cap.read()
-                        if ret and frame is not None:
-                            print(f"✓ Câmera {idx} aberta com {backend_name}")
-                            # Otimizações
-                            cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-                            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-                            cap.set(cv2.CAP_PROP_FPS, 30)
-                            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-                            break
-                        cap.release()
-                except:
-                    continue
-            if cap and cap.isOpened():
-                break
-        
-        if not cap or not cap.isOpened():
-            print("ERRO: Não foi possível abrir a câmera!")
-            self.running = False
-            return
-            
-        print(f"Webcam aberta com sucesso")
-
-        timestamp = 0
-        while self.running:
-            ret, frame = cap.read()
-            if not ret:
-                time.sleep(0.001)   
-                continue
-
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb)
-
-            try:
-                hands_results = self.hands_detector.process(rgb)
-                if hands_results.multi_hand_landmarks:
-                    for hand_landmarks in hands_results.multi_hand_landmarks:
-                        index_tip_x = hand_landmarks.landmark[8].x
-                        
-                        if self.swipe_start_x is None:
-                            self.swipe_start_x = index_tip_x
-                        
-                        diff = index_tip_x - self.swipe_start_x
-                        
-                        if diff > self.swipe_threshold:
-                            with self.lock:
-                                self.swipe_detected = True
-                                self.swipe_direction = 'right'
-                            self.swipe_start_x = index_tip_x
-                        elif diff < -self.swipe_threshold:
-                            with self.lock:
-                                self.swipe_detected = True
-                                self.swipe_direction = 'left'
-                            self.swipe_start_x = index_tip_x
-                else:
-                    self.swipe_start_x = None
-            except Exception:
-                pass
-
-            try:
-                results = self.detector.detect_for_video(mp_image, timestamp)
-            except Exception as e:
-                results = None
-
-            timestamp += 33
-
-            candidates = []
-            if results and results.pose_landmarks:
-                for i, person in enumerate(results.pose_landmarks):
-                    lm_xy = [(lm.x, lm.y) for lm in person]
-                    if lm_xy:
-                        cx = sum(p[0] for p in lm_xy) / len(lm_xy)
-                        cy = sum(p[1] for p in lm_xy) / len(lm_xy)
-                    else:
-                        cx, cy = 0.5, 0.5
-                    
-                    gesture, score = detect_gesture(person)
-                    
-                    candidates.append({
-                        'pose': lm_xy,
-                        'centroid': (cx, cy),
-                        'gesture': (gesture, score)
-                    })
-
-            used_candidates = set()
-            
-            for t_id, track in list(self.tracks.items()):
-                best_idx = -1
-                min_dist = 0.25
-                
-                lcx, lcy = track['last_centroid']
-                
-                for i, cand in enumerate(candidates):
-                    if i in used_candidates:
-                        continue
-                    
-                    dist = math.hypot(cand['centroid'][0] - lcx, cand['centroid'][1] - lcy)
-                    if dist < min_dist:
-                        min_dist = dist
-                        best_idx = i
-                
-                if best_idx != -1:
-                    cand = candidates[best_idx]
-                    track['history'].append(cand['pose'])
-                    track['last_centroid'] = cand['centroid']
-                    track['gesture'] = cand['gesture']
-                    track['missing'] = 0
-                    used_candidates.add(best_idx)
-                else:
-                    track['missing'] += 1
-                    track['gesture'] = (None, 0)
-
-            keys_to_remove = [k for k, v in self.tracks.items() if v['missing'] > 15]
-            for k in keys_to_remove:
-                del self.tracks[k]
-
-            for i, cand in enumerate(candidates):
-                if i not in used_candidates:
-                    if len(self.tracks) < self.max_people:
-                        t_id = self.next_track_id
-                        self.next_track_id += 1
-                        q = deque(maxlen=5)
-                        q.append(cand['pose'])
-                        self.tracks[t_id] = {
-                            'history': q,
-                            'last_centroid': cand['centroid'],
-                            'gesture': cand['gesture'],
-                            'missing': 0
-                        }
-
-            sorted_tracks = sorted(self.tracks.values(), key=lambda t: t['last_centroid'][0])
-            
-            new_people = []
-            new_gestures = []
-
-            for track in sorted_tracks:
-                hist = track['history']
-                if not hist:
-                    continue
-                
-                smoothed_lm = []
-                num_frames = len(hist)
-                if num_frames > 0:
-                    first_pose = hist[0]
-                    num_points = len(first_pose)
-                    for j in range(num_points):
-                        avg_x = sum(h[j][0] for h in hist) / num_frames
-                        avg_y = sum(h[j][1] for h in hist) / num_frames
-                        smoothed_lm.append((avg_x, avg_y))
-                    new_people.append(smoothed_lm)
-                    new_gestures.append(track['gesture'])
-
-            with self.lock:
-                self.people = new_people
-                self.gestures = new_gestures
-
-            time.sleep(0.005)
-
-        cap.release()
+# Definir POSE_RECORD=caminho.npz grava os landmarks brutos (ver filters.py para comparar filtros)
+# Definir POSE_PROCESS=1 corre o tracker num processo à parte (ver shared_tracker.py)
+# Definir POSE_GESTURE_MODEL=modelo.npz usa o classificador treinado em vez das regras (ver gesture_model.py)
+# Definir POSE_MOTION_TEMPLATES=modelos.npz reconhece acenos e marchas pelo movimento (ver motion.py)
+# Definir POSE_SCENE_MODE=energy faz o mundo avançar com a energia do movimento em vez de só com gestos
 
 def load_texture_safe(path):
     if os.path.exists(path):
@@ -516,55 +195,31 @@ def get_grid_boxes(grid_x0, grid_y0, grid_width, grid_height):
     return boxes
 
 
-def normalize_points_to_box(points, box):
-    if not points:
+def normalize_points_to_box(points, box, mask=None):
+    points = np.asarray(points, dtype=np.float64)
+    if not len(points):
         return []
     
     x1, y1, x2, y2 = box
     box_w = x2 - x1
     box_h = y2 - y1
     
-
-    min_x = min(p[0] for p in points)
-    max_x = max(p[0] for p in points)
-    min_y = min(p[1] for p in points)
-    max_y = max(p[1] for p in points)
+    xy = points[:, :2]
+    # O enquadramento ignora landmarks pouco confiáveis (ex.: pernas fora da imagem)
+    ref = xy[mask] if mask is not None and mask.any() else xy
+    min_xy = ref.min(axis=0)
+    max_xy = ref.max(axis=0)
+
+    body_w, body_h = np.maximum(max_xy - min_xy, 0.01)
+    scale = min((box_w * 0.9) / body_w, (box_h * 0.9) / body_h)
     
-
-    body_w = max_x - min_x
-    body_h = max_y - min_y
+    center = (min_xy + max_xy) / 2
+    rel = (xy - center) * scale
     
-
-    if body_w < 0.01:
-        body_w = 0.01
-    if body_h < 0.01:
-        body_h = 0.01
-    
-  
-    scale_x = (box_w * 0.9) / body_w
-    scale_y = (box_h * 0.9) / body_h
-    scale = min(scale_x, scale_y)  
-    
-    
-    center_x = (min_x + max_x) / 2
-    center_y = (min_y + max_y) / 2
-    
-   
-    box_center_x = x1 + box_w / 2
-    box_center_y = y1 + box_h / 2
-    
-    fixed_points = []
-    for (x, y) in points:
-        
-        rel_x = (x - center_x) * scale
-        rel_y = (y - center_y) * scale
-        
-        
-        nx = box_center_x + rel_x
-        ny = box_center_y - rel_y
-        
-        fixed_points.append((nx, ny))
-    return fixed_points
+    fixed = np.empty_like(rel)
+    fixed[:, 0] = x1 + box_w / 2 + rel[:, 0]
+    fixed[:, 1] = y1 + box_h / 2 - rel[:, 1]
+    return fixed.tolist()
 
 
 def apply_points_to_scene(self, score):
@@ -590,10 +245,9 @@ def apply_points_to_scene(self, score):
 
 def on_update(self, delta_time: float):
    
-    with self.pose.lock:
-        people = list(self.pose.people)
+    people = self.pose.get_snapshot().poses
 
-    if people:
+    if len(people):
         
         first_person_points = people[0]
         self.apply_points_to_scene(first_person_points)
@@ -660,15 +314,26 @@ class PerspectivaWindow(arcade.Window):
         self.update_background_sprite()
 
        
-        self.pose = PoseTracker(max_people=MAX_PEOPLE)
+        self.pose = create_tracker(max_people=MAX_PEOPLE, smoothing_preset='gesture',
+                                   record_path=os.environ.get('POSE_RECORD'),
+                                   gesture_model=os.environ.get('POSE_GESTURE_MODEL'),
+                                   motion_templates=os.environ.get('POSE_MOTION_TEMPLATES'))
         self.pose.start()
+        self.pose_stopped = False
+        # Eventos de gestos, lidos sem perdas ao ritmo da janela
+        self.gesture_events = self.pose.subscribe()
+        # Tempos entre frames da janela; o resumo é impresso ao fechar
+        self.frame_times = FrameTimeHistogram('processo' if os.environ.get('POSE_PROCESS') == '1' else 'thread')
 
        
         self.accuracy = ACCURACY
         self.total_score = 0
+        self.score_accum = 0.0
 
         
         self.recent_score = 0
+        # Ritmo do mundo (1 = velocidade normal): velocidade dos elementos e frequência com que aparecem
+        self.world_drive = 0.0
         
  
         self.dev_mode = False
@@ -722,8 +387,12 @@ class PerspectivaWindow(arcade.Window):
         self.fps = 0
 
         
-        self.person_assignments = {} 
-        self.next_person_id = 0
+        # track_id -> índice da caixa
+        self.person_assignments = {}
+        self.assigned_boxes = {}
+        self.assignment_key = None
+        self.box_last_seen = {}
+        self.box_hold_time = self.pose.reid_ttl + 1.0
 
         
         try:
@@ -878,10 +547,6 @@ class PerspectivaWindow(arcade.Window):
         self.elemento_fixo.draw()
 
 
-        with self.pose.lock:
-            people = list(self.pose.people)
-
-       
         grid_width  = self.width * 0.9
         grid_height = self.height * 0.4
         grid_x0 = (self.width - grid_width) / 2
@@ -905,22 +570,29 @@ class PerspectivaWindow(arcade.Window):
                                             color=arcade.color.RED, border_width=2)
 
         
-        with self.pose.lock:
-            people = list(self.pose.people)
-            gestures = list(self.pose.gestures)
-
+        snapshot = self.pose.get_snapshot()
+        # Esqueletos extrapolados para o instante do desenho (compensa a latência da inferência)
+        people = self.pose.predict(snapshot)
+        confident = snapshot.confident()
+        gestures = snapshot.gestures
 
-        assigned_boxes = self.assign_people_to_boxes(people, boxes)
+        # A atribuição só muda quando o tracker publica um frame novo
+        assign_key = (snapshot.version, len(boxes))
+        if assign_key != self.assignment_key:
+            self.assigned_boxes = self.assign_people_to_boxes(snapshot.track_ids.tolist(), people, boxes)
+            self.assignment_key = assign_key
+        assigned_boxes = self.assigned_boxes
 
         for person_idx, box_idx in assigned_boxes.items():
             if person_idx >= len(people) or box_idx >= len(boxes):
                 continue
             person = people[person_idx]
             box = boxes[box_idx]
-            adjusted = normalize_points_to_box(person, box)
+            mask = confident[person_idx]
+            adjusted = normalize_points_to_box(person, box, mask)
             gesture, score = gestures[person_idx] if person_idx < len(gestures) else (None, 0)
             color = arcade.color.GREEN if gesture else arcade.color.RED
-            self.draw_skeleton(adjusted, color=color)
+            self.draw_skeleton(adjusted, color=color, mask=mask.tolist())
             
             
             if gesture:
@@ -1023,68 +695,49 @@ class PerspectivaWindow(arcade.Window):
                 bold=True
             )
 
-    def assign_people_to_boxes(self, people, boxes):
-        """Atribui pessoas a caixas de forma estável, evitando saltos entre retângulos."""
-        if not people:
-            return {}
-        
-        person_centers = []
-        for person in people:
+    def assign_people_to_boxes(self, track_ids, people, boxes):
+        """Atribui cada track a uma caixa fixa; só as tracks novas procuram caixa."""
+        now = time.time()
+        n = min(len(track_ids), len(people))
+        index_of = {track_ids[i]: i for i in range(n)}
+        for t_id in index_of:
+            self.box_last_seen[t_id] = now
+
+        # A caixa de quem desapareceu fica reservada enquanto o tracker pode recuperar o id (re-ID)
+        self.person_assignments = {t_id: b_idx for t_id, b_idx in self.person_assignments.items()
+                                   if b_idx < len(boxes) and now - self.box_last_seen.get(t_id, 0) <= self.box_hold_time}
+        self.box_last_seen = {t_id: t for t_id, t in self.box_last_seen.items() if t_id in self.person_assignments or t_id in index_of}
+        used_boxes = set(self.person_assignments.values())
+
+        for t_id, p_idx in index_of.items():
+            if t_id in self.person_assignments:
+                continue
+            person = people[p_idx]
             if len(person) > 0:
-                avg_x = sum(p[0] for p in person) / len(person)
-                avg_y = sum(p[1] for p in person) / len(person)
-                person_centers.append((avg_x, avg_y))
+                px, py = np.mean(person, axis=0)[:2]
             else:
-                person_centers.append((0.5, 0.5))
-        
-        box_centers = []
-        for box in boxes:
-            x1, y1, x2, y2 = box
-            center_x = (x1 + x2) / (2 * self.width)
-            center_y = (y1 + y2) / (2 * self.height)
-            box_centers.append((center_x, center_y))
-        
-
-        distances = {}
-        for p_idx, p_center in enumerate(person_centers):
-            for b_idx, b_center in enumerate(box_centers):
-                dx = p_center[0] - b_center[0]
-                dy = p_center[1] - b_center[1]
-                dist = (dx * dx + dy * dy) ** 0.5
-                distances[(p_idx, b_idx)] = dist
-        
-        assigned_boxes = {}
-        used_boxes = set()
-        
-        for person_id, prev_box_idx in list(self.person_assignments.items()):
-            if person_id < len(people) and prev_box_idx < len(boxes):
-                if prev_box_idx not in used_boxes:
-                    
-                    if (person_id, prev_box_idx) in distances and distances[(person_id, prev_box_idx)] < 0.3:
-                        assigned_boxes[person_id] = prev_box_idx
-                        used_boxes.add(prev_box_idx)
-        
-       
-        for p_idx in range(len(people)):
-            if p_idx not in assigned_boxes:
-                best_box = None
-                best_dist = float('inf')
-                for b_idx in range(len(boxes)):
-                    if b_idx not in used_boxes:
-                        dist = distances.get((p_idx, b_idx), float('inf'))
-                        if dist < best_dist:
-                            best_dist = dist
-                            best_box = b_idx
-                if best_box is not None:
-                    assigned_boxes[p_idx] = best_box
-                    used_boxes.add(best_box)
-        
-        self.person_assignments = assigned_boxes.copy()
-        
-        return assigned_boxes
-
-    def draw_skeleton(self, person, color=arcade.color.RED):
+                px, py = 0.5, 0.5
+            best_box = None
+            best_dist = float('inf')
+            for b_idx, (x1, y1, x2, y2) in enumerate(boxes):
+                if b_idx in used_boxes:
+                    continue
+                dx = px - (x1 + x2) / (2 * self.width)
+                dy = py - (y1 + y2) / (2 * self.height)
+                dist = dx * dx + dy * dy
+                if dist < best_dist:
+                    best_dist = dist
+                    best_box = b_idx
+            if best_box is not None:
+                self.person_assignments[t_id] = best_box
+                used_boxes.add(best_box)
+
+        return {index_of[t_id]: b_idx for t_id, b_idx in self.person_assignments.items() if t_id in index_of}
+
+    def draw_skeleton(self, person, color=arcade.color.RED, mask=None):
         connections = mp.solutions.pose.POSE_CONNECTIONS
+        if mask is None:
+            mask = [True] * len(person)
 
         for a, b in connections:
             try:
@@ -1092,16 +745,21 @@ class PerspectivaWindow(arcade.Window):
                 p2 = person[b]
             except Exception:
                 continue
+            if not (mask[a] and mask[b]):
+                continue
             x1, y1 = p1
             x2, y2 = p2
             arcade.draw_line(x1, y1, x2, y2, color, 2)
 
     
-        for x, y in person:
+        for (x, y), ok in zip(person, mask):
+            if not ok:
+                continue
             arcade.draw_circle_filled(x, y, 4, arcade.color.BLACK)
             arcade.draw_circle_outline(x, y, 4, color, 1)
 
     def on_update(self, delta_time: float):
+        self.frame_times.add(delta_time)
 
         if self.show_wave_intro:
             self.wave_intro_time += delta_time
@@ -1112,28 +770,42 @@ class PerspectivaWindow(arcade.Window):
             return
         
         
-        with self.pose.lock:
-            people = list(self.pose.people)
-            gestures = list(self.pose.gestures)
+        snapshot = self.pose.get_snapshot()
+        active = snapshot.gesture_active
 
-        
-        self.recent_score = 0
-        for gesture, score in gestures:
-            if gesture:
-                self.total_score += score
-                self.accuracy = min(1.0, self.accuracy + score * 0.01)
-                self.recent_score += score 
+        # Cada pessoa pontua pelo seu gesto ativo de maior prioridade, proporcionalmente ao tempo
+        # (o estado já passou pela histerese do tracker, por isso não depende do fps nem pisca)
+        scoring = active.any(axis=1)
+        scores = GESTURE_SCORES[active.argmax(axis=1)[scoring]]
+        self.recent_score = int(scores.sum())
+        self.score_accum += self.recent_score * SCORE_RATE * delta_time
+        gained = int(self.score_accum)
+        self.score_accum -= gained
+        self.total_score += gained
+
+        if SCENE_MODE == 'energy':
+            group_energy = float(snapshot.energy.sum())
+            self.world_drive = min(ENERGY_MAX_DRIVE, max(0.0, (group_energy - ENERGY_IDLE) / (ENERGY_FULL - ENERGY_IDLE)))
+        else:
+            self.world_drive = 1.0 if self.recent_score > 0 else 0.0
+        if self.dev_mode:
+            self.world_drive = max(self.world_drive, 1.0)
+        engaged = self.recent_score > 0 or (SCENE_MODE == 'energy' and self.world_drive > 0)
+
+        # A precisão sobe a cada início (ou repetição) de um gesto, não a cada frame
+        for event in self.gesture_events.drain():
+            if event.gesture in GESTURES and event.kind != END:
+                self.accuracy = min(1.0, self.accuracy + event.score * 0.01)
         
        
-        EXIT_SCORE_THRESHOLD = 8  
         EXIT_HOLD_TIME = 5.0
         EXIT_DROP_TOLERANCE = 1.0  
         GESTURE_WINDOW = 0.5  
         if not hasattr(self, "exit_gesture_drop_time"):
             self.exit_gesture_drop_time = 0.0
         current_time = time.time()
-        elevate_right = any(gesture == "ELEVATE_RIGHT" and score >= EXIT_SCORE_THRESHOLD for gesture, score in gestures)
-        elevate_left = any(gesture == "ELEVATE_LEFT" and score >= EXIT_SCORE_THRESHOLD for gesture, score in gestures)
+        elevate_right = bool(active[:, ELEVATE_RIGHT].any())
+        elevate_left = bool(active[:, ELEVATE_LEFT].any())
         if elevate_right:
             self.last_elevate_right_time = current_time
         if elevate_left:
@@ -1145,7 +817,7 @@ class PerspectivaWindow(arcade.Window):
             self.exit_gesture_time += delta_time
             self.exit_gesture_drop_time = 0.0
             if self.exit_gesture_time >= EXIT_HOLD_TIME:
-                self.pose.stop()
+                self.stop_pose()
                 arcade.close_window()
         elif self.exit_gesture_active:
             
@@ -1173,7 +845,7 @@ class PerspectivaWindow(arcade.Window):
         if self.message_display_time > 0:
             self.message_display_time -= delta_time
         
-        if self.recent_score > 0:
+        if engaged:
             self.time_without_score = 0
             self.show_gesture_tips = False
             self.inactive_tip_time = 0.0
@@ -1195,8 +867,10 @@ class PerspectivaWindow(arcade.Window):
             else:
                 self.show_gesture_tips = False
 
-        if self.recent_score > 0 or self.dev_mode:
-            dt_ms = delta_time * 1000
+        if self.world_drive > 0:
+            # O mundo corre num tempo próprio: tudo o que avança e aparece escala com world_drive
+            world_dt = delta_time * self.world_drive
+            dt_ms = world_dt * 1000
 
             if self.block_left_remaining > 0:
                 self.block_left_remaining = max(0, self.block_left_remaining - dt_ms)
@@ -1253,8 +927,8 @@ class PerspectivaWindow(arcade.Window):
                     self.last_spawn_right = 0
 
             for elemento in self.elementos:
-                elemento.update(delta_time)
-            self.elemento_fixo.update(delta_time)
+                elemento.update(world_dt)
+            self.elemento_fixo.update(world_dt)
         
         for bird in self.birds:
             bird.update(delta_time)
@@ -1284,17 +958,24 @@ class PerspectivaWindow(arcade.Window):
     def on_key_press(self, symbol: int, modifiers: int):
         if symbol == arcade.key.ESCAPE:
             
-            self.pose.stop()
+            self.stop_pose()
             arcade.close_window()
         elif symbol == arcade.key.K:
             
             self.dev_mode = not self.dev_mode
             status = "ATIVADO" if self.dev_mode else "DESATIVADO"
             
+    def stop_pose(self):
+        if self.pose_stopped:
+            return
+        self.pose_stopped = True
+        self.pose.stop()
+        print(self.frame_times.report())
+
     def on_close(self):
         
         try:
-            self.pose.stop()
+            self.stop_pose()
         except Exception:
             pass
         super().on_close()
@@ -0,0 +1,79 @@
+from collections import deque
+
+from gesture_state import GestureEvent
+
+# Swipes da mão seguem pelo mesmo canal que os gestos, com kind=SWIPE
+SWIPE = 'swipe'
+SWIPE_LEFT, SWIPE_RIGHT = 'SWIPE_LEFT', 'SWIPE_RIGHT'
+
+
+class EventQueue:
+    """Fila limitada de um consumidor (uma janela, por exemplo).
+
+    O produtor só faz append e o consumidor só faz popleft, duas operações atómicas do deque,
+    por isso nenhum dos lados precisa de lock. Com a fila cheia o evento novo não entra e conta
+    em `dropped`; os que já lá estão continuam por ordem e sem buracos.
+    """
+
+    def __init__(self, capacity=256, pump=None):
+        self.items = deque()
+        self.capacity = capacity
+        self.dropped = 0
+        self.last_seq = 0
+        # Chamado antes de cada drain (o SharedPoseTracker usa-o para trazer os eventos do outro processo)
+        self.pump = pump
+
+    def __len__(self):
+        return len(self.items)
+
+    def put(self, event):
+        if len(self.items) >= self.capacity:
+            self.dropped += 1
+            return
+        self.items.append(event)
+
+    def drain(self, max_items=None):
+        """Tira os eventos pendentes por ordem de seq (todos, ou no máximo max_items)."""
+        if self.pump is not None:
+            self.pump()
+        out = []
+        while self.items and (max_items is None or len(out) < max_items):
+            out.append(self.items.popleft())
+        if out:
+            self.last_seq = out[-1].seq
+        return out
+
+
+class EventBus:
+    """Um produtor, várias filas: numera os eventos e entrega-os a todas as filas subscritas.
+
+    Guarda também os últimos `recent` eventos, que seguem em cada snapshot.
+    """
+
+    def __init__(self, recent=64):
+        self.seq = 0
+        self.queues = []
+        self.recent = deque(maxlen=recent)
+
+    def subscribe(self, capacity=256, pump=None):
+        queue = EventQueue(capacity, pump)
+        # Lista nova em vez de append, para o produtor poder percorrer a antiga sem lock
+        self.queues = self.queues + [queue]
+        return queue
+
+    def unsubscribe(self, queue):
+        self.queues = [q for q in self.queues if q is not queue]
+
+    def emit(self, time, track_id, name, kind, score=0):
+        """Cria e publica um evento com o próximo seq."""
+        self.seq += 1
+        event = GestureEvent(self.seq, time, track_id, name, kind, score)
+        self.publish(event)
+        return event
+
+    def publish(self, event):
+        """Publica um evento já numerado (seq tem de ser crescente)."""
+        self.seq = max(self.seq, event.seq)
+        self.recent.append(event)
+        for queue in self.queues:
+            queue.put(event)
@@ -0,0 +1,256 @@
+import math
+import sys
+
+import numpy as np
+
+# Parâmetros por caso de uso. As coordenadas são normalizadas (0..1) e o tempo
+# em segundos, por isso beta é bem maior do que nos exemplos em píxeis.
+FILTER_PRESETS = {
+    'one_euro': {
+        'lobby': {'min_cutoff': 0.5, 'beta': 2.0, 'd_cutoff': 1.0},
+        'gesture': {'min_cutoff': 1.5, 'beta': 15.0, 'd_cutoff': 1.0},
+    },
+    'kalman': {
+        'lobby': {'process_noise': 0.5, 'measurement_noise': 2e-4},
+        'gesture': {'process_noise': 20.0, 'measurement_noise': 1e-4},
+    },
+    'box': {
+        'lobby': {'window': 5},
+        'gesture': {'window': 2},
+    },
+}
+
+
+class LandmarkFilter:
+    """Banco de filtros com estado em arrays (tracks, landmarks, canais).
+
+    Cada track ocupa um slot; update() filtra todos os slots pedidos de uma vez.
+    """
+
+    def __init__(self, max_tracks, num_landmarks=33, channels=2):
+        self.shape = (max_tracks, num_landmarks, channels)
+        self.x = np.zeros(self.shape)
+        self.dx = np.zeros(self.shape)
+        self.last_t = np.zeros(max_tracks)
+
+    def reset(self, slot, x, t):
+        self.x[slot] = x
+        self.dx[slot] = 0.0
+        self.last_t[slot] = t
+
+    def update(self, slots, x, t):
+        raise NotImplementedError
+
+    def velocity(self, slots):
+        return self.dx[slots]
+
+    def _dt(self, slots, t):
+        dt = np.maximum(t - self.last_t[slots], 1e-3)
+        self.last_t[slots] = t
+        return dt[:, None, None]
+
+
+class OneEuroFilter(LandmarkFilter):
+
+    def __init__(self, max_tracks, num_landmarks=33, channels=2, min_cutoff=1.0, beta=0.0, d_cutoff=1.0):
+        super().__init__(max_tracks, num_landmarks, channels)
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def update(self, slots, x, t):
+        slots = np.asarray(slots, dtype=np.intp)
+        dt = self._dt(slots, t)
+        prev = self.x[slots]
+
+        a_d = self._alpha(self.d_cutoff, dt)
+        dx = a_d * (x - prev) / dt + (1 - a_d) * self.dx[slots]
+
+        cutoff = self.min_cutoff + self.beta * np.abs(dx)
+        a = self._alpha(cutoff, dt)
+        out = a * x + (1 - a) * prev
+
+        self.x[slots] = out
+        self.dx[slots] = dx
+        return out
+
+
+class KalmanFilter(LandmarkFilter):
+    """Velocidade constante por coordenada, com covariância 2x2 guardada em três arrays."""
+
+    def __init__(self, max_tracks, num_landmarks=33, channels=2, process_noise=1.0, measurement_noise=1e-4):
+        super().__init__(max_tracks, num_landmarks, channels)
+        self.q = process_noise
+        self.r = measurement_noise
+        self.p00 = np.zeros(self.shape)
+        self.p01 = np.zeros(self.shape)
+        self.p11 = np.zeros(self.shape)
+
+    def reset(self, slot, x, t):
+        super().reset(slot, x, t)
+        self.p00[slot] = self.r
+        self.p01[slot] = 0.0
+        self.p11[slot] = 1.0
+
+    def update(self, slots, x, t):
+        slots = np.asarray(slots, dtype=np.intp)
+        dt = self._dt(slots, t)
+        q = self.q
+
+        # Predição
+        px = self.x[slots] + self.dx[slots] * dt
+        pv = self.dx[slots]
+        p00 = self.p00[slots] + dt * (2 * self.p01[slots] + dt * self.p11[slots]) + q * dt ** 3 / 3
+        p01 = self.p01[slots] + dt * self.p11[slots] + q * dt ** 2 / 2
+        p11 = self.p11[slots] + q * dt
+
+        # Correção
+        s = p00 + self.r
+        k0 = p00 / s
+        k1 = p01 / s
+        innov = x - px
+        out = px + k0 * innov
+
+        self.x[slots] = out
+        self.dx[slots] = pv + k1 * innov
+        self.p00[slots] = (1 - k0) * p00
+        self.p01[slots] = (1 - k0) * p01
+        self.p11[slots] = p11 - k1 * p01
+        return out
+
+
+class BoxFilter(LandmarkFilter):
+    """Média das últimas N amostras (o comportamento antigo do PoseTracker)."""
+
+    def __init__(self, max_tracks, num_landmarks=33, channels=2, window=5):
+        super().__init__(max_tracks, num_landmarks, channels)
+        self.window = window
+        self.buffer = np.zeros((max_tracks, window) + self.shape[1:])
+        self.count = np.zeros(max_tracks, dtype=np.intp)
+        self.head = np.zeros(max_tracks, dtype=np.intp)
+
+    def reset(self, slot, x, t):
+        super().reset(slot, x, t)
+        self.buffer[slot] = x
+        self.count[slot] = 1
+        self.head[slot] = 1 % self.window
+
+    def update(self, slots, x, t):
+        slots = np.asarray(slots, dtype=np.intp)
+        dt = self._dt(slots, t)
+        prev = self.x[slots]
+        self.buffer[slots, self.head[slots]] = x
+        self.head[slots] = (self.head[slots] + 1) % self.window
+        self.count[slots] = np.minimum(self.count[slots] + 1, self.window)
+
+        n = self.count[slots]
+        valid = np.arange(self.window)[None, :] < n[:, None]
+        # Enquanto o buffer não enche, as posições vazias ficam fora da média
+        out = (self.buffer[slots] * valid[:, :, None, None]).sum(axis=1) / n[:, None, None]
+
+        self.x[slots] = out
+        self.dx[slots] = (out - prev) / dt
+        return out
+
+
+FILTERS = {
+    'one_euro': OneEuroFilter,
+    'kalman': KalmanFilter,
+    'box': BoxFilter,
+}
+
+
+def make_filter(kind, max_tracks, preset='gesture', num_landmarks=33, channels=2, **overrides):
+    if kind not in FILTERS:
+        raise ValueError(f"Filtro desconhecido: {kind} (opções: {', '.join(FILTERS)})")
+    params = dict(FILTER_PRESETS[kind].get(preset, {}))
+    params.update(overrides)
+    return FILTERS[kind](max_tracks, num_landmarks, channels, **params)
+
+
+def extrapolate(poses, velocities, ages, horizon=0.1, max_offset=0.05):
+    """Projeta poses (P, L, C) para a frente pela idade de cada uma (P,), em segundos.
+
+    A idade é limitada a `horizon` e o deslocamento de cada landmark a `max_offset`,
+    para que tracks paradas ou perdidas não saiam disparadas.
+    """
+    dt = np.clip(np.asarray(ages, dtype=np.float64), 0.0, horizon)[:, None, None]
+    offset = np.clip(velocities * dt, -max_offset, max_offset)
+    return poses + offset
+
+
+# ------------------------ AVALIAÇÃO OFFLINE ------------------------
+
+def jitter(seq):
+    """RMS da segunda diferença (aceleração por frame) em unidades normalizadas."""
+    if len(seq) < 3:
+        return 0.0
+    acc = seq[2:] - 2 * seq[1:-1] + seq[:-2]
+    return float(np.sqrt(np.mean(acc ** 2)))
+
+
+def lag_frames(raw, filtered, max_lag=15):
+    """Atraso (em frames) que melhor alinha a saída filtrada com o sinal bruto."""
+    best_k, best_err = 0, float('inf')
+    for k in range(min(max_lag, len(raw) - 1) + 1):
+        err = np.mean((filtered[k:] - raw[:len(raw) - k]) ** 2)
+        if err < best_err:
+            best_k, best_err = k, err
+    return best_k
+
+
+def run_filter(filt, times, poses):
+    filt.reset(0, poses[0], times[0])
+    out = np.empty_like(poses)
+    out[0] = poses[0]
+    slot = np.zeros(1, dtype=np.intp)
+    for i in range(1, len(poses)):
+        out[i] = filt.update(slot, poses[i][None], times[i])[0]
+    return out
+
+
+def compare_filters(session, kinds=None, presets=('lobby', 'gesture'), min_frames=30):
+    """Compara jitter e atraso de cada filtro/preset nas tracks de uma sessão gravada."""
+    kinds = kinds or list(FILTERS)
+    rows = []
+    for kind in kinds:
+        for preset in presets:
+            jit, lags = [], []
+            for times, poses in session.values():
+                if len(poses) < min_frames:
+                    continue
+                xy = poses[:, :, :2]
+                filt = make_filter(kind, 1, preset, num_landmarks=xy.shape[1], channels=2)
+                out = run_filter(filt, times, xy)
+                frame_ms = float(np.median(np.diff(times))) * 1000
+                jit.append(jitter(out))
+                lags.append(lag_frames(xy, out) * frame_ms)
+            if jit:
+                rows.append({'filter': kind, 'preset': preset,
+                             'jitter': float(np.mean(jit)), 'lag_ms': float(np.mean(lags))})
+    raw = [jitter(poses[:, :, :2]) for _, poses in session.values() if len(poses) >= min_frames]
+    if raw:
+        rows.insert(0, {'filter': 'raw', 'preset': '-', 'jitter': float(np.mean(raw)), 'lag_ms': 0.0})
+    return rows
+
+
+def main():
+    from sessions import load_session
+
+    if len(sys.argv) < 2:
+        print("Uso: python filters.py <sessao.npz> [...]")
+        return
+    for path in sys.argv[1:]:
+        print(f"\n{path}")
+        print(f"{'filtro':<10} {'preset':<8} {'jitter':>10} {'atraso (ms)':>12}")
+        for row in compare_filters(load_session(path)):
+            print(f"{row['filter']:<10} {row['preset']:<8} {row['jitter']:>10.5f} {row['lag_ms']:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
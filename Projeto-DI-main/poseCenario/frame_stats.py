@@ -0,0 +1,45 @@
+import numpy as np
+
+# Limites dos baldes em ms (16.7 = 60 fps, 33.3 = 30 fps)
+BUCKETS_MS = (4, 8, 12, 16.7, 20, 25, 33.3, 50, 100)
+
+
+class FrameTimeHistogram:
+    """Histograma dos tempos entre frames, para comparar o modo thread com o modo processo."""
+
+    def __init__(self, label, buckets_ms=BUCKETS_MS, max_samples=20000):
+        self.label = label
+        self.edges = np.asarray(buckets_ms, dtype=np.float64)
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.int64)
+        self.samples = np.zeros(max_samples)
+        self.n = 0
+
+    def add(self, dt):
+        ms = dt * 1000.0
+        self.counts[np.searchsorted(self.edges, ms)] += 1
+        self.samples[self.n % len(self.samples)] = ms
+        self.n += 1
+
+    def percentiles(self, q=(50, 95, 99)):
+        if not self.n:
+            return {p: 0.0 for p in q}
+        values = self.samples[:min(self.n, len(self.samples))]
+        return dict(zip(q, np.percentile(values, q).tolist()))
+
+    def report(self):
+        if not self.n:
+            return f"[{self.label}] sem frames"
+        pct = self.percentiles()
+        values = self.samples[:min(self.n, len(self.samples))]
+        lines = [f"[{self.label}] {self.n} frames  p50={pct[50]:.1f}ms  p95={pct[95]:.1f}ms  "
+                 f"p99={pct[99]:.1f}ms  max={values.max():.1f}ms"]
+        total = self.counts.sum()
+        lows = (0.0,) + tuple(self.edges)
+        highs = tuple(self.edges) + (float('inf'),)
+        for low, high, count in zip(lows, highs, self.counts):
+            if not count:
+                continue
+            bar = '#' * int(round(40 * count / total))
+            upper = f"{high:>6.1f}" if np.isfinite(high) else '   inf'
+            lines.append(f"  {low:>6.1f} - {upper} ms {count:>7} {bar}")
+        return '\n'.join(lines)
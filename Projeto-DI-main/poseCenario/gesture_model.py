@@ -0,0 +1,197 @@
+import sys
+import time
+
+import numpy as np
+
+from gestures import GESTURES, POSE_RULES, score_gestures
+from sessions import load_session
+
+# Classe para "nenhum gesto" (o código -1 do classificador por regras)
+NONE = 'NONE'
+# Só tronco, braços e pernas (sem cara nem dedos)
+BODY = np.arange(11, 29)
+L_SHOULDER, R_SHOULDER, L_HIP, R_HIP = 11, 12, 23, 24
+
+
+def normalise_poses(poses):
+    """(P, 33, C) -> (P, 36): x, y do corpo relativos ao meio da anca, em comprimentos de tronco.
+
+    Assim o modelo não depende de onde a pessoa está na imagem nem da distância à câmara.
+    """
+    xy = np.asarray(poses, dtype=np.float64)[:, :, :2]
+    hip = (xy[:, L_HIP] + xy[:, R_HIP]) / 2
+    shoulder = (xy[:, L_SHOULDER] + xy[:, R_SHOULDER]) / 2
+    torso = np.maximum(np.hypot(*(shoulder - hip).T), 1e-3)
+    body = (xy[:, BODY] - hip[:, None]) / torso[:, None, None]
+    return body.reshape(len(xy), -1)
+
+
+class GestureModel:
+    """MLP pequena em NumPy (uma camada escondida, ReLU, softmax) treinada em sessões gravadas.
+
+    score() devolve o mesmo que gestures.score_gestures, por isso pode substituir as regras no PoseTracker.
+    """
+
+    def __init__(self, classes, w1, b1, w2, b2, mean, std, threshold=0.5):
+        self.classes = list(classes)
+        self.w1, self.b1, self.w2, self.b2 = w1, b1, w2, b2
+        self.mean, self.std = mean, std
+        self.threshold = threshold
+        unknown = [c for c in self.classes if c != NONE and c not in GESTURES]
+        if unknown:
+            raise ValueError(f"Gestos desconhecidos no modelo: {', '.join(unknown)}")
+        # Índice em GESTURES de cada classe (-1 para NONE)
+        self.gesture_index = np.array([GESTURES.index(c) if c in GESTURES else -1 for c in self.classes])
+
+    def predict_proba(self, poses):
+        x = (normalise_poses(poses) - self.mean) / self.std
+        h = np.maximum(x @ self.w1 + self.b1, 0.0)
+        z = h @ self.w2 + self.b2
+        z -= z.max(axis=1, keepdims=True)
+        e = np.exp(z)
+        return e / e.sum(axis=1, keepdims=True)
+
+    def score(self, poses):
+        """(códigos (P,), pontos (P,), vetores (P, len(GESTURES))), como gestures.score_gestures."""
+        n = len(poses)
+        vectors = np.zeros((n, len(GESTURES)), dtype=np.int64)
+        if n == 0:
+            return np.full(0, -1, dtype=np.int64), np.zeros(0, dtype=np.int64), vectors
+        proba = self.predict_proba(poses)
+        best = proba.argmax(axis=1)
+        codes = np.where(proba[np.arange(n), best] >= self.threshold, self.gesture_index[best], -1)
+        known = self.gesture_index >= 0
+        gestures = self.gesture_index[known]
+        vectors[:, gestures] = (proba[:, known] >= self.threshold) * POSE_RULES.scores[gestures]
+        return codes, np.where(codes >= 0, POSE_RULES.scores[codes], 0), vectors
+
+    def predict(self, poses):
+        """Nome do gesto mais provável de cada pessoa (NONE abaixo do limiar)."""
+        codes, _, _ = self.score(poses)
+        return [GESTURES[c] if c >= 0 else NONE for c in codes.tolist()]
+
+    def save(self, path):
+        np.savez(path, classes=np.array(self.classes), w1=self.w1, b1=self.b1, w2=self.w2, b2=self.b2,
+                 mean=self.mean, std=self.std, threshold=self.threshold)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        return cls(data['classes'].tolist(), data['w1'], data['b1'], data['w2'], data['b2'],
+                   data['mean'], data['std'], float(data['threshold']))
+
+
+def train(poses, labels, hidden=32, epochs=400, lr=0.01, weight_decay=1e-4, threshold=0.5, seed=0):
+    """Treina com Adam em batch completo; as classes são pesadas pelo inverso da frequência."""
+    rng = np.random.default_rng(seed)
+    classes = sorted(set(labels))
+    y = np.array([classes.index(l) for l in labels])
+    x = normalise_poses(poses)
+    mean, std = x.mean(axis=0), np.maximum(x.std(axis=0), 1e-6)
+    x = (x - mean) / std
+
+    n, d, k = len(x), x.shape[1], len(classes)
+    params = [rng.normal(0, np.sqrt(2.0 / d), (d, hidden)), np.zeros(hidden),
+              rng.normal(0, np.sqrt(1.0 / hidden), (hidden, k)), np.zeros(k)]
+    m = [np.zeros_like(p) for p in params]
+    v = [np.zeros_like(p) for p in params]
+    counts = np.bincount(y, minlength=k)
+    sample_w = (n / (k * np.maximum(counts, 1)))[y] / n
+    onehot = np.eye(k)[y]
+
+    for step in range(1, epochs + 1):
+        w1, b1, w2, b2 = params
+        h_pre = x @ w1 + b1
+        h = np.maximum(h_pre, 0.0)
+        z = h @ w2 + b2
+        z -= z.max(axis=1, keepdims=True)
+        p = np.exp(z)
+        p /= p.sum(axis=1, keepdims=True)
+
+        dz = (p - onehot) * sample_w[:, None]
+        dh = (dz @ w2.T) * (h_pre > 0)
+        grads = [x.T @ dh + weight_decay * w1, dh.sum(axis=0), h.T @ dz + weight_decay * w2, dz.sum(axis=0)]
+        for i, g in enumerate(grads):
+            m[i] = 0.9 * m[i] + 0.1 * g
+            v[i] = 0.999 * v[i] + 0.001 * g ** 2
+            m_hat = m[i] / (1 - 0.9 ** step)
+            v_hat = v[i] / (1 - 0.999 ** step)
+            params[i] = params[i] - lr * m_hat / (np.sqrt(v_hat) + 1e-8)
+
+    return GestureModel(classes, *params, mean, std, threshold)
+
+
+# ------------------------ DADOS E AVALIAÇÃO ------------------------
+
+def load_labelled(specs):
+    """specs: ["GESTO=sessao.npz", ...] -> (poses (N, 33, C), etiquetas). Cada ficheiro grava um só gesto."""
+    poses, labels = [], []
+    for spec in specs:
+        label, _, path = spec.partition('=')
+        if not path:
+            raise ValueError(f"Esperado GESTO=caminho.npz, recebido: {spec}")
+        for _, track_poses in load_session(path).values():
+            poses.append(track_poses)
+            labels += [label] * len(track_poses)
+    return np.concatenate(poses), labels
+
+
+def rule_predictions(poses):
+    codes, _, _ = score_gestures(poses)
+    return [GESTURES[c] if c >= 0 else NONE for c in codes.tolist()]
+
+
+def latency(fn, poses, repeats=500):
+    """Microssegundos por pessoa, a classificar um frame de len(poses) pessoas de cada vez."""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(poses)
+    return (time.perf_counter() - start) / repeats / len(poses) * 1e6
+
+
+def evaluate(model, poses, labels, people=5):
+    labels = np.array(labels)
+    model_acc = float(np.mean(np.array(model.predict(poses)) == labels))
+    rules_acc = float(np.mean(np.array(rule_predictions(poses)) == labels))
+    frame = poses[:people]
+    return {
+        'samples': len(labels),
+        'model_accuracy': model_acc,
+        'rules_accuracy': rules_acc,
+        'model_us': latency(model.score, frame),
+        'rules_us': latency(score_gestures, frame),
+    }
+
+
+def print_report(report):
+    print(f"{report['samples']} amostras")
+    print(f"{'':<8} {'exatidão':>9} {'us/pessoa':>10}")
+    print(f"{'modelo':<8} {report['model_accuracy']:>9.3f} {report['model_us']:>10.1f}")
+    print(f"{'regras':<8} {report['rules_accuracy']:>9.3f} {report['rules_us']:>10.1f}")
+
+
+def main():
+    if len(sys.argv) < 4 or sys.argv[1] not in ('train', 'eval'):
+        print("Uso: python gesture_model.py train modelo.npz GESTO=sessao.npz [...]")
+        print("     python gesture_model.py eval modelo.npz GESTO=sessao.npz [...]")
+        print(f"Gestos: {', '.join(GESTURES)} ou {NONE}")
+        return
+    command, model_path = sys.argv[1], sys.argv[2]
+    poses, labels = load_labelled(sys.argv[3:])
+
+    if command == 'train':
+        # 20% das amostras ficam de fora para medir a exatidão
+        order = np.random.default_rng(0).permutation(len(poses))
+        cut = int(len(order) * 0.8)
+        labels = np.array(labels)
+        model = train(poses[order[:cut]], labels[order[:cut]].tolist())
+        model.save(model_path)
+        print(f"Modelo gravado em {model_path} (classes: {', '.join(model.classes)})")
+        poses, labels = poses[order[cut:]], labels[order[cut:]].tolist()
+    else:
+        model = GestureModel.load(model_path)
+    print_report(evaluate(model, poses, labels))
+
+
+if __name__ == '__main__':
+    main()
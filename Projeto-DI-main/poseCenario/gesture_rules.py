@@ -0,0 +1,288 @@
+import json
+import math
+import operator
+import time
+
+import numpy as np
+
+from snapshot import VISIBILITY
+
+# Tipos de feature que uma regra pode usar (todas em coordenadas normalizadas da imagem):
+#   angle [a, b, c]   ângulo em b, em graus (0..180)
+#   dy [a, b]         y[a] - y[b]  (positivo quando b está acima de a)
+#   abs_dy [a, b]     |y[a] - y[b]|
+#   abs_dx [a, b]     |x[a] - x[b]|
+#   visibility a      visibilidade do landmark a
+FEATURE_KINDS = ('angle', 'dy', 'abs_dy', 'abs_dx', 'visibility')
+COMPARATORS = ('gt', 'ge', 'lt', 'le')
+
+
+def _scalar_feature(kind, idx):
+    """Uma feature para uma pessoa (lista de landmarks [x, y, ...]), com as mesmas operações que features()."""
+    if kind == 'angle':
+        a, b, c = idx
+
+        def angle(pose, atan2=math.atan2, to_degrees=180 / math.pi):
+            pa, pb, pc = pose[a], pose[b], pose[c]
+            value = abs((atan2(pc[1] - pb[1], pc[0] - pb[0]) - atan2(pa[1] - pb[1], pa[0] - pb[0])) * to_degrees)
+            return value if value <= 180 else 360 - value
+        return angle
+    if kind == 'dy':
+        a, b = idx
+        return lambda pose: pose[a][1] - pose[b][1]
+    if kind == 'abs_dy':
+        a, b = idx
+        return lambda pose: abs(pose[a][1] - pose[b][1])
+    if kind == 'abs_dx':
+        a, b = idx
+        return lambda pose: abs(pose[a][0] - pose[b][0])
+    a, = idx
+    return lambda pose: pose[a][VISIBILITY]
+
+
+class GestureRuleSet:
+    """Um conjunto de regras (ex.: 'pose', 'menu') compilado numa avaliação vetorizada.
+
+    As features são calculadas uma vez por chamada para todas as pessoas; cada predicado
+    compara uma coluna com um limite e uma regra passa quando nenhum dos seus predicados falha.
+    Ganha a regra verdadeira com maior prioridade (empate: a que aparece primeiro no ficheiro).
+    Com vectorised=False a mesma tabela é avaliada pessoa a pessoa em Python puro, com resultado idêntico:
+    evita o custo fixo das chamadas NumPy quando há poucas pessoas (ver `python gestures.py`).
+    """
+
+    def __init__(self, name, features, rules, require=(), timing=None):
+        self.name = name
+        # Parâmetros temporais para o GestureStateMachine (ver gesture_state.py)
+        self.timing = dict(timing or {})
+        self.rules = sorted(rules, key=lambda r: -r.get('priority', 0))
+        self.names = [r['name'] for r in self.rules]
+        self.require = list(require)
+        self.scores = np.array([r.get('score', 0) for r in self.rules], dtype=np.int64)
+        self._score_list = self.scores.tolist()
+        self._compile_features(features, [p for r in self.rules for p in r.get('when', [])] + list(require))
+        self._compile_predicates(require)
+        self._compile_scalar()
+
+        self.hits = np.zeros(len(self.rules), dtype=np.int64)
+        self.matches = np.zeros(len(self.rules), dtype=np.int64)
+        self.evaluations = 0
+        self.eval_time = 0.0
+        self.costs = None
+
+    def _compile_features(self, features, predicates):
+        used = []
+        for pred in predicates:
+            name = pred['feature']
+            if name not in features:
+                raise ValueError(f"Feature desconhecida na regra '{self.name}': {name}")
+            if name not in used:
+                used.append(name)
+
+        by_kind = {kind: [] for kind in FEATURE_KINDS}
+        for name in used:
+            (kind, args), = features[name].items()
+            if kind not in by_kind:
+                raise ValueError(f"Tipo de feature desconhecido: {kind} (opções: {', '.join(FEATURE_KINDS)})")
+            by_kind[kind].append((name, args))
+        self.feature_specs = {name: features[name] for name in used}
+
+        # Colunas agrupadas por tipo, para cada tipo ser calculado com uma só operação
+        self.feature_names = [name for kind in FEATURE_KINDS for name, _ in by_kind[kind]]
+        self.columns = {name: i for i, name in enumerate(self.feature_names)}
+        self.spans = {}
+        start = 0
+        for kind in FEATURE_KINDS:
+            args = [a for _, a in by_kind[kind]]
+            self.spans[kind] = (slice(start, start + len(args)), np.array(args, dtype=np.intp))
+            start += len(args)
+
+        joints = self.spans['angle'][1].reshape(-1, 3)
+        # Vetores (c - b) e (a - b) de cada ângulo lado a lado, para um só arctan2
+        self._angle_tips = np.concatenate([joints[:, 2], joints[:, 0]])
+        self._angle_bases = np.concatenate([joints[:, 1], joints[:, 1]])
+
+    def _compile_predicates(self, require):
+        preds = []
+        membership = []
+        for rule in self.rules:
+            idx = []
+            for pred in list(rule.get('when', [])) + list(require):
+                col = self.columns[pred['feature']]
+                ops = [op for op in COMPARATORS if op in pred]
+                if not ops:
+                    raise ValueError(f"Predicado sem comparação em '{rule['name']}': {pred}")
+                for op in ops:
+                    key = (col, op, float(pred[op]))
+                    if key not in preds:
+                        preds.append(key)
+                    idx.append(preds.index(key))
+            membership.append(idx)
+
+        # lt/le viram gt/ge com o sinal trocado (a negação é exata em vírgula flutuante)
+        self.pred_cols = np.array([c for c, _, _ in preds], dtype=np.intp)
+        sign = np.array([-1.0 if op in ('lt', 'le') else 1.0 for _, op, _ in preds])
+        self.pred_sign = sign
+        self.pred_limits = np.array([v for _, _, v in preds]) * sign
+        self.pred_strict = np.array([op in ('gt', 'lt') for _, op, _ in preds])
+        self.rule_predicates = membership
+        # (predicados, regras): 1 onde o predicado pertence à regra
+        self.membership = np.zeros((len(preds), len(self.rules)), dtype=np.float32)
+        for r, idx in enumerate(membership):
+            self.membership[idx, r] = 1.0
+
+    def _compile_scalar(self):
+        """Prepara o caminho pessoa a pessoa: uma função por feature e os predicados e regras como tuplos."""
+        points = set()
+        for name in self.feature_names:
+            (kind, args), = self.feature_specs[name].items()
+            points.update([args] if kind == 'visibility' else args)
+        points = sorted(int(p) for p in points)
+        # Só os landmarks usados são copiados para listas
+        self._scalar_points = np.array(points, dtype=np.intp)
+        at = {p: i for i, p in enumerate(points)}
+
+        feature_fns = []
+        for name in self.feature_names:
+            (kind, args), = self.feature_specs[name].items()
+            if kind == 'visibility':
+                feature_fns.append(_scalar_feature(kind, (at[int(args)],)))
+            else:
+                feature_fns.append(_scalar_feature(kind, [at[int(i)] for i in args]))
+        # Mesma negação exata dos lt/le e os mesmos limites que a versão vetorizada
+        predicates = list(zip(self.pred_cols.tolist(), self.pred_sign.tolist(), self.pred_limits.tolist(),
+                              self.pred_strict.tolist()))
+        # Cada regra lê os seus predicados de uma vez; o True final garante sempre um tuplo
+        rule_getters = [operator.itemgetter(*sorted(set(idx)), -1) for idx in self.rule_predicates]
+
+        def rules(pose):
+            values = [feature(pose) for feature in feature_fns]
+            ok = [values[col] * sign > limit if strict else values[col] * sign >= limit
+                  for col, sign, limit, strict in predicates]
+            ok.append(True)
+            return [False not in get(ok) for get in rule_getters]
+
+        self._scalar_rules = rules
+
+    def _evaluate_scalar(self, poses):
+        """Como evaluate, pessoa a pessoa: lista (P) de listas (regras) de bool. Mesmas operações em vírgula
+        flutuante que a versão vetorizada (atan2, escala, negação exata dos lt/le), logo o mesmo resultado."""
+        rules = self._scalar_rules
+        return [rules(pose) for pose in poses[:, self._scalar_points].tolist()]
+
+    def features(self, poses):
+        """Matriz (P, features) na ordem de self.feature_names."""
+        out = np.empty((len(poses), len(self.feature_names)))
+        cols, joints = self.spans['angle']
+        if len(joints):
+            v = poses[:, self._angle_tips, :2] - poses[:, self._angle_bases, :2]
+            theta = np.arctan2(v[..., 1], v[..., 0])
+            k = len(self._angle_tips) // 2
+            angle = np.abs((theta[:, :k] - theta[:, k:]) * (180 / math.pi))
+            out[:, cols] = np.where(angle <= 180, angle, 360 - angle)
+        cols, pairs = self.spans['dy']
+        if len(pairs):
+            out[:, cols] = poses[:, pairs[:, 0], 1] - poses[:, pairs[:, 1], 1]
+        cols, pairs = self.spans['abs_dy']
+        if len(pairs):
+            out[:, cols] = np.abs(poses[:, pairs[:, 0], 1] - poses[:, pairs[:, 1], 1])
+        cols, pairs = self.spans['abs_dx']
+        if len(pairs):
+            out[:, cols] = np.abs(poses[:, pairs[:, 0], 0] - poses[:, pairs[:, 1], 0])
+        cols, points = self.spans['visibility']
+        if len(points):
+            out[:, cols] = poses[:, points, VISIBILITY]
+        return out
+
+    def evaluate(self, poses):
+        """Máscara (P, regras) de todas as regras verdadeiras, ignorando a prioridade."""
+        signed = self.features(poses)[:, self.pred_cols] * self.pred_sign
+        ok = np.where(self.pred_strict, signed > self.pred_limits, signed >= self.pred_limits)
+        return (~ok).astype(np.float32) @ self.membership == 0
+
+    def classify(self, poses, vectorised=True):
+        """Devolve (códigos (P,), pontos (P,)); o código é o índice em self.names, ou -1 sem gesto."""
+        codes, scores, _ = self.classify_all(poses, vectorised)
+        return codes, scores
+
+    def classify_all(self, poses, vectorised=True):
+        """Como classify, mais a máscara (P, regras) de todas as regras verdadeiras (multi-etiqueta).
+
+        vectorised: True avalia todas as pessoas de uma vez em NumPy, False pessoa a pessoa em Python.
+        """
+        start = time.perf_counter()
+        poses = np.asarray(poses, dtype=np.float64)
+        n = len(poses)
+        if n == 0 or not self.rules:
+            return (np.full(n, -1, dtype=np.int64), np.zeros(n, dtype=np.int64),
+                    np.zeros((n, len(self.rules)), dtype=bool))
+        if not vectorised:
+            return self._classify_scalar(poses, start)
+        rule_ok = self.evaluate(poses)
+        codes = rule_ok.argmax(axis=1)
+        hit = rule_ok[np.arange(n), codes]
+        codes[~hit] = -1
+
+        self.matches += rule_ok.sum(axis=0)
+        self.hits += np.bincount(codes[hit], minlength=len(self.rules))
+        self.evaluations += n
+        self.eval_time += time.perf_counter() - start
+        return codes, np.where(hit, self.scores[codes], 0), rule_ok
+
+    def _classify_scalar(self, poses, start):
+        """classify_all pessoa a pessoa: a mesma contabilidade em Python, com um único np.array no fim."""
+        rows = self._evaluate_scalar(poses)
+        codes = [row.index(True) if True in row else -1 for row in rows]
+        rule_ok = np.array(rows, dtype=bool)
+        self.matches += rule_ok.sum(axis=0)
+        for code in codes:
+            if code >= 0:
+                self.hits[code] += 1
+        self.evaluations += len(rows)
+        self.eval_time += time.perf_counter() - start
+        scores = [self._score_list[code] if code >= 0 else 0 for code in codes]
+        return np.array(codes, dtype=np.int64), np.array(scores, dtype=self.scores.dtype), rule_ok
+
+    def profile(self, poses, repeats=200):
+        """Custo de cada regra avaliada sozinha (features incluídas), em microssegundos por chamada."""
+        poses = np.asarray(poses, dtype=np.float64)
+        self.costs = np.zeros(len(self.rules))
+        for r, rule in enumerate(self.rules):
+            single = GestureRuleSet(self.name, self.feature_specs, [rule], self.require)
+            start = time.perf_counter()
+            for _ in range(repeats):
+                single.evaluate(poses)
+            self.costs[r] = (time.perf_counter() - start) / repeats * 1e6
+        return dict(zip(self.names, self.costs.tolist()))
+
+    def stats(self):
+        """Por regra: vitórias, vezes em que foi verdadeira, nº de predicados e custo (se profile() já correu)."""
+        rows = []
+        for r, name in enumerate(self.names):
+            rows.append({
+                'rule': name,
+                'hits': int(self.hits[r]),
+                'matches': int(self.matches[r]),
+                'predicates': len(set(self.rule_predicates[r])),
+                'cost_us': None if self.costs is None else float(self.costs[r]),
+            })
+        return rows
+
+    def reset_stats(self):
+        self.hits[:] = 0
+        self.matches[:] = 0
+        self.evaluations = 0
+        self.eval_time = 0.0
+
+
+def compile_rules(config, rule_set):
+    sets = config.get('rule_sets', {})
+    if rule_set not in sets:
+        raise ValueError(f"Conjunto de regras desconhecido: {rule_set} (opções: {', '.join(sets)})")
+    spec = sets[rule_set]
+    return GestureRuleSet(rule_set, config.get('features', {}), spec.get('rules', []), spec.get('require', []),
+                          spec.get('timing'))
+
+
+def load_rules(path, rule_set):
+    with open(path, encoding='utf-8') as f:
+        return compile_rules(json.load(f), rule_set)
@@ -0,0 +1,112 @@
+from collections import namedtuple
+
+import numpy as np
+
+# Evento discreto de um gesto: seq cresce sempre (serve para saber o que já foi lido); numerado pelo EventBus
+GestureEvent = namedtuple('GestureEvent', 'seq time track_id gesture kind score')
+# Transição devolvida pelo GestureStateMachine; quem a publica (EventBus.emit) atribui o seq
+GestureTransition = namedtuple('GestureTransition', 'time track_id gesture kind score')
+START, REPEAT, END = 'start', 'repeat', 'end'
+
+# smoothing: constante de tempo (s) da evidência; onset/release: limiares de ligar/desligar;
+# dwell: tempo mínimo ativo antes do evento START; repeat: eventos REPEAT por segundo enquanto ativo (0 = nenhum)
+DEFAULT_TIMING = {'smoothing': 0.08, 'onset': 0.6, 'release': 0.3, 'dwell': 0.1, 'repeat': 0.0}
+
+
+class GestureStateMachine:
+    """Estado temporal dos gestos por track, com histerese, com arrays (tracks, gestos) e slots como os filtros.
+
+    A evidência de cada frame (0/1 ou pontuação normalizada) é suavizada no tempo; o gesto liga quando
+    passa `onset` e só desliga abaixo de `release`, por isso um frame isolado não dispara nada.
+    Tudo é medido em segundos, não em frames, logo não depende da taxa de captura nem da de desenho.
+    """
+
+    def __init__(self, names, scores, max_tracks, smoothing=0.08, onset=0.6, release=0.3, dwell=0.1, repeat=0.0):
+        g = len(names)
+        self.names = list(names)
+        self.scores = np.asarray(scores, dtype=np.int64)
+        self.smoothing = smoothing
+        self.onset = onset
+        self.release = release
+        self.dwell = np.broadcast_to(np.asarray(dwell, dtype=np.float64), (g,)).copy()
+        repeat = np.broadcast_to(np.asarray(repeat, dtype=np.float64), (g,))
+        self.period = np.where(repeat > 0, 1.0 / np.maximum(repeat, 1e-9), np.inf)
+
+        shape = (max_tracks, g)
+        self.level = np.zeros(shape)
+        self.active = np.zeros(shape, dtype=bool)
+        self.fired = np.zeros(shape, dtype=bool)
+        self.since = np.zeros(shape)
+        self.next_repeat = np.zeros(shape)
+        self.last_t = np.zeros(max_tracks)
+
+    @classmethod
+    def from_rules(cls, rules, max_tracks, **overrides):
+        """Parâmetros do bloco 'timing' do conjunto de regras; 'dwell' e 'repeat' podem vir em cada regra."""
+        timing = dict(DEFAULT_TIMING)
+        timing.update(rules.timing)
+        timing.update(overrides)
+        dwell = [r.get('dwell', timing['dwell']) for r in rules.rules]
+        repeat = [r.get('repeat', timing['repeat']) for r in rules.rules]
+        return cls(rules.names, rules.scores, max_tracks, timing['smoothing'], timing['onset'], timing['release'],
+                   dwell, repeat)
+
+    def reset(self, slot, t):
+        self.level[slot] = 0.0
+        self.active[slot] = False
+        self.fired[slot] = False
+        self.since[slot] = t
+        self.next_repeat[slot] = t
+        self.last_t[slot] = t
+
+    def release_slot(self, slot, track_id, t):
+        """A track desapareceu: fecha os gestos que já tinham emitido START."""
+        events = self._emit(END, self.fired[slot][None], [track_id], t)
+        self.reset(slot, t)
+        return events
+
+    def update(self, slots, track_ids, evidence, t):
+        """Atualiza as tracks em `slots` com a evidência (N, gestos) do frame t. Devolve as transições (END,
+        START, REPEAT) como GestureTransition."""
+        slots = np.asarray(slots, dtype=np.intp)
+        if not len(slots):
+            return []
+        dt = np.maximum(t - self.last_t[slots], 1e-3)[:, None]
+        self.last_t[slots] = t
+        alpha = 1.0 - np.exp(-dt / self.smoothing)
+        level = self.level[slots]
+        level += alpha * (evidence - level)
+
+        active = self.active[slots]
+        fired = self.fired[slots]
+        since = self.since[slots]
+        next_repeat = self.next_repeat[slots]
+
+        on = ~active & (level >= self.onset)
+        off = active & (level <= self.release)
+        ended = off & fired
+        active = (active | on) & ~off
+        fired &= active
+        since = np.where(on, t, since)
+
+        started = active & ~fired & (t - since >= self.dwell)
+        fired |= started
+        next_repeat = np.where(started, t + self.period, next_repeat)
+        repeated = active & fired & ~started & (t >= next_repeat)
+        # Depois de um frame muito atrasado não se emitem rajadas: o próximo fica pelo menos um período à frente
+        step = next_repeat + self.period
+        next_repeat = np.where(repeated, np.where(step > t, step, t + self.period), next_repeat)
+
+        self.level[slots] = level
+        self.active[slots] = active
+        self.fired[slots] = fired
+        self.since[slots] = since
+        self.next_repeat[slots] = next_repeat
+
+        return (self._emit(END, ended, track_ids, t)
+                + self._emit(START, started, track_ids, t)
+                + self._emit(REPEAT, repeated, track_ids, t))
+
+    def _emit(self, kind, mask, track_ids, t):
+        return [GestureTransition(t, int(track_ids[i]), self.names[g], kind, int(self.scores[g]))
+                for i, g in zip(*np.nonzero(mask))]
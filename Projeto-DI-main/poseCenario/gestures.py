@@ -0,0 +1,220 @@
+import math
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from gesture_rules import load_rules
+
+# As regras vivem em gesture_rules.json (POSE_GESTURE_RULES aponta para outro ficheiro);
+# detect_gesture fica como referência para verificar a tabela
+RULES_FILE = os.environ.get('POSE_GESTURE_RULES',
+                            os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gesture_rules.json'))
+POSE_RULES = load_rules(RULES_FILE, 'pose')
+# Gestos por ordem de prioridade (a ordem também define o código usado nos arrays e em memória partilhada)
+GESTURES = POSE_RULES.names
+
+LEFT_SHOULDER, RIGHT_SHOULDER = 11, 12
+LEFT_ELBOW, RIGHT_ELBOW = 13, 14
+LEFT_WRIST, RIGHT_WRIST = 15, 16
+LEFT_HIP, RIGHT_HIP = 23, 24
+LEFT_KNEE, RIGHT_KNEE = 25, 26
+LEFT_ANKLE, RIGHT_ANKLE = 27, 28
+
+
+def calculate_angle(a, b, c):
+    radians = math.atan2(c[1] - b[1], c[0] - b[0]) - math.atan2(a[1] - b[1], a[0] - b[0])
+    angle = abs(radians * (180 / math.pi))
+    return angle if angle <= 180 else 360 - angle
+
+def detect_gesture(landmarks):
+    if len(landmarks) <= RIGHT_WRIST:
+        return None, 0
+    
+    right_shoulder = [landmarks[RIGHT_SHOULDER].x, landmarks[RIGHT_SHOULDER].y]
+    right_elbow = [landmarks[RIGHT_ELBOW].x, landmarks[RIGHT_ELBOW].y]
+    right_wrist = [landmarks[RIGHT_WRIST].x, landmarks[RIGHT_WRIST].y]
+    angle = calculate_angle(right_shoulder, right_elbow, right_wrist)
+    
+    height_diff = right_shoulder[1] - right_wrist[1]
+    if angle > 120 and height_diff > 0.05:
+        return "ELEVATE_RIGHT", 15
+
+    left_shoulder = [landmarks[LEFT_SHOULDER].x, landmarks[LEFT_SHOULDER].y]
+    left_elbow = [landmarks[LEFT_ELBOW].x, landmarks[LEFT_ELBOW].y]
+    left_wrist = [landmarks[LEFT_WRIST].x, landmarks[LEFT_WRIST].y]
+    angle = calculate_angle(left_shoulder, left_elbow, left_wrist)
+    height_diff = left_shoulder[1] - left_wrist[1]
+    if angle > 120 and height_diff > 0.05:
+        return "ELEVATE_LEFT", 15
+
+    angle = calculate_angle(right_shoulder, right_elbow, right_wrist)
+    y_diff = abs(right_wrist[1] - right_shoulder[1])
+    if angle > 160 and y_diff < 0.1:
+        return "T_STOP_RIGHT", 20
+
+    angle = calculate_angle(left_shoulder, left_elbow, left_wrist)
+    y_diff = abs(left_wrist[1] - left_shoulder[1])
+    if angle > 160 and y_diff < 0.1:
+        return "T_STOP_LEFT", 20
+
+    angle = calculate_angle(right_shoulder, right_elbow, right_wrist)
+    height_diff = right_shoulder[1] - right_wrist[1]
+    if 60 < angle < 120 and height_diff > 0.1:
+        return "WAVE_RIGHT", 10
+
+    angle = calculate_angle(left_shoulder, left_elbow, left_wrist)
+    height_diff = left_shoulder[1] - left_wrist[1]
+    if 60 < angle < 120 and height_diff > 0.1:
+        return "WAVE_LEFT", 10
+
+    shoulder_distance = abs(landmarks[LEFT_SHOULDER].x - landmarks[RIGHT_SHOULDER].x)
+    if shoulder_distance < 0.008:
+        return "ROTATION", 25
+
+    right_hip = [landmarks[RIGHT_HIP].x, landmarks[RIGHT_HIP].y]
+    right_knee = [landmarks[RIGHT_KNEE].x, landmarks[RIGHT_KNEE].y]
+    right_ankle = [landmarks[RIGHT_ANKLE].x, landmarks[RIGHT_ANKLE].y]
+    knee_angle = calculate_angle(right_hip, right_knee, right_ankle)
+    if knee_angle < 170:
+        return "MARCH_RIGHT", 15
+
+    left_hip = [landmarks[LEFT_HIP].x, landmarks[LEFT_HIP].y]
+    left_knee = [landmarks[LEFT_KNEE].x, landmarks[LEFT_KNEE].y]
+    left_ankle = [landmarks[LEFT_ANKLE].x, landmarks[LEFT_ANKLE].y]
+    knee_angle = calculate_angle(left_hip, left_knee, left_ankle)
+    if knee_angle < 170:
+        return "MARCH_LEFT", 15
+
+    return None, 0
+
+
+# ------------------------ VERSÃO VETORIZADA ------------------------
+
+def classify_gestures(poses, vectorised=True):
+    """Gestos de várias pessoas de uma vez. poses: (P, 33, C) com x, y nos dois primeiros canais.
+
+    Devolve (códigos (P,), pontos (P,)); o código é o índice em GESTURES, ou -1 sem gesto.
+    Com a tabela de origem dá o mesmo resultado que detect_gesture pessoa a pessoa.
+    vectorised=False avalia pessoa a pessoa (ver GestureRuleSet.classify_all).
+    """
+    poses = np.asarray(poses, dtype=np.float64)
+    if poses.ndim != 3 or poses.shape[1] <= RIGHT_WRIST:
+        return np.full(len(poses), -1, dtype=np.int64), np.zeros(len(poses), dtype=np.int64)
+    return POSE_RULES.classify(poses, vectorised)
+
+
+def score_gestures(poses, vectorised=True):
+    """Vetor de pontos de todos os gestos por pessoa -> (P, len(GESTURES)), 0 onde a regra não se verifica.
+
+    Ao contrário de classify_gestures não fica só a primeira regra: quem marcha com o braço no ar
+    tem pontos em MARCH_* e em ELEVATE_*. Devolve também os códigos e pontos de classify_gestures.
+    """
+    poses = np.asarray(poses, dtype=np.float64)
+    if poses.ndim != 3 or poses.shape[1] <= RIGHT_WRIST:
+        n = len(poses)
+        return np.full(n, -1, dtype=np.int64), np.zeros(n, dtype=np.int64), np.zeros((n, len(GESTURES)), dtype=np.int64)
+    codes, scores, matches = POSE_RULES.classify_all(poses, vectorised)
+    return codes, scores, matches * POSE_RULES.scores
+
+
+def detect_gestures(poses, vectorised=True):
+    """Como classify_gestures, mas no formato de detect_gesture: lista de (nome, pontos)."""
+    codes, scores = classify_gestures(poses, vectorised)
+    return [(GESTURES[c] if c >= 0 else None, s) for c, s in zip(codes.tolist(), scores.tolist())]
+
+
+def top_gesture(vector):
+    """(nome, pontos) do gesto de maior prioridade com pontos num vetor de score_gestures, ou (None, 0)."""
+    hits = np.flatnonzero(vector)
+    return (GESTURES[hits[0]], int(vector[hits[0]])) if len(hits) else (None, 0)
+
+
+# ------------------------ EQUIVALÊNCIA E BENCHMARK ------------------------
+
+def _as_landmarks(pose):
+    return [SimpleNamespace(x=x, y=y) for x, y in pose[:, :2].tolist()]
+
+
+def synthetic_poses(n, seed=0):
+    """Poses aleatórias à volta de uma pose neutra, com braços e pernas em ângulos variados e casos na fronteira."""
+    rng = np.random.default_rng(seed)
+    base = np.full((33, 2), 0.5)
+    base[[LEFT_SHOULDER, RIGHT_SHOULDER]] = [(0.6, 0.35), (0.4, 0.35)]
+    base[[LEFT_HIP, RIGHT_HIP]] = [(0.56, 0.6), (0.44, 0.6)]
+    poses = np.repeat(base[None], n, axis=0)
+
+    for shoulder, elbow, wrist, side in ((RIGHT_SHOULDER, RIGHT_ELBOW, RIGHT_WRIST, -1),
+                                          (LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST, 1)):
+        upper = rng.uniform(-math.pi, math.pi, n)
+        fore = upper + rng.uniform(-math.pi, math.pi, n)
+        poses[:, elbow] = poses[:, shoulder] + 0.12 * np.stack([side * np.cos(upper), np.sin(upper)], axis=1)
+        poses[:, wrist] = poses[:, elbow] + 0.11 * np.stack([side * np.cos(fore), np.sin(fore)], axis=1)
+    for hip, knee, ankle in ((RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE), (LEFT_HIP, LEFT_KNEE, LEFT_ANKLE)):
+        bend = rng.uniform(-0.35, 0.35, n)
+        poses[:, knee] = poses[:, hip] + [0.0, 0.18]
+        poses[:, ankle] = poses[:, knee] + 0.18 * np.stack([np.sin(bend), np.cos(bend)], axis=1)
+
+    # Um quarto das pessoas de lado (ombros quase sobrepostos) e ruído por cima de tudo
+    side_on = rng.random(n) < 0.25
+    poses[side_on, LEFT_SHOULDER, 0] = poses[side_on, RIGHT_SHOULDER, 0] + rng.uniform(-0.012, 0.012, side_on.sum())
+    poses += rng.normal(0, 0.004, poses.shape)
+    return poses
+
+
+def check_equivalence(poses):
+    """Número de pessoas em que o classificador discorda de detect_gesture: (caminho vetorizado, escalar)."""
+    expected = [detect_gesture(_as_landmarks(p)) for p in poses]
+    vectorised = detect_gestures(poses)
+    scalar = detect_gestures(poses, vectorised=False)
+    return (sum(e != g for e, g in zip(expected, vectorised)),
+            sum(e != g for e, g in zip(expected, scalar)))
+
+
+def benchmark(poses, repeats=200):
+    """Segundos por chamada: detect_gesture pessoa a pessoa, caminho escalar e caminho vetorizado."""
+    people = [_as_landmarks(p) for p in poses]
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for person in people:
+            detect_gesture(person)
+    loop = (time.perf_counter() - start) / repeats
+    times = []
+    for vectorised in (False, True):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            classify_gestures(poses, vectorised)
+        times.append((time.perf_counter() - start) / repeats)
+    return (loop, *times)
+
+
+def main():
+    from sessions import load_session
+
+    if len(sys.argv) > 1:
+        poses = np.concatenate([p for path in sys.argv[1:] for _, p in load_session(path).values()])
+    else:
+        poses = synthetic_poses(20000)
+    vectorised, scalar = check_equivalence(poses)
+    POSE_RULES.reset_stats()
+    codes, _ = classify_gestures(poses)
+    print(f"{len(poses)} poses, diferenças em relação a detect_gesture: {vectorised} (vetorizado), {scalar} (escalar)")
+    for i, name in enumerate(GESTURES):
+        print(f"  {name:<14} {int((codes == i).sum()):>7}")
+    print(f"  {'(nenhum)':<14} {int((codes < 0).sum()):>7}")
+
+    POSE_RULES.profile(poses[:5])
+    print(f"{'regra':<14} {'vitórias':>9} {'verdadeira':>10} {'predicados':>10} {'custo (us)':>10}")
+    for row in POSE_RULES.stats():
+        print(f"{row['rule']:<14} {row['hits']:>9} {row['matches']:>10} {row['predicates']:>10} {row['cost_us']:>10.1f}")
+
+    print(f"{'pessoas':>8} {'detect_gesture (us)':>20} {'escalar (us)':>13} {'vetorizado (us)':>16}")
+    for n in (1, 2, 5, 8, 12, 20):
+        loop, scalar, vec = benchmark(poses[:n])
+        print(f"{n:>8} {loop * 1e6:>20.1f} {scalar * 1e6:>13.1f} {vec * 1e6:>16.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -5,13 +5,16 @@ import math
 import sys
 import os
 
-from colega import PoseTracker
+import numpy as np
+
+from shared_tracker import create_tracker
+from events import SWIPE
+from snapshot import VISIBILITY
 
 SCREEN_WIDTH = 1280
 SCREEN_HEIGHT = 720
 SCREEN_TITLE = "Lobby - Pose Detection"
 MAX_PEOPLE = 5
-SMOOTHING_FRAMES = 5
 
 SKELETON_COLORS = [
     (255, 50, 50),
@@ -36,12 +39,18 @@ class LobbyWindow(arcade.Window):
         super().__init__(width, height, title, fullscreen=True)
         arcade.set_background_color(arcade.color.DARK_SLATE_GRAY)
 
-        self.pose_tracker = PoseTracker(max_people=MAX_PEOPLE)
+        self.pose_tracker = create_tracker(max_people=MAX_PEOPLE, smoothing_preset='lobby',
+                                           record_path=os.environ.get('POSE_RECORD'),
+                                           gesture_model=os.environ.get('POSE_GESTURE_MODEL'))
         self.pose_tracker.start()
+        # Fila própria: nenhum swipe se perde entre dois on_draw
+        self.events = self.pose_tracker.subscribe()
 
         self.slot_assignments = {}
         self.last_seen = {}
-        self.slot_timeout = 2.0
+        # Cobre o tempo em que o tracker ainda pode devolver o id a quem volta (re-ID)
+        self.slot_timeout = self.pose_tracker.reid_ttl + 1.0
+        self.slots_version = -1
 
         self._mouse_down_x = None
         self._mouse_down_y = None
@@ -54,28 +63,19 @@ class LobbyWindow(arcade.Window):
         import colega as pv
         self.pose_connections = list(pv.mp.solutions.pose.POSE_CONNECTIONS)
 
-    def draw_skeleton(self, landmarks, position_index, box_x, box_y, box_width, box_height):
-        """Desenha esqueleto estilizado dentro de uma caixa."""
-        if not landmarks:
+    def draw_skeleton(self, landmarks, track_id, box_x, box_y, box_width, box_height):
+        """Desenha esqueleto estilizado dentro de uma caixa, com a cor fixa da track."""
+        if not len(landmarks):
             return
 
-        color = SKELETON_COLORS[position_index % len(SKELETON_COLORS)]
-
-        norm_points = []
-        for lm in landmarks:
-            nx = 1.0 - lm['x']
-            ny = 1.0 - lm['y']
-            norm_points.append((nx, ny, lm.get('visibility', 1.0)))
+        color = SKELETON_COLORS[track_id % len(SKELETON_COLORS)]
 
-        xs = [p[0] for p in norm_points]
-        ys = [p[1] for p in norm_points]
-        if not xs or not ys:
-            return
-        min_x = min(xs); max_x = max(xs)
-        min_y = min(ys); max_y = max(ys)
+        landmarks = np.asarray(landmarks)
+        norm = 1.0 - landmarks[:, :2]
+        vis = landmarks[:, VISIBILITY]
 
-        width_norm = max(max_x - min_x, 1e-3)
-        height_norm = max(max_y - min_y, 1e-3)
+        min_xy = norm.min(axis=0)
+        width_norm, height_norm = np.maximum(norm.max(axis=0) - min_xy, 1e-3)
 
         pad_px = 0.05 * box_width
         pad_py = 0.05 * box_height
@@ -90,14 +90,11 @@ class LobbyWindow(arcade.Window):
         scaled_w = width_norm * scale
         scaled_h = height_norm * scale
 
-        offset_left = target_left + (target_width - scaled_w) / 2.0
-        offset_bottom = target_bottom + (target_height - scaled_h) / 2.0
+        offset = np.array([target_left + (target_width - scaled_w) / 2.0,
+                           target_bottom + (target_height - scaled_h) / 2.0])
 
-        points = []
-        for nx, ny, vis in norm_points:
-            px = offset_left + (nx - min_x) * scale
-            py = offset_bottom + (ny - min_y) * scale
-            points.append((px, py, vis))
+        xy = offset + (norm - min_xy) * scale
+        points = [(px, py, v) for (px, py), v in zip(xy.tolist(), np.asarray(vis).tolist())]
 
         for idx1, idx2 in self.pose_connections:
             if idx1 < len(points) and idx2 < len(points):
@@ -117,7 +114,11 @@ class LobbyWindow(arcade.Window):
         self.clear()
         arcade.draw_text("LOBBY - Aguardando Jogadores", self.width/2, self.height-50,
                          arcade.color.WHITE, 32, anchor_x="center", bold=True)
-        poses = self.pose_tracker.get_smoothed_poses()
+        snapshot = self.pose_tracker.get_snapshot()
+        predicted = self.pose_tracker.predict(snapshot)
+        track_ids = snapshot.track_ids.tolist()
+        poses = {t_id: predicted[i] for i, t_id in enumerate(track_ids)}
+        now = time.time()
 
         slots_info = []
         base_y = 0.55
@@ -125,18 +126,6 @@ class LobbyWindow(arcade.Window):
         base_box_w = 200
         base_box_h = 400
 
-        centroids = []
-        for landmarks in poses:
-            vs = [(lm['x'], lm['y'], lm.get('visibility', 1.0)) for lm in landmarks if lm.get('visibility', 1.0) > 0.25]
-            if not vs:
-                centroids.append(None)
-                continue
-            avg_x = sum(v[0] for v in vs) / len(vs)
-            avg_y = sum(v[1] for v in vs) / len(vs)
-            sx = (1.0 - avg_x) * SCREEN_WIDTH
-            sy = (1.0 - avg_y) * SCREEN_HEIGHT
-            centroids.append((sx, sy))
-
         for idx, (x_frac, depth_scale) in enumerate(LOBBY_SLOTS):
             pos_x = x_frac * self.width
             pos_y = self.height * (base_y - (depth_scale - 1.0) * y_depth_factor)
@@ -145,51 +134,52 @@ class LobbyWindow(arcade.Window):
             box_x = pos_x - box_width / 2
             box_y = pos_y - box_height / 2
 
-            assigned_pose = None
-            has_player = False
             slots_info.append({
                 'idx': idx, 'pos_x': pos_x, 'pos_y': pos_y,
                 'box_x': box_x, 'box_y': box_y, 'box_w': box_width, 'box_h': box_height,
-                'depth': depth_scale, 'has_player': has_player, 'assigned_pose': assigned_pose
+                'depth': depth_scale, 'has_player': False, 'assigned_track': None
             })
 
-        slot_centers = {s['idx']: (s['pos_x'], s['pos_y']) for s in slots_info}
-        taken_slots = set()
-        pose_to_slot = {}
-        if len(centroids) > 0 and centroids[0] is not None:
-            pose_to_slot[0] = 2
-            taken_slots.add(2)
-
-        for p_idx in range(1, len(centroids)):
-            c = centroids[p_idx]
-            if c is None:
-                continue
-            best = None; best_dist = None
-            for s in slots_info:
-                sidx = s['idx']
-                if sidx in taken_slots:
+        # Slots ficam presos ao track_id; só se libertam após slot_timeout sem ver a track.
+        # Só há trabalho a fazer quando o tracker publica um snapshot novo.
+        if snapshot.version != self.slots_version:
+            self.slots_version = snapshot.version
+            for t_id in track_ids:
+                self.last_seen[t_id] = now
+            for t_id in list(self.slot_assignments):
+                if now - self.last_seen.get(t_id, 0) > self.slot_timeout:
+                    del self.slot_assignments[t_id]
+                    self.last_seen.pop(t_id, None)
+
+            taken_slots = set(self.slot_assignments.values())
+            for i, t_id in enumerate(track_ids):
+                if t_id in self.slot_assignments:
                     continue
-                cx, cy = slot_centers[sidx]
-                d = math.hypot(c[0] - cx, c[1] - cy)
-                if best is None or d < best_dist:
-                    best = sidx; best_dist = d
-            if best is not None:
-                pose_to_slot[p_idx] = best
+                free = [s for s in slots_info if s['idx'] not in taken_slots]
+                if not free:
+                    break
+                if 2 not in taken_slots:
+                    best = 2
+                else:
+                    mask = snapshot.confident(0.25)[i]
+                    if not mask.any():
+                        continue
+                    cx, cy = snapshot.poses[i, mask, :2].mean(axis=0)
+                    sx = (1.0 - cx) * SCREEN_WIDTH
+                    sy = (1.0 - cy) * SCREEN_HEIGHT
+                    best = min(free, key=lambda s: math.hypot(sx - s['pos_x'], sy - s['pos_y']))['idx']
+                self.slot_assignments[t_id] = best
                 taken_slots.add(best)
 
-        for slot in slots_info:
-            assigned = None
-            for p_idx, s_idx in pose_to_slot.items():
-                if s_idx == slot['idx']:
-                    assigned = p_idx; break
-            slot['assigned_pose'] = assigned
-            slot['has_player'] = assigned is not None
+        for t_id, s_idx in self.slot_assignments.items():
+            slot = slots_info[s_idx]
+            slot['assigned_track'] = t_id
+            slot['has_player'] = t_id in poses
 
         for slot in sorted(slots_info, key=lambda s: s['depth']):
             if slot['has_player']:
-                p_idx = slot['assigned_pose']
-                if p_idx is not None and p_idx < len(poses):
-                    self.draw_skeleton(poses[p_idx], p_idx, slot['box_x'], slot['box_y'], slot['box_w'], slot['box_h'])
+                t_id = slot['assigned_track']
+                self.draw_skeleton(poses[t_id], t_id, slot['box_x'], slot['box_y'], slot['box_w'], slot['box_h'])
 
         order = [2, 1, 3, 0, 4]
         slot_label_map = {s_idx: i+1 for i, s_idx in enumerate(order)}
@@ -205,13 +195,13 @@ class LobbyWindow(arcade.Window):
 
         arcade.draw_text(f"Jogadores Detectados: {len(poses)}/{MAX_PEOPLE}", self.width/2, 50, arcade.color.WHITE, 20, anchor_x='center', bold=True)
 
-        swipe_detected, swipe_dir = self.pose_tracker.get_swipe()
-        if swipe_detected and not self.is_launching:
-            print(f"✋ Swipe detectado: {swipe_dir}")
+        swipes = [e for e in self.events.drain() if e.kind == SWIPE]
+        if swipes and not self.is_launching:
+            print(f"✋ Swipe detectado: {swipes[0].gesture} (track {swipes[0].track_id})")
             self.launch_perspectiva()
             return
 
-        gestures = self.pose_tracker.get_gestures()
+        gestures = snapshot.gestures
         start_gesture_detected = False
         
         for gesture_name, score in gestures:
@@ -269,8 +259,7 @@ class LobbyWindow(arcade.Window):
             self.launch_perspectiva()
 
     def launch_perspectiva(self):
-        poses = self.pose_tracker.get_smoothed_poses()
-        player_count = min(len(poses), MAX_PEOPLE)
+        player_count = min(len(self.pose_tracker.get_snapshot()), MAX_PEOPLE)
 
         print(f"[Lobby] Parando pose tracker, lançando perspectiva com {player_count} jogador(es)")
         
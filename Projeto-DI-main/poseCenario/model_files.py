@@ -0,0 +1,13 @@
+import os
+import urllib.request
+
+# Módulo leve (sem mediapipe nem o tracker): também é importado pelo gesture_engine da interface na raiz
+
+
+def ensure_model(path, url):
+    """Descarrega o modelo para path se ainda não existir; um download interrompido não deixa ficheiro a meio."""
+    if os.path.exists(path):
+        return
+    tmp = path + '.part'
+    urllib.request.urlretrieve(url, tmp)
+    os.replace(tmp, path)
@@ -0,0 +1,401 @@
+import math
+import sys
+import time
+
+import numpy as np
+
+from gestures import GESTURES
+from sessions import load_session
+from snapshot import VISIBILITY
+
+# Pontos que descrevem os movimentos: cotovelos, pulsos, joelhos e tornozelos
+MOTION_POINTS = np.array([13, 14, 15, 16, 25, 26, 27, 28])
+MOTION_DIMS = 2 * len(MOTION_POINTS)
+L_SHOULDER, R_SHOULDER, L_HIP, R_HIP = 11, 12, 23, 24
+
+
+def motion_features(poses):
+    """(P, 33, C) -> (P, 16): x, y dos MOTION_POINTS relativos ao meio da anca, em comprimentos de tronco."""
+    xy = np.asarray(poses, dtype=np.float64)[:, :, :2]
+    hip = (xy[:, L_HIP] + xy[:, R_HIP]) / 2
+    shoulder = (xy[:, L_SHOULDER] + xy[:, R_SHOULDER]) / 2
+    torso = np.maximum(np.hypot(*(shoulder - hip).T), 1e-3)
+    return ((xy[:, MOTION_POINTS] - hip[:, None]) / torso[:, None, None]).reshape(len(xy), -1)
+
+
+def resample(times, feats, targets):
+    """Interpolação linear de uma série (times (N,), feats (N, D)) nos instantes targets (...) -> (..., D)."""
+    idx = np.clip(np.searchsorted(times, targets), 1, len(times) - 1)
+    t0, t1 = times[idx - 1], times[idx]
+    w = np.clip((targets - t0) / np.maximum(t1 - t0, 1e-9), 0.0, 1.0)[..., None]
+    return feats[idx - 1] * (1 - w) + feats[idx] * w
+
+
+class MotionHistory:
+    """Últimas `capacity` amostras de features por track, num anel com slots como os filtros."""
+
+    def __init__(self, max_tracks, capacity=64, dims=MOTION_DIMS):
+        self.feats = np.zeros((max_tracks, capacity, dims))
+        self.times = np.zeros((max_tracks, capacity))
+        self.count = np.zeros(max_tracks, dtype=np.intp)
+        self.head = np.zeros(max_tracks, dtype=np.intp)
+        self.capacity = capacity
+
+    def reset(self, slot):
+        self.count[slot] = 0
+        self.head[slot] = 0
+
+    def push(self, slots, feats, t):
+        slots = np.asarray(slots, dtype=np.intp)
+        self.feats[slots, self.head[slots]] = feats
+        self.times[slots, self.head[slots]] = t
+        self.head[slots] = (self.head[slots] + 1) % self.capacity
+        self.count[slots] = np.minimum(self.count[slots] + 1, self.capacity)
+
+    def span(self, slot):
+        """Segundos cobertos pelo histórico do slot."""
+        n = self.count[slot]
+        if n < 2:
+            return 0.0
+        return float(self.times[slot, (self.head[slot] - 1) % self.capacity] - self.times[slot, (self.head[slot] - n) % self.capacity])
+
+    def series(self, slot):
+        """(times, feats) do slot por ordem cronológica."""
+        n = self.count[slot]
+        idx = (self.head[slot] - n + np.arange(n)) % self.capacity
+        return self.times[slot, idx], self.feats[slot, idx]
+
+
+class MotionTemplates:
+    """Movimentos de referência: séries (K, M, D) reamostradas com M pontos, duração e limiar de cada um."""
+
+    def __init__(self, names, series, durations, thresholds):
+        self.names = list(names)
+        self.series = np.asarray(series, dtype=np.float64)
+        self.durations = np.asarray(durations, dtype=np.float64)
+        self.thresholds = np.asarray(thresholds, dtype=np.float64)
+        unknown = [n for n in self.names if n not in GESTURES]
+        if unknown:
+            raise ValueError(f"Gestos desconhecidos nos modelos de movimento: {', '.join(unknown)}")
+        self.gesture_index = np.array([GESTURES.index(n) for n in self.names], dtype=np.intp)
+
+    def __len__(self):
+        return len(self.names)
+
+    def save(self, path):
+        np.savez(path, names=np.array(self.names), series=self.series, durations=self.durations,
+                 thresholds=self.thresholds)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        return cls(data['names'].tolist(), data['series'], data['durations'], data['thresholds'])
+
+    @classmethod
+    def from_sessions(cls, specs, samples=24, threshold=0.3):
+        """specs: ["GESTO=sessao.npz", ...]; cada track de cada sessão dá um modelo com o clip inteiro."""
+        names, series, durations = [], [], []
+        for spec in specs:
+            name, _, path = spec.partition('=')
+            if not path:
+                raise ValueError(f"Esperado GESTO=caminho.npz, recebido: {spec}")
+            for times, poses in load_session(path).values():
+                if len(times) < 4:
+                    continue
+                targets = np.linspace(times[0], times[-1], samples)
+                names.append(name)
+                series.append(resample(times, motion_features(poses), targets))
+                durations.append(times[-1] - times[0])
+        return cls(names, series, durations, [threshold] * len(names))
+
+
+# ------------------------ ENERGIA DO MOVIMENTO ------------------------
+
+# Tronco, braços e pernas; a cara e os dedos tremem muito e dizem pouco sobre o movimento
+ENERGY_POINTS = np.arange(11, 29)
+
+
+def motion_energy(poses, velocities, min_visibility=0.5):
+    """Energia de cada pessoa: velocidade média (x, y) dos landmarks do corpo, em comprimentos de tronco por segundo.
+
+    poses e velocities: (P, 33, C) como no tracker (velocidades do filtro, por segundo). Dividir pelo
+    tronco faz com que quem está longe da câmara valha o mesmo que quem está perto; os landmarks pouco
+    visíveis não contam, porque a posição deles salta.
+    """
+    poses = np.asarray(poses, dtype=np.float64)
+    if not len(poses):
+        return np.zeros(0)
+    xy = poses[:, :, :2]
+    hip = (xy[:, L_HIP] + xy[:, R_HIP]) / 2
+    shoulder = (xy[:, L_SHOULDER] + xy[:, R_SHOULDER]) / 2
+    torso = np.maximum(np.hypot(*(shoulder - hip).T), 1e-3)
+    vel = np.asarray(velocities, dtype=np.float64)[:, ENERGY_POINTS, :2]
+    speed = np.hypot(vel[..., 0], vel[..., 1])
+    if poses.shape[2] > VISIBILITY:
+        weight = poses[:, ENERGY_POINTS, VISIBILITY] >= min_visibility
+    else:
+        weight = np.ones(speed.shape, dtype=bool)
+    mean = (speed * weight).sum(axis=1) / np.maximum(weight.sum(axis=1), 1)
+    return mean / torso
+
+
+class MotionEnergy:
+    """Energia suavizada por track (média exponencial com constante de tempo `smoothing` segundos), por slot."""
+
+    def __init__(self, max_tracks, smoothing=0.3):
+        self.smoothing = smoothing
+        self.level = np.zeros(max_tracks)
+        self.last_t = np.zeros(max_tracks)
+
+    def reset(self, slot, t):
+        self.level[slot] = 0.0
+        self.last_t[slot] = t
+
+    def update(self, slots, energy, t):
+        """Junta a energia (N,) do frame t às tracks em `slots` e devolve os níveis suavizados."""
+        slots = np.asarray(slots, dtype=np.intp)
+        dt = np.maximum(t - self.last_t[slots], 1e-3)
+        self.last_t[slots] = t
+        level = self.level[slots]
+        level += (1.0 - np.exp(-dt / self.smoothing)) * (energy - level)
+        self.level[slots] = level
+        return level
+
+
+# ------------------------ DTW VETORIZADO ------------------------
+
+def envelopes(series, band):
+    """Envelope superior e inferior de cada série (K, M, D) numa janela de ±band amostras."""
+    m = series.shape[1]
+    upper = np.empty_like(series)
+    lower = np.empty_like(series)
+    for i in range(m):
+        window = series[:, max(0, i - band):i + band + 1]
+        upper[:, i] = window.max(axis=1)
+        lower[:, i] = window.min(axis=1)
+    return upper, lower
+
+
+def lb_kim(queries, templates):
+    """Distância entre os primeiros e entre os últimos pontos: todo o caminho DTW passa pelos dois cantos."""
+    return (np.linalg.norm(queries[:, 0] - templates[:, 0], axis=-1)
+            + np.linalg.norm(queries[:, -1] - templates[:, -1], axis=-1))
+
+
+def lb_keogh(queries, upper, lower):
+    """Soma, ponto a ponto, da distância da consulta ao envelope do modelo (0 dentro do envelope)."""
+    excess = np.maximum(queries - upper, 0.0) + np.maximum(lower - queries, 0.0)
+    return np.linalg.norm(excess, axis=-1).sum(axis=1)
+
+
+def dtw_batch(queries, templates, band, limits):
+    """DTW de cada par (queries[q], templates[q]), todos com M pontos, com banda de Sakoe-Chiba.
+
+    Avança linha a linha para todos os pares de uma vez, só nas colunas dentro da banda. Dentro da
+    linha a dependência da célula da esquerda resolve-se com somas acumuladas e um mínimo acumulado,
+    sem ciclo em Python. Todo o caminho passa por todas as linhas, por isso quando o mínimo de uma
+    linha passa o limite do par ele é abandonado; as distâncias de cada linha só se calculam para os
+    pares ainda vivos. Devolve o custo total (inf nos abandonados).
+    """
+    q, m = queries.shape[:2]
+    out = np.full(q, np.inf)
+    alive = np.arange(q)
+    limits = np.asarray(limits, dtype=np.float64)
+
+    # Linha anterior na coluna j + 1 (a coluna 0 é a borda); a banda só avança para a direita, por isso
+    # cada linha escreve por cima da anterior e o que fica fora da banda continua inf
+    prev = np.full((q, m + 1), np.inf)
+    prev[:, 0] = 0.0
+    for i in range(m):
+        lo, hi = max(0, i - band), min(m, i + band + 1)
+        diff = templates[:, lo:hi] - queries[:, i, None]
+        c = np.sqrt(np.einsum('qjd,qjd->qj', diff, diff))
+        # Melhor chegada de cima ou da diagonal a cada coluna; a da esquerda entra pelo mínimo acumulado
+        up = np.minimum(prev[:, lo + 1:hi + 1], prev[:, lo:hi])
+        s = np.cumsum(c, axis=1)
+        row = s + np.minimum.accumulate(up - (s - c), axis=1)
+        prev[:, lo + 1:hi + 1] = row
+        prev[:, :lo + 1] = np.inf
+
+        ok = row.min(axis=1) <= limits
+        if not ok.all():
+            alive, limits, prev = alive[ok], limits[ok], prev[ok]
+            queries, templates = queries[ok], templates[ok]
+            if not len(alive):
+                return out
+    out[alive] = prev[:, m]
+    return out
+
+
+def dtw_reference(a, b, band):
+    """DTW escalar clássico, só para verificar dtw_batch."""
+    m = len(a)
+    acc = np.full((m + 1, m + 1), np.inf)
+    acc[0, 0] = 0.0
+    for i in range(1, m + 1):
+        for j in range(max(1, i - band), min(m, i + band) + 1):
+            acc[i, j] = np.linalg.norm(a[i - 1] - b[j - 1]) + min(acc[i - 1, j], acc[i, j - 1], acc[i - 1, j - 1])
+    return acc[m, m]
+
+
+class MotionRecognizer:
+    """Compara o histórico de cada track com os modelos de movimento, para todas as tracks de uma vez.
+
+    Os limites inferiores (LB_Kim e LB_Keogh) descartam a maioria dos pares antes do DTW, e o DTW
+    abandona pares a meio; só os pares que podem ficar abaixo do limiar chegam ao fim.
+    """
+
+    def __init__(self, templates, max_tracks, band=0.15, capacity=64, interval=0.1, use_bounds=True):
+        self.templates = templates
+        self.history = MotionHistory(max_tracks, capacity)
+        # Um movimento dura ~1 s: comparar a cada `interval` segundos chega, entre comparações repete-se o resultado
+        self.interval = interval
+        self.next_match = 0.0
+        self.matched = np.zeros((max_tracks, len(GESTURES)), dtype=bool)
+        m = templates.series.shape[1]
+        self.band = max(1, int(round(band * m)))
+        self.upper, self.lower = envelopes(templates.series, self.band)
+        self.use_bounds = use_bounds
+        # Gestos com modelo de movimento: nestes o resultado do DTW substitui o das regras
+        self.covered = np.zeros(len(GESTURES), dtype=bool)
+        self.covered[templates.gesture_index] = True
+        self.stats = {'calls': 0, 'pairs': 0, 'pruned': 0, 'abandoned': 0, 'matched': 0}
+
+    def reset(self, slot):
+        self.history.reset(slot)
+        self.matched[slot] = False
+
+    def push(self, slots, poses, t):
+        self.history.push(slots, motion_features(poses), t)
+
+    def match(self, slots, t):
+        """Máscara (len(slots), len(GESTURES)) dos gestos cujo movimento bate certo com algum modelo."""
+        slots = np.asarray(slots, dtype=np.intp)
+        if t >= self.next_match:
+            self.next_match = t + self.interval
+            self.matched[slots] = self._match(slots, t)
+        return self.matched[slots]
+
+    def _match(self, slots, t):
+        tpl = self.templates
+        m = tpl.series.shape[1]
+        result = np.zeros((len(slots), len(GESTURES)), dtype=bool)
+        rows, tpls, queries = [], [], []
+        for row, slot in enumerate(slots):
+            usable = np.flatnonzero(tpl.durations <= self.history.span(slot) + 1e-3)
+            if not len(usable):
+                continue
+            times, feats = self.history.series(slot)
+            # Os últimos `duração` segundos do histórico, reamostrados como cada modelo
+            d = tpl.durations[usable, None]
+            queries.append(resample(times, feats, t - d + d * np.linspace(0.0, 1.0, m)[None]))
+            rows.append(np.full(len(usable), row))
+            tpls.append(usable)
+        self.stats['calls'] += 1
+        if not rows:
+            return result
+
+        pairs = np.stack([np.concatenate(rows), np.concatenate(tpls)], axis=1)
+        queries = np.concatenate(queries)
+        templates = tpl.series[pairs[:, 1]]
+        limits = tpl.thresholds[pairs[:, 1]] * m
+        costs = np.full(len(pairs), np.inf)
+        self.stats['pairs'] += len(pairs)
+
+        if self.use_bounds:
+            lb = np.maximum(lb_kim(queries, templates),
+                            lb_keogh(queries, self.upper[pairs[:, 1]], self.lower[pairs[:, 1]]))
+            # Um só DTW para todos os pares que sobram, cada um abandonado quando passa o seu limiar:
+            # cada chamada custa um ciclo de M linhas, por isso não compensa uma primeira volta só para apertar limites
+            rest = np.flatnonzero(lb <= limits)
+            self.stats['pruned'] += len(pairs) - len(rest)
+        else:
+            rest = np.arange(len(pairs))
+            limits = np.full(len(pairs), np.inf)
+        if len(rest):
+            costs[rest] = dtw_batch(queries[rest], templates[rest], self.band, limits[rest])
+        self.stats['abandoned'] += int(np.isinf(costs[rest]).sum())
+
+        # Vizinho mais próximo: cada track fica com o modelo de menor custo, se estiver abaixo do limiar
+        costs /= m
+        order = np.lexsort((costs, pairs[:, 0]))
+        nearest = order[np.r_[True, pairs[order[1:], 0] != pairs[order[:-1], 0]]]
+        nearest = nearest[costs[nearest] <= tpl.thresholds[pairs[nearest, 1]]]
+        self.stats['matched'] += len(nearest)
+        result[pairs[nearest, 0], tpl.gesture_index[pairs[nearest, 1]]] = True
+        return result
+
+
+# ------------------------ BENCHMARK ------------------------
+
+def synthetic_motion(name, duration, fps=30.0, phase=0.0, rng=None):
+    """Features (N, 16) de um aceno ou de uma marcha sintéticos, para testar sem gravações."""
+    rng = rng or np.random.default_rng(0)
+    t = np.arange(0.0, duration, 1.0 / fps)
+    base = np.tile([0.5, -1.0, -0.5, -1.0, 0.6, -0.3, -0.6, -0.3, 0.2, 0.8, -0.2, 0.8, 0.2, 1.6, -0.2, 1.6],
+                   (len(t), 1)).astype(np.float64)
+    w = 2 * math.pi * 1.5 * t + phase
+    col = {'WAVE_RIGHT': 6, 'WAVE_LEFT': 4, 'MARCH_RIGHT': 11, 'MARCH_LEFT': 9}[name]
+    if name.startswith('WAVE'):
+        base[:, col] += 0.4 * np.sin(w)
+        base[:, col + 1] -= 1.2
+    else:
+        base[:, col] -= 0.3 * np.maximum(np.sin(w), 0)
+        base[:, col + 4] -= 0.3 * np.maximum(np.sin(w), 0)
+    return t, base + rng.normal(0, 0.02, base.shape)
+
+
+def benchmark(players=5, frames=90, repeats_per_gesture=2, interval=0.1):
+    rng = np.random.default_rng(1)
+    names, series, durations = [], [], []
+    for name in ('WAVE_RIGHT', 'WAVE_LEFT', 'MARCH_RIGHT', 'MARCH_LEFT'):
+        for r in range(repeats_per_gesture):
+            times, feats = synthetic_motion(name, 1.0 + 0.2 * r, rng=rng)
+            names.append(name)
+            series.append(resample(times, feats, np.linspace(times[0], times[-1], 24)))
+            durations.append(times[-1] - times[0])
+    templates = MotionTemplates(names, series, durations, [0.3] * len(names))
+
+    motions = ['WAVE_RIGHT', 'MARCH_LEFT', 'WAVE_LEFT', 'MARCH_RIGHT', 'WAVE_RIGHT'][:players]
+    clips = [synthetic_motion(n, 6.0, phase=i, rng=rng)[1] for i, n in enumerate(motions)]
+    # A última pessoa fica parada, para haver pares que os limites inferiores descartam
+    clips[-1][:] = clips[-1][:1]
+
+    print(f"{players} pessoas, {len(templates)} modelos, {frames} frames a 30 fps, comparação a cada {interval} s")
+    print(f"{'limites':<8} {'us/comp.':>9} {'us/frame':>9} {'pares':>7} {'descartados':>12} {'abandonados':>12} "
+          f"{'iguais':>7}")
+    for use_bounds in (False, True):
+        rec = MotionRecognizer(templates, players, interval=interval, use_bounds=use_bounds)
+        slots = np.arange(players)
+        elapsed, hits = 0.0, np.zeros((players, len(GESTURES)), dtype=np.int64)
+        for f in range(len(clips[0])):
+            t = f / 30.0
+            rec.history.push(slots, np.stack([c[f] for c in clips]), t)
+            if f < len(clips[0]) - frames:
+                continue
+            start = time.perf_counter()
+            hits += rec.match(slots, t)
+            elapsed += time.perf_counter() - start
+        s = rec.stats
+        label = 'sim' if use_bounds else 'não'
+        print(f"{label:<8} {elapsed / s['calls'] * 1e6:>9.0f} {elapsed / frames * 1e6:>9.0f} {s['pairs']:>7} "
+              f"{s['pruned']:>12} {s['abandoned']:>12} {s['matched']:>7}")
+    for p, name in enumerate(motions):
+        found = [GESTURES[g] for g in np.flatnonzero(hits[p])]
+        print(f"  pessoa {p} ({name if p < players - 1 else 'parada'}): {', '.join(found) or '-'}")
+
+
+def main():
+    if len(sys.argv) >= 4 and sys.argv[1] == 'build':
+        templates = MotionTemplates.from_sessions(sys.argv[3:])
+        templates.save(sys.argv[2])
+        print(f"{len(templates)} modelos gravados em {sys.argv[2]}")
+    elif len(sys.argv) >= 2 and sys.argv[1] == 'bench':
+        benchmark()
+    else:
+        print("Uso: python motion.py build modelos.npz GESTO=sessao.npz [...]")
+        print("     python motion.py bench")
+
+
+if __name__ == '__main__':
+    main()
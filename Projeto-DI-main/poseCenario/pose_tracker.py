@@ -0,0 +1,407 @@
+import os
+import threading
+import time
+import math
+
+import cv2
+import numpy as np
+import mediapipe as mp
+
+from filters import make_filter
+from sessions import SessionRecorder
+from reid import ReIdGallery, bone_signatures
+from gestures import GESTURES, POSE_RULES, score_gestures, top_gesture
+from gesture_state import GestureStateMachine
+from gesture_model import GestureModel
+from motion import MotionEnergy, MotionRecognizer, MotionTemplates, motion_energy
+from events import EventBus, SWIPE, SWIPE_LEFT, SWIPE_RIGHT
+from model_files import ensure_model
+from snapshot import PoseSnapshot, SnapshotReader, landmarks_to_array, world_to_array, NUM_CHANNELS
+
+MAX_PEOPLE = 5
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_FILE = os.path.join(SCRIPT_DIR, 'pose_landmarker_full.task')
+MODEL_URL = 'https://storage.googleapis.com/mediapipe-models/pose_landmarker/pose_landmarker_full/float16/1/pose_landmarker_full.task'
+
+# ------------------------ POSE TRACKER (THREAD) ------------------------
+class PoseTracker(SnapshotReader):
+
+    def __init__(self, max_people=MAX_PEOPLE, smoothing='one_euro', smoothing_preset='gesture', record_path=None,
+                 prediction_horizon=0.1, prediction_max_offset=0.05, world_landmarks=False, reid_ttl=5.0, gesture_model=None,
+                 motion_templates=None):
+        ensure_model(MODEL_FILE, MODEL_URL)
+
+        from mediapipe.tasks.python import BaseOptions
+        from mediapipe.tasks.python.vision import PoseLandmarker, PoseLandmarkerOptions, RunningMode
+
+        base_options = BaseOptions(model_asset_path=MODEL_FILE, delegate='GPU')
+        options = PoseLandmarkerOptions(
+            base_options=base_options,
+            running_mode=RunningMode.VIDEO,
+            num_poses=MAX_PEOPLE,
+            min_pose_detection_confidence=0.6,
+            min_pose_presence_confidence=0.6,
+            min_tracking_confidence=0.6,
+        )
+        self.detector = PoseLandmarker.create_from_options(options)
+        
+        self.mp_hands = mp.solutions.hands
+        self.hands_detector = self.mp_hands.Hands(
+            max_num_hands=1,
+            min_detection_confidence=0.7,
+            min_tracking_confidence=0.7
+        )
+
+        # As poses são publicadas em self.snapshot; gestos e swipes como eventos (ver subscribe)
+        self.snapshot = PoseSnapshot.empty(num_gestures=len(GESTURES))
+        self.version = 0
+        # Chamado na thread de captura depois de cada publicação (usado pelo modo multiprocesso)
+        self.on_publish = None
+        self.running = False
+        self.thread = None
+        self.max_people = max_people
+        
+        self.tracks = {}
+        self.next_track_id = 0
+
+        # Um slot do filtro por track; smoothing_preset='lobby' suaviza mais, 'gesture' responde mais depressa
+        # x, y, z, visibilidade e presença passam todos pelo mesmo filtro
+        self.filter = make_filter(smoothing, max_people, smoothing_preset, channels=NUM_CHANNELS)
+        self.world_filter = make_filter(smoothing, max_people, smoothing_preset, channels=3) if world_landmarks else None
+        self.free_slots = list(range(max_people))
+        # gesture_model: caminho de um modelo treinado com gesture_model.py, usado em vez das regras
+        self.score_gestures = GestureModel.load(gesture_model).score if gesture_model else score_gestures
+        # Histerese, tempo mínimo e repetição de cada gesto por track (usa o mesmo slot do filtro)
+        self.gesture_states = GestureStateMachine.from_rules(POSE_RULES, max_people)
+        # motion_templates: modelos gravados com motion.py; os gestos que lá estão passam a ser reconhecidos
+        # pelo movimento do último segundo (DTW) em vez de pela pose de um só frame
+        self.motion = MotionRecognizer(MotionTemplates.load(motion_templates), max_people) if motion_templates else None
+        # Quanto cada pessoa se mexe, qualquer que seja o movimento (publicado em snapshot.energy)
+        self.energy = MotionEnergy(max_people)
+        self.recorder = SessionRecorder(record_path) if record_path else None
+        # Tracks perdidas há menos de reid_ttl segundos recuperam o id se as proporções do corpo baterem certo
+        self.reid = ReIdGallery(ttl=reid_ttl)
+        self.reid_ttl = reid_ttl
+        self.prediction_horizon = prediction_horizon
+        self.prediction_max_offset = prediction_max_offset
+        
+        self.events = EventBus()
+        self.swipe_start_x = None
+        self.swipe_threshold = 0.2
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+        try:
+            self.detector.close()
+        except Exception:
+            pass
+        try:
+            self.hands_detector.close()
+        except Exception:
+            pass
+        if self.recorder is not None:
+            self.recorder.save()
+
+    def _published_world(self, sorted_tracks):
+        if self.world_filter is None:
+            return None
+        # Tracks que ainda não receberam world landmarks ficam a zeros
+        return [t['world'] if t['world'] is not None else np.zeros((len(t['smoothed']), 3))
+                for _, t in sorted_tracks]
+
+    def get_snapshot(self):
+        return self.snapshot
+
+    def subscribe(self, capacity=256):
+        """Fila própria de eventos (gestos START/REPEAT/END e swipes), sem perdas enquanto não encher."""
+        return self.events.subscribe(capacity)
+
+    def _nearest_track(self, point):
+        """Track com um pulso mais perto do ponto (x, y), ou -1."""
+        best, best_dist = -1, 0.25
+        for t_id, track in self.tracks.items():
+            wrists = track['smoothed'][[15, 16], :2]
+            dist = float(np.hypot(*(wrists - point).T).min())
+            if dist < best_dist:
+                best, best_dist = t_id, dist
+        return best
+
+    def _capture_loop(self):
+        cap = None
+        # Tentar múltiplos backends e índices de câmera
+        backends = [
+            (cv2.CAP_DSHOW, "DirectShow"),
+            (cv2.CAP_MSMF, "Media Foundation"),
+            (cv2.CAP_ANY, "Auto")
+        ]
+        camera_indices = [0, 1, 2]
+        
+        for idx in camera_indices:
+            for backend, backend_name in backends:
+                try:
+                    print(f"Tentando câmera {idx} com {backend_name}...")
+                    cap = cv2.VideoCapture(idx, backend)
+                    if cap.isOpened():
+                        ret, frame = cap.read()
+                        if ret and frame is not None:
+                            print(f"✓ Câmera {idx} aberta com {backend_name}")
+                            # Otimizações
+                            cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+                            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+                            cap.set(cv2.CAP_PROP_FPS, 30)
+                            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+                            break
+                        cap.release()
+                except:
+                    continue
+            if cap and cap.isOpened():
+                break
+        
+        if not cap or not cap.isOpened():
+            print("ERRO: Não foi possível abrir a câmera!")
+            self.running = False
+            return
+            
+        print(f"Webcam aberta com sucesso")
+
+        timestamp = 0
+        while self.running:
+            ret, frame = cap.read()
+            if not ret:
+                time.sleep(0.001)   
+                continue
+            frame_time = time.perf_counter()
+            aspect = frame.shape[1] / frame.shape[0]
+
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb)
+
+            # Swipes ficam pendentes até ao fim do tracking, para saber de que track é a mão
+            swipes = []
+            try:
+                hands_results = self.hands_detector.process(rgb)
+                if hands_results.multi_hand_landmarks:
+                    for hand_landmarks in hands_results.multi_hand_landmarks:
+                        index_tip_x = hand_landmarks.landmark[8].x
+                        wrist = (hand_landmarks.landmark[0].x, hand_landmarks.landmark[0].y)
+                        
+                        if self.swipe_start_x is None:
+                            self.swipe_start_x = index_tip_x
+                        
+                        diff = index_tip_x - self.swipe_start_x
+                        
+                        if diff > self.swipe_threshold:
+                            swipes.append((SWIPE_RIGHT, wrist))
+                            self.swipe_start_x = index_tip_x
+                        elif diff < -self.swipe_threshold:
+                            swipes.append((SWIPE_LEFT, wrist))
+                            self.swipe_start_x = index_tip_x
+                else:
+                    self.swipe_start_x = None
+            except Exception:
+                pass
+
+            try:
+                results = self.detector.detect_for_video(mp_image, timestamp)
+            except Exception as e:
+                results = None
+
+            timestamp += 33
+
+            candidates = []
+            if results and results.pose_landmarks:
+                world = results.pose_world_landmarks if self.world_filter is not None else None
+                for i, person in enumerate(results.pose_landmarks):
+                    lm = landmarks_to_array(person)
+                    if len(lm):
+                        cx, cy = lm[:, :2].mean(axis=0)
+                    else:
+                        cx, cy = 0.5, 0.5
+                    
+                    candidates.append({
+                        'pose': lm,
+                        'world': world_to_array(world[i]) if world and i < len(world) else None,
+                        'centroid': (cx, cy),
+                    })
+                # Gestos de todas as pessoas do frame numa só passagem
+                codes, scores, vectors = self.score_gestures(np.stack([c['pose'] for c in candidates]))
+                for cand, code, score, vector in zip(candidates, codes.tolist(), scores.tolist(), vectors):
+                    cand['gesture'] = (GESTURES[code] if code >= 0 else None, score)
+                    cand['scores'] = vector
+
+            used_candidates = set()
+            matched = []
+            matched_world = []
+            
+            for t_id, track in list(self.tracks.items()):
+                best_idx = -1
+                min_dist = 0.25
+                
+                lcx, lcy = track['last_centroid']
+                
+                for i, cand in enumerate(candidates):
+                    if i in used_candidates:
+                        continue
+                    
+                    dist = math.hypot(cand['centroid'][0] - lcx, cand['centroid'][1] - lcy)
+                    if dist < min_dist:
+                        min_dist = dist
+                        best_idx = i
+                
+                if best_idx != -1:
+                    cand = candidates[best_idx]
+                    track['last_centroid'] = cand['centroid']
+                    track['gesture'] = cand['gesture']
+                    track['scores'] = cand['scores']
+                    track['missing'] = 0
+                    track['last_seen'] = frame_time
+                    matched.append((t_id, cand['pose']))
+                    if cand['world'] is not None:
+                        matched_world.append((t_id, cand['world']))
+                    used_candidates.add(best_idx)
+                else:
+                    track['missing'] += 1
+                    track['gesture'] = (None, 0)
+                    track['scores'] = np.zeros(len(GESTURES), dtype=np.int64)
+
+            keys_to_remove = [k for k, v in self.tracks.items() if v['missing'] > 15]
+            for k in keys_to_remove:
+                track = self.tracks.pop(k)
+                self.free_slots.append(track['slot'])
+                for event in self.gesture_states.release_slot(track['slot'], k, frame_time):
+                    self.events.emit(event.time, event.track_id, event.gesture, event.kind, event.score)
+                count = track['sig_count']
+                self.reid.add(k, track['sig_sum'] / np.maximum(count, 1), (count >= 3).astype(np.float64),
+                              track['created'], frame_time)
+
+            if matched:
+                slots = [self.tracks[t_id]['slot'] for t_id, _ in matched]
+                smoothed = self.filter.update(slots, np.stack([pose for _, pose in matched]), frame_time)
+                velocities = self.filter.velocity(slots)
+                sigs, sig_w = bone_signatures(np.stack([pose for _, pose in matched]), aspect)
+                for (t_id, _), pose, vel, sig, w in zip(matched, smoothed, velocities, sigs, sig_w):
+                    track = self.tracks[t_id]
+                    track['smoothed'] = pose
+                    track['velocity'] = vel
+                    track['timestamp'] = frame_time
+                    track['sig_sum'] += sig * w
+                    track['sig_count'] += w
+
+            # Tracks que recebem world landmarks pela primeira vez começam o filtro do zero
+            fresh = {t_id for t_id, _ in matched_world if self.tracks[t_id]['world'] is None}
+            for t_id, world in matched_world:
+                if t_id in fresh:
+                    self.world_filter.reset(self.tracks[t_id]['slot'], world, frame_time)
+                    self.tracks[t_id]['world'] = world
+            matched_world = [m for m in matched_world if m[0] not in fresh]
+            if matched_world:
+                slots = [self.tracks[t_id]['slot'] for t_id, _ in matched_world]
+                smoothed = self.world_filter.update(slots, np.stack([w for _, w in matched_world]), frame_time)
+                for (t_id, _), world in zip(matched_world, smoothed):
+                    self.tracks[t_id]['world'] = world
+
+            new_cands = [cand for i, cand in enumerate(candidates) if i not in used_candidates]
+            new_cands = new_cands[:min(self.max_people - len(self.tracks), len(self.free_slots))]
+            if new_cands:
+                sigs, sig_w = bone_signatures(np.stack([c['pose'] for c in new_cands]), aspect)
+                returning = self.reid.match(sigs, sig_w, frame_time)
+            else:
+                sigs, sig_w, returning = [], [], []
+            for cand, sig, w, known in zip(new_cands, sigs, sig_w, returning):
+                if known is not None:
+                    t_id, created = known
+                else:
+                    t_id, created = self.next_track_id, frame_time
+                    self.next_track_id += 1
+                slot = self.free_slots.pop()
+                self.filter.reset(slot, cand['pose'], frame_time)
+                self.gesture_states.reset(slot, frame_time)
+                self.energy.reset(slot, frame_time)
+                if self.motion is not None:
+                    self.motion.reset(slot)
+                if cand['world'] is not None:
+                    self.world_filter.reset(slot, cand['world'], frame_time)
+                self.tracks[t_id] = {
+                    'slot': slot,
+                    'smoothed': cand['pose'],
+                    'velocity': np.zeros_like(cand['pose']),
+                    'world': cand['world'],
+                    'timestamp': frame_time,
+                    'created': created,
+                    'last_seen': frame_time,
+                    'last_centroid': cand['centroid'],
+                    'gesture': cand['gesture'],
+                    'scores': cand['scores'],
+                    'missing': 0,
+                    'sig_sum': sig * w,
+                    'sig_count': w.copy(),
+                }
+                matched.append((t_id, cand['pose']))
+
+            if self.motion is not None and matched:
+                slots = [self.tracks[t_id]['slot'] for t_id, _ in matched]
+                self.motion.push(slots, np.stack([self.tracks[t_id]['smoothed'] for t_id, _ in matched]), frame_time)
+                found = self.motion.match(slots, frame_time)
+                for (t_id, _), hits in zip(matched, found):
+                    track = self.tracks[t_id]
+                    track['scores'] = np.where(self.motion.covered, hits * POSE_RULES.scores, track['scores'])
+                    track['gesture'] = top_gesture(track['scores'])
+
+            if self.recorder is not None:
+                for t_id, pose in matched:
+                    self.recorder.add(frame_time, t_id, pose)
+
+            # Evidência do frame: 1 em todos os gestos com pontos em cada track (0 nas tracks sem deteção)
+            state_ids = list(self.tracks)
+            if state_ids:
+                state_slots = [self.tracks[t_id]['slot'] for t_id in state_ids]
+                evidence = np.stack([self.tracks[t_id]['scores'] for t_id in state_ids]) > 0
+                for event in self.gesture_states.update(state_slots, state_ids, evidence, frame_time):
+                    self.events.emit(event.time, event.track_id, event.gesture, event.kind, event.score)
+                # Tracks sem deteção neste frame não contam como movimento: a energia delas decai
+                tracks = [self.tracks[t_id] for t_id in state_ids]
+                seen = np.array([t['missing'] == 0 for t in tracks])
+                energy = motion_energy(np.stack([t['smoothed'] for t in tracks]),
+                                       np.stack([t['velocity'] for t in tracks])) * seen
+                self.energy.update(state_slots, energy, frame_time)
+            for name, wrist in swipes:
+                self.events.emit(frame_time, self._nearest_track(np.array(wrist)), name, SWIPE)
+
+            sorted_tracks = sorted(self.tracks.items(), key=lambda kv: kv[1]['last_centroid'][0])
+            sorted_slots = [t['slot'] for _, t in sorted_tracks]
+            
+            # Publicação: um snapshot novo por frame, trocado atomicamente (sem lock)
+            self.version += 1
+            self.snapshot = PoseSnapshot(
+                self.version,
+                track_ids=[t_id for t_id, _ in sorted_tracks],
+                created=[t['created'] for _, t in sorted_tracks],
+                last_seen=[t['last_seen'] for _, t in sorted_tracks],
+                poses=[t['smoothed'] for _, t in sorted_tracks],
+                velocities=[t['velocity'] for _, t in sorted_tracks],
+                timestamps=[t['timestamp'] for _, t in sorted_tracks],
+                gestures=[t['gesture'] for _, t in sorted_tracks],
+                world=self._published_world(sorted_tracks),
+                gesture_scores=[t['scores'] for _, t in sorted_tracks],
+                gesture_levels=self.gesture_states.level[sorted_slots],
+                gesture_active=self.gesture_states.active[sorted_slots],
+                events=self.events.recent,
+                num_gestures=len(GESTURES),
+                energy=self.energy.level[sorted_slots],
+            )
+            if self.on_publish is not None:
+                self.on_publish(self.snapshot)
+
+            time.sleep(0.005)
+
+        cap.release()
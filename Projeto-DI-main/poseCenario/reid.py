@@ -0,0 +1,106 @@
+import numpy as np
+
+from snapshot import VISIBILITY, PRESENCE
+
+# Ossos usados na assinatura: proporções do corpo que não mudam com a pose.
+# Os dois primeiros (tronco) dão a escala.
+BONES = np.array([
+    (11, 23), (12, 24),  # tronco
+    (11, 12),            # ombros
+    (23, 24),            # ancas
+    (11, 13), (12, 14),  # braços
+    (13, 15), (14, 16),  # antebraços
+    (23, 25), (24, 26),  # coxas
+    (25, 27), (26, 28),  # canelas
+])
+
+
+def bone_signatures(poses, aspect=1.0, threshold=0.5):
+    """Comprimentos dos ossos divididos pelo comprimento do tronco, para várias pessoas de uma vez.
+
+    poses: (P, 33, C) com os canais do tracker. aspect = largura/altura da imagem,
+    para que x e y tenham a mesma escala. Devolve (assinaturas (P, B), pesos (P, B));
+    o peso é 0 nos ossos com alguma ponta pouco confiável, e em todos se o tronco não se vê.
+    """
+    poses = np.asarray(poses)
+    a, b = BONES[:, 0], BONES[:, 1]
+    d = poses[:, a, :2] - poses[:, b, :2]
+    d[..., 0] *= aspect
+    lengths = np.hypot(d[..., 0], d[..., 1])
+
+    conf = np.minimum(poses[..., VISIBILITY], poses[..., PRESENCE])
+    weights = (np.minimum(conf[:, a], conf[:, b]) > threshold).astype(np.float64)
+
+    torso = lengths[:, :2].mean(axis=1, keepdims=True)
+    torso_ok = (weights[:, :2].min(axis=1, keepdims=True) > 0) & (torso > 1e-3)
+    weights = weights * torso_ok
+    sig = np.where(torso_ok, lengths / np.maximum(torso, 1e-3), 0.0)
+    return sig, weights
+
+
+def signature_distance(sigs, weights, gallery, gallery_weights):
+    """Distância média ponderada entre cada assinatura (K, B) e cada entrada da galeria (N, B) -> (K, N)."""
+    w = weights[:, None, :] * gallery_weights[None, :, :]
+    diff = np.abs(sigs[:, None, :] - gallery[None, :, :]) * w
+    n = w.sum(axis=2)
+    return np.where(n >= 4, diff.sum(axis=2) / np.maximum(n, 1), np.inf)
+
+
+class ReIdGallery:
+    """Galeria limitada de tracks perdidas, para devolver a identidade a quem volta.
+
+    Ocupa arrays de tamanho fixo (max_entries); quando enche, sai a entrada perdida há mais tempo.
+    Entradas com mais de `ttl` segundos expiram.
+    """
+
+    def __init__(self, max_entries=16, ttl=5.0, threshold=0.06, num_bones=len(BONES)):
+        self.ttl = ttl
+        self.threshold = threshold
+        self.signatures = np.zeros((max_entries, num_bones))
+        self.weights = np.zeros((max_entries, num_bones))
+        self.track_ids = np.full(max_entries, -1, dtype=np.int64)
+        self.created = np.zeros(max_entries)
+        self.lost_at = np.zeros(max_entries)
+        self.valid = np.zeros(max_entries, dtype=bool)
+
+    def __len__(self):
+        return int(self.valid.sum())
+
+    def expire(self, now):
+        self.valid &= (now - self.lost_at) <= self.ttl
+
+    def add(self, track_id, signature, weights, created, now):
+        if weights.sum() < 4:
+            return
+        self.expire(now)
+        free = np.flatnonzero(~self.valid)
+        idx = free[0] if len(free) else int(np.argmin(self.lost_at))
+        self.signatures[idx] = signature
+        self.weights[idx] = weights
+        self.track_ids[idx] = track_id
+        self.created[idx] = created
+        self.lost_at[idx] = now
+        self.valid[idx] = True
+
+    def match(self, signatures, weights, now):
+        """Para cada candidata devolve (track_id, created) recuperados, ou None.
+
+        Cada entrada da galeria só pode ser usada uma vez; os pares mais próximos ganham.
+        """
+        result = [None] * len(signatures)
+        self.expire(now)
+        if not len(signatures) or not self.valid.any():
+            return result
+
+        entries = np.flatnonzero(self.valid)
+        dist = signature_distance(signatures, weights, self.signatures[entries], self.weights[entries])
+        dist[dist > self.threshold] = np.inf
+
+        while np.isfinite(dist).any():
+            k, n = np.unravel_index(np.argmin(dist), dist.shape)
+            idx = entries[n]
+            result[k] = (int(self.track_ids[idx]), float(self.created[idx]))
+            self.valid[idx] = False
+            dist[k, :] = np.inf
+            dist[:, n] = np.inf
+        return result
@@ -0,0 +1,44 @@
+import os
+
+import numpy as np
+
+
+class SessionRecorder:
+    """Guarda os landmarks brutos de cada track para análise offline (.npz)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.times = []
+        self.track_ids = []
+        self.poses = []
+
+    def add(self, t, track_id, pose):
+        self.times.append(t)
+        self.track_ids.append(track_id)
+        self.poses.append(np.asarray(pose, dtype=np.float32))
+
+    def save(self):
+        if not self.poses:
+            return
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        np.savez_compressed(
+            self.path,
+            times=np.asarray(self.times, dtype=np.float64),
+            track_ids=np.asarray(self.track_ids, dtype=np.int64),
+            poses=np.stack(self.poses),
+        )
+        print(f"Sessão gravada em {self.path} ({len(self.poses)} amostras)")
+
+
+def load_session(path):
+    """Devolve {track_id: (times, poses)} com as amostras ordenadas no tempo."""
+    data = np.load(path)
+    times, track_ids, poses = data['times'], data['track_ids'], data['poses']
+    session = {}
+    for t_id in np.unique(track_ids):
+        idx = np.flatnonzero(track_ids == t_id)
+        idx = idx[np.argsort(times[idx], kind='stable')]
+        session[int(t_id)] = (times[idx], poses[idx].astype(np.float64))
+    return session
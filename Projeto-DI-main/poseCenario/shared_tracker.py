@@ -0,0 +1,237 @@
+import os
+import multiprocessing
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from gestures import GESTURES
+from gesture_state import GestureEvent
+from events import EventBus, SWIPE_LEFT, SWIPE_RIGHT
+from pose_tracker import PoseTracker, MAX_PEOPLE
+from snapshot import PoseSnapshot, SnapshotReader, NUM_CHANNELS
+
+GESTURE_CODES = {name: i for i, name in enumerate(GESTURES)}
+# Nomes e tipos que podem aparecer no anel de eventos (guardados como índices)
+EVENT_NAMES = GESTURES + [SWIPE_LEFT, SWIPE_RIGHT]
+EVENT_KINDS = ('start', 'repeat', 'end', 'swipe')
+# Capacidade do anel de eventos; um leitor só perde eventos se ficar mais de EVENT_RING eventos para trás
+EVENT_RING = 64
+
+
+def record_dtype(max_people, num_landmarks=33, num_gestures=len(GESTURES)):
+    """Layout fixo do bloco partilhado. `seq` é o seqlock: ímpar enquanto o escritor está a meio."""
+    return np.dtype([
+        ('seq', np.uint64),
+        ('version', np.uint64),
+        ('count', np.int64),
+        ('track_ids', np.int64, (max_people,)),
+        ('created', np.float64, (max_people,)),
+        ('last_seen', np.float64, (max_people,)),
+        ('timestamps', np.float64, (max_people,)),
+        ('gesture', np.int64, (max_people,)),
+        ('score', np.int64, (max_people,)),
+        ('poses', np.float64, (max_people, num_landmarks, NUM_CHANNELS)),
+        ('velocities', np.float64, (max_people, num_landmarks, NUM_CHANNELS)),
+        ('scores', np.int32, (max_people, num_gestures)),
+        ('levels', np.float64, (max_people, num_gestures)),
+        ('active', np.bool_, (max_people, num_gestures)),
+        ('energy', np.float64, (max_people,)),
+        # Anel de eventos: a entrada de seq s fica na posição s % EVENT_RING
+        ('ev_seq', np.int64, (EVENT_RING,)),
+        ('ev_time', np.float64, (EVENT_RING,)),
+        ('ev_track', np.int64, (EVENT_RING,)),
+        ('ev_gesture', np.int64, (EVENT_RING,)),
+        ('ev_kind', np.int64, (EVENT_RING,)),
+        ('ev_score', np.int64, (EVENT_RING,)),
+    ])
+
+
+class SharedPoseWriter:
+    """Lado do processo do tracker: copia cada snapshot para o bloco partilhado."""
+
+    def __init__(self, buf, max_people):
+        self.max_people = max_people
+        self.record = np.ndarray((), dtype=record_dtype(max_people), buffer=buf)
+
+    def write(self, snapshot):
+        rec = self.record
+        seq = int(rec['seq'])
+        rec['seq'] = seq + 1
+
+        n = min(len(snapshot), self.max_people)
+        rec['version'] = snapshot.version
+        rec['count'] = n
+        rec['track_ids'][:n] = snapshot.track_ids[:n]
+        rec['created'][:n] = snapshot.created[:n]
+        rec['last_seen'][:n] = snapshot.last_seen[:n]
+        rec['timestamps'][:n] = snapshot.timestamps[:n]
+        rec['poses'][:n] = snapshot.poses[:n]
+        rec['velocities'][:n] = snapshot.velocities[:n]
+        for i, (gesture, score) in enumerate(snapshot.gestures[:n]):
+            rec['gesture'][i] = GESTURE_CODES.get(gesture, -1)
+            rec['score'][i] = score
+        rec['scores'][:n] = snapshot.gesture_scores[:n]
+        rec['levels'][:n] = snapshot.gesture_levels[:n]
+        rec['active'][:n] = snapshot.gesture_active[:n]
+        rec['energy'][:n] = snapshot.energy[:n]
+        for event in snapshot.events:
+            i = event.seq % EVENT_RING
+            if rec['ev_seq'][i] == event.seq:
+                continue
+            rec['ev_seq'][i] = event.seq
+            rec['ev_time'][i] = event.time
+            rec['ev_track'][i] = event.track_id
+            rec['ev_gesture'][i] = EVENT_NAMES.index(event.gesture)
+            rec['ev_kind'][i] = EVENT_KINDS.index(event.kind)
+            rec['ev_score'][i] = event.score
+
+        rec['seq'] = seq + 2
+
+
+def run_tracker_process(shm_name, max_people, tracker_kwargs, stop_event):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    if os.name == 'posix':
+        # O attach também regista o bloco no resource_tracker; só o processo principal o deve remover
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        except Exception:
+            pass
+    writer = SharedPoseWriter(shm.buf, max_people)
+    tracker = PoseTracker(max_people=max_people, **tracker_kwargs)
+
+    def wait_for_stop():
+        stop_event.wait()
+        tracker.running = False
+
+    tracker.on_publish = writer.write
+    tracker.running = True
+    threading.Thread(target=wait_for_stop, daemon=True).start()
+    try:
+        tracker._capture_loop()
+    finally:
+        tracker.running = False
+        tracker.stop()
+        writer.record = None
+        shm.close()
+
+
+class SharedPoseTracker(SnapshotReader):
+    """PoseTracker a correr noutro processo, com a mesma API de leitura.
+
+    A captura, o MediaPipe, o tracking e a suavização deixam de disputar o GIL com a janela.
+    Os resultados chegam por memória partilhada com layout fixo; a leitura usa um seqlock,
+    por isso nunca bloqueia o escritor (no pior caso devolve o snapshot anterior).
+    """
+
+    def __init__(self, max_people=MAX_PEOPLE, **tracker_kwargs):
+        self.max_people = max_people
+        self.prediction_horizon = tracker_kwargs.get('prediction_horizon', 0.1)
+        self.prediction_max_offset = tracker_kwargs.get('prediction_max_offset', 0.05)
+        self.reid_ttl = tracker_kwargs.get('reid_ttl', 5.0)
+
+        dtype = record_dtype(max_people)
+        self.shm = shared_memory.SharedMemory(create=True, size=dtype.itemsize)
+        np.ndarray((dtype.itemsize,), dtype=np.uint8, buffer=self.shm.buf)[:] = 0
+        self.record = np.ndarray((), dtype=dtype, buffer=self.shm.buf)
+
+        ctx = multiprocessing.get_context('spawn')
+        self.stop_event = ctx.Event()
+        self.process = ctx.Process(
+            target=run_tracker_process,
+            args=(self.shm.name, max_people, tracker_kwargs, self.stop_event),
+            daemon=True,
+        )
+        self.snapshot = PoseSnapshot.empty(num_gestures=len(GESTURES))
+        # Os eventos do anel partilhado passam para filas locais, uma por consumidor
+        self.events = EventBus()
+        self.running = False
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.process.start()
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        self.stop_event.set()
+        self.process.join(timeout=2.0)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.record = None
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _read(self, fields, retries=100):
+        """Leitura consistente de alguns campos; None se o escritor não largou o seqlock a tempo."""
+        rec = self.record
+        if rec is None:
+            return None
+        for _ in range(retries):
+            seq = int(rec['seq'])
+            if seq & 1:
+                continue
+            values = [rec[f].copy() for f in fields]
+            if int(rec['seq']) == seq:
+                return values
+        return None
+
+    def get_snapshot(self):
+        if self.record is None or int(self.record['version']) == self.snapshot.version:
+            return self.snapshot
+        fields = ('version', 'count', 'track_ids', 'created', 'last_seen', 'timestamps',
+                  'poses', 'velocities', 'gesture', 'score', 'scores', 'levels', 'active',
+                  'energy', 'ev_seq', 'ev_time', 'ev_track', 'ev_gesture', 'ev_kind', 'ev_score')
+        values = self._read(fields)
+        if values is None:
+            return self.snapshot
+        (version, n, ids, created, last_seen, stamps, poses, velocities, gesture, score, scores, levels, active,
+         energy, ev_seq, ev_time, ev_track, ev_gesture, ev_kind, ev_score) = values
+        n = int(n)
+        events = self._ring_events(ev_seq, ev_time, ev_track, ev_gesture, ev_kind, ev_score)
+        self.snapshot = PoseSnapshot(
+            int(version), ids[:n], created[:n], last_seen[:n], poses[:n], velocities[:n], stamps[:n],
+            [(GESTURES[g] if g >= 0 else None, int(sc)) for g, sc in zip(gesture[:n].tolist(), score[:n].tolist())],
+            gesture_scores=scores[:n], gesture_levels=levels[:n], gesture_active=active[:n], events=events, num_gestures=len(GESTURES),
+            energy=energy[:n],
+        )
+        return self.snapshot
+
+    @staticmethod
+    def _ring_events(seq, times, tracks, names, kinds, scores):
+        order = [i for i in np.argsort(seq).tolist() if seq[i] > 0]
+        return [GestureEvent(int(seq[i]), float(times[i]), int(tracks[i]), EVENT_NAMES[names[i]],
+                             EVENT_KINDS[kinds[i]], int(scores[i])) for i in order]
+
+    def subscribe(self, capacity=256):
+        return self.events.subscribe(capacity, pump=self._pump)
+
+    def _pump(self):
+        """Traz do anel partilhado os eventos ainda não vistos; os que o anel já perdeu contam como descartados."""
+        values = self._read(('ev_seq', 'ev_time', 'ev_track', 'ev_gesture', 'ev_kind', 'ev_score'))
+        if values is None:
+            return
+        for event in self._ring_events(*values):
+            if event.seq <= self.events.seq:
+                continue
+            lost = event.seq - self.events.seq - 1
+            if lost > 0:
+                for queue in self.events.queues:
+                    queue.dropped += lost
+            self.events.publish(event)
+
+
+def create_tracker(max_people=MAX_PEOPLE, use_process=None, **kwargs):
+    """PoseTracker em thread (padrão) ou noutro processo, se use_process ou POSE_PROCESS=1."""
+    if use_process is None:
+        use_process = os.environ.get('POSE_PROCESS') == '1'
+    if use_process:
+        return SharedPoseTracker(max_people=max_people, **kwargs)
+    return PoseTracker(max_people=max_people, **kwargs)
@@ -0,0 +1,176 @@
+import time
+
+import numpy as np
+
+from events import SWIPE, SWIPE_RIGHT
+from filters import extrapolate
+
+# Canais de cada landmark nos arrays do tracker: (pessoas, 33, NUM_CHANNELS)
+X, Y, Z, VISIBILITY, PRESENCE = range(5)
+NUM_CHANNELS = 5
+# Só a posição é extrapolada; visibilidade e presença ficam como estão
+MOTION_CHANNELS = 3
+
+
+def landmarks_to_array(landmarks):
+    """Landmarks do MediaPipe -> array (33, NUM_CHANNELS). visibility/presence em falta contam como 1."""
+    return np.array([
+        (lm.x, lm.y, lm.z,
+         1.0 if lm.visibility is None else lm.visibility,
+         1.0 if lm.presence is None else lm.presence)
+        for lm in landmarks
+    ], dtype=np.float64)
+
+
+def world_to_array(landmarks):
+    return np.array([(lm.x, lm.y, lm.z) for lm in landmarks], dtype=np.float64)
+
+
+def _frozen(values, dtype, shape=None):
+    arr = np.array(values, dtype=dtype)
+    if shape is not None and arr.size == 0:
+        arr = arr.reshape(shape)
+    arr.flags.writeable = False
+    return arr
+
+
+class PoseSnapshot:
+    """Estado publicado pelo PoseTracker num frame.
+
+    Os arrays são só de leitura e o tracker nunca altera um snapshot já publicado:
+    cada frame cria um novo e troca a referência, por isso quem lê não precisa de lock.
+    `version` cresce a cada publicação; se não mudou, não há nada novo para processar.
+    Tudo está na ordem das pessoas (da esquerda para a direita na imagem).
+    """
+
+    __slots__ = ('version', 'track_ids', 'created', 'last_seen', 'poses', 'velocities',
+                 'timestamps', 'gestures', 'world', 'gesture_scores', 'gesture_levels', 'gesture_active', 'energy', 'events',
+                 '_dicts')
+
+    def __init__(self, version, track_ids, created, last_seen, poses, velocities, timestamps, gestures,
+                 world=None, num_landmarks=33, gesture_scores=None, gesture_levels=None, gesture_active=None, events=(), num_gestures=0,
+                 energy=None):
+        shape = (0, num_landmarks, NUM_CHANNELS)
+        self.version = version
+        self.track_ids = _frozen(track_ids, np.int64)
+        self.created = _frozen(created, np.float64)
+        self.last_seen = _frozen(last_seen, np.float64)
+        self.poses = _frozen(poses, np.float64, shape)
+        self.velocities = _frozen(velocities, np.float64, shape)
+        self.timestamps = _frozen(timestamps, np.float64)
+        self.gestures = tuple(gestures)
+        # Landmarks em metros centrados na anca (opcional): (pessoas, 33, 3)
+        self.world = None if world is None else _frozen(world, np.float64, (0, num_landmarks, 3))
+        # Por pessoa e gesto (pessoas, gestos), pela ordem de gestures.GESTURES: pontos de todas as regras
+        # que se verificam neste frame (multi-etiqueta), evidência suavizada (0..1) e se o gesto está
+        # ativo depois da histerese. Ler um gesto de uma pessoa é só indexar.
+        shape = (len(self.track_ids), num_gestures)
+        self.gesture_scores = _frozen(np.zeros(shape) if gesture_scores is None else gesture_scores, np.int32, shape)
+        self.gesture_levels = _frozen(np.zeros(shape) if gesture_levels is None else gesture_levels, np.float64, shape)
+        self.gesture_active = _frozen(np.zeros(shape, dtype=bool) if gesture_active is None else gesture_active, bool,
+                                      shape)
+        # Energia do movimento de cada pessoa (comprimentos de tronco por segundo, ver motion.motion_energy)
+        n = len(self.track_ids)
+        self.energy = _frozen(np.zeros(n) if energy is None else energy, np.float64, (n,))
+        # Últimos GestureEvent emitidos (de todas as tracks, por ordem de seq)
+        self.events = tuple(events)
+        self._dicts = None
+
+    @classmethod
+    def empty(cls, num_landmarks=33, num_gestures=0):
+        return cls(0, [], [], [], [], [], [], [], num_landmarks=num_landmarks, num_gestures=num_gestures)
+
+    def __len__(self):
+        return len(self.track_ids)
+
+    def predict(self, render_time, horizon=0.1, max_offset=0.05):
+        """Poses extrapoladas para render_time (perf_counter)."""
+        if not len(self):
+            return self.poses
+        out = self.poses.copy()
+        m = MOTION_CHANNELS
+        out[..., :m] = extrapolate(self.poses[..., :m], self.velocities[..., :m],
+                                   render_time - self.timestamps, horizon, max_offset)
+        return out
+
+    @property
+    def visibility(self):
+        return self.poses[..., VISIBILITY]
+
+    @property
+    def presence(self):
+        return self.poses[..., PRESENCE]
+
+    def confident(self, threshold=0.5):
+        """Máscara (pessoas, 33) dos landmarks com visibilidade e presença acima do limiar."""
+        return (self.poses[..., VISIBILITY] > threshold) & (self.poses[..., PRESENCE] > threshold)
+
+    def landmark_dicts(self):
+        """Formato de dicionários ({'x','y','z','visibility','presence'} por landmark), calculado uma vez por snapshot."""
+        if self._dicts is None:
+            self._dicts = landmark_dicts(self.poses)
+        return self._dicts
+
+
+class SnapshotReader:
+    """API de leitura comum ao PoseTracker e ao SharedPoseTracker; só precisa de get_snapshot()."""
+
+    prediction_horizon = 0.1
+    prediction_max_offset = 0.05
+    # Fila privada de get_swipe, criada na primeira chamada
+    _swipe_queue = None
+
+    def get_snapshot(self):
+        raise NotImplementedError
+
+    def subscribe(self, capacity=256):
+        raise NotImplementedError
+
+    def predict(self, snapshot=None, render_time=None):
+        """Poses do snapshot extrapoladas para render_time (perf_counter), compensando a latência da inferência."""
+        if snapshot is None:
+            snapshot = self.get_snapshot()
+        if render_time is None:
+            render_time = time.perf_counter()
+        return snapshot.predict(render_time, self.prediction_horizon, self.prediction_max_offset)
+
+    @property
+    def people(self):
+        return list(self.get_snapshot().poses)
+
+    @property
+    def gestures(self):
+        return list(self.get_snapshot().gestures)
+
+    def get_smoothed_poses(self, predict=False):
+        if predict:
+            return landmark_dicts(self.predict())
+        return list(self.get_snapshot().landmark_dicts())
+
+    def get_track_ids(self):
+        return self.get_snapshot().track_ids.tolist()
+
+    def get_gestures(self):
+        return list(self.get_snapshot().gestures)
+
+    def get_events(self, after=0):
+        """GestureEvent com seq > after ainda guardados no snapshot atual."""
+        return [e for e in self.get_snapshot().events if e.seq > after]
+
+    def get_swipe(self):
+        """(detetado, 'left'/'right') do último swipe desde a chamada anterior, como antes das filas.
+
+        Compatibilidade: lê de uma fila privada (subscribe) e fica só com o último swipe; para não perder
+        nenhum evento usa-se subscribe() diretamente.
+        """
+        if self._swipe_queue is None:
+            self._swipe_queue = self.subscribe()
+        swipes = [e for e in self._swipe_queue.drain() if e.kind == SWIPE]
+        if not swipes:
+            return False, None
+        return True, 'right' if swipes[-1].gesture == SWIPE_RIGHT else 'left'
+
+
+def landmark_dicts(poses):
+    return [[{'x': lm[X], 'y': lm[Y], 'z': lm[Z], 'visibility': lm[VISIBILITY], 'presence': lm[PRESENCE]}
+             for lm in person] for person in np.asarray(poses).tolist()]
@@ -0,0 +1,56 @@
+import unittest
+
+import numpy as np
+
+from gesture_rules import load_rules
+from gestures import RULES_FILE, POSE_RULES, check_equivalence, synthetic_poses
+from snapshot import VISIBILITY, PRESENCE
+
+
+def _with_visibility(poses, seed=0):
+    """Poses (P, 33, 2) -> (P, 33, 5) com visibilidade aleatória, para as regras que a exigem."""
+    rng = np.random.default_rng(seed)
+    full = np.zeros(poses.shape[:2] + (5,))
+    full[..., :2] = poses
+    full[..., VISIBILITY] = rng.random(poses.shape[:2])
+    full[..., PRESENCE] = 1.0
+    return full
+
+
+class ScalarPathTest(unittest.TestCase):
+    """O caminho escalar (vectorised=False) e o vetorizado dão exatamente o mesmo resultado."""
+
+    def test_matches_detect_gesture(self):
+        self.assertEqual(check_equivalence(synthetic_poses(5000, seed=1)), (0, 0))
+
+    def test_rule_sets_agree(self):
+        poses = _with_visibility(synthetic_poses(3000, seed=2), seed=2)
+        for name in ('pose', 'menu'):
+            rules = load_rules(RULES_FILE, name)
+            with self.subTest(rule_set=name):
+                expected = rules.evaluate(poses)
+                self.assertTrue(np.array_equal(np.array(rules._evaluate_scalar(poses), dtype=bool), expected))
+                vec_codes, vec_scores, _ = rules.classify_all(poses)
+                for n in (1, 2, 5, len(poses)):
+                    codes, scores, rule_ok = rules.classify_all(poses[:n], vectorised=False)
+                    self.assertTrue(np.array_equal(rule_ok, expected[:n]))
+                    self.assertTrue(np.array_equal(codes, vec_codes[:n]))
+                    self.assertTrue(np.array_equal(scores, vec_scores[:n]))
+
+    def test_stats_match(self):
+        poses = synthetic_poses(40, seed=3)
+        small = load_rules(RULES_FILE, 'pose')
+        for i in range(0, len(poses), 4):
+            small.classify_all(poses[i:i + 4], vectorised=False)
+        large = load_rules(RULES_FILE, 'pose')
+        large.classify_all(poses)
+        self.assertEqual(small.stats(), large.stats())
+        self.assertEqual(small.evaluations, large.evaluations)
+
+    def test_empty(self):
+        codes, scores, rule_ok = POSE_RULES.classify_all(np.zeros((0, 33, 2)))
+        self.assertEqual((len(codes), len(scores), rule_ok.shape), (0, 0, (0, len(POSE_RULES.rules))))
+
+
+if __name__ == '__main__':
+    unittest.main()
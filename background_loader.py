@@ -1,30 +1,377 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
 import cv2
 import numpy as np
 from pathlib import Path
+from map_catalogue import MapCatalogue
 
 class BackgroundLoader:
-    def __init__(self, resolution=(1280, 720)):
+    def __init__(self, resolution=(1280, 720), use_cache=True, catalogue=None, max_bytes=64 * 2**20, prefetch_radius=1):
         self.resolution = resolution
-        self.backgrounds = {}
-        self.base_path = Path("img")
-        self._load_backgrounds()
-    
-    def _load_backgrounds(self):
-        for i in range(3):
-            path = self.base_path / f"map{i+1}" / "background.png"
-            if path.exists():
-                img = cv2.imread(str(path))
-                self.backgrounds[i] = cv2.resize(img, self.resolution) if img is not None else self._placeholder(i+1)
-            else:
-                self.backgrounds[i] = self._placeholder(i+1)
+        self.catalogue = catalogue if catalogue is not None else MapCatalogue.load()
+        self.base_path = self.catalogue.base_path
+        # Decoded, resized backgrounds as raw .npy files (<name>-<source sha1>.npy), one directory per resolution
+        self.use_cache = use_cache
+        self.cache_path = self.base_path / ".cache" / f"{resolution[0]}x{resolution[1]}"
+        # Resident backgrounds by map index, least recently used first, bounded by max_bytes
+        self.backgrounds = OrderedDict()
+        self.resident_bytes = 0
+        self.max_bytes = max_bytes
+        self.placeholders = {}
+        # Worker queues: maps to load (current map's neighbourhood first), stale caches, decoded images to persist
+        self.prefetch_radius = prefetch_radius
+        self.current = None
+        self.wanted = []
+        self.stale = []
+        self.unsaved = []
+        self.busy = False
+        self.updated = []
+        self.lock = threading.Condition()
+        # Frames served the loading placeholder because a map wasn't resident yet
+        self.misses = 0
+        # Copy traffic: only explicit copy-on-write requests copy pixels
+        self.copies = 0
+        self.copied_bytes = 0
+        # The first map is ready before the first frame; everything else is loaded by the worker
+        self._store(0, *self._read(0))
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+        self.prefetch(0)
+    
+    def _read(self, index):
+        """
+        Background for one catalogue entry, memory-mapped from the cache when it's valid
+    
+        Returns:
+            (image, stale, unsaved): stale means the cache is outdated and must be rebuilt,
+            unsaved that the image was decoded and is not in the cache yet
+        """
+        path = self.catalogue.background_path(index)
+        if not path.exists():
+            return self._placeholder(f"Add {path.name} to {path.parent}/"), False, False
+        if self.use_cache:
+            cached, fresh = self._load_cached(path)
+            if cached is not None:
+                return cached, not fresh, False
+        img = self._decode(path)
+        if img is None:
+            return self._placeholder(f"Could not read {path}"), False, False
+        return img, False, self.use_cache
+    
+    def _store(self, index, img, stale=False, unsaved=False):
+        """Make an image resident (evicting the least recently used maps outside the prefetch window)"""
+        with self.lock:
+            old = self.backgrounds.pop(index, None)
+            if old is not None:
+                self.resident_bytes -= old.nbytes
+            self.backgrounds[index] = img
+            self.resident_bytes += img.nbytes
+            keep = set(self._window(self.current)) | {index}
+            for key in list(self.backgrounds):
+                if self.resident_bytes <= self.max_bytes:
+                    break
+                if key not in keep:
+                    self.resident_bytes -= self.backgrounds.pop(key).nbytes
+            if stale:
+                self.stale.append(index)
+            if unsaved:
+                self.unsaved.append((index, img))
+            self.updated.append(index)
+            self.lock.notify_all()
+    
+    def _window(self, index):
+        """The current map and its neighbours up to prefetch_radius, nearest first"""
+        if index is None:
+            return []
+        n = len(self.catalogue)
+        window = [index]
+        for d in range(1, self.prefetch_radius + 1):
+            for i in ((index + d) % n, (index - d) % n):
+                if i not in window:
+                    window.append(i)
+        return window
+    
+    def prefetch(self, index):
+        """Call when the carousel moves: loads the new map's neighbourhood in the worker thread"""
+        if index == self.current:
+            return
+        with self.lock:
+            self.current = index
+            self.wanted = [i for i in self._window(index) if i not in self.backgrounds]
+            self.lock.notify_all()
+    
+    def _run(self):
+        """Worker thread: prefetches first, then cache rebuilds and writes"""
+        while True:
+            with self.lock:
+                while not (self.wanted or self.stale or self.unsaved):
+                    self.lock.wait()
+                self.busy = True
+                if self.wanted:
+                    job, index, img = 'load', self.wanted.pop(0), None
+                    if index in self.backgrounds:
+                        job = None
+                elif self.stale:
+                    job, index, img = 'rebuild', self.stale.pop(0), None
+                else:
+                    job, (index, img) = 'save', self.unsaved.pop(0)
+            try:
+                path = self.catalogue.background_path(index)
+                if job == 'load':
+                    self._store(index, *self._read(index))
+                elif job == 'rebuild':
+                    img = self._decode(path)
+                    if img is not None:
+                        self._store(index, img)
+                        self._save_cached(path, img)
+                elif job == 'save':
+                    self._save_cached(path, img)
+            except Exception as e:
+                # One bad entry must not stop the worker: a failed load shows an error frame instead of "Loading..."
+                print(f"[WARN] Background {index} not loaded/cached: {e}")
+                if job == 'load':
+                    self._store(index, self._get_placeholder(f"Could not load {self.catalogue.names[index]}"))
+            finally:
+                with self.lock:
+                    self.busy = False
+                    self.lock.notify_all()
+    
+    def wait_idle(self, timeout=None):
+        """Block until the worker has nothing left to do (benchmarks and tools)"""
+        with self.lock:
+            return self.lock.wait_for(lambda: not (self.wanted or self.stale or self.unsaved or self.busy), timeout)
+    
+    def _decode(self, path):
+        img = cv2.imread(str(path))
+        return self._freeze(cv2.resize(img, self.resolution)) if img is not None else None
+    
+    @staticmethod
+    def _freeze(img):
+        """Mark a shared image read-only, so accidental drawing on it raises instead of corrupting the cache"""
+        img.flags.writeable = False
+        return img
+    
+    @staticmethod
+    def _file_hash(path):
+        return hashlib.sha1(Path(path).read_bytes()).hexdigest()
+    
+    def _cache_name(self, path):
+        return "_".join(path.relative_to(self.base_path).with_suffix("").parts)
+    
+    def _load_cached(self, path):
+        """
+        Memory-mapped cached image for a source file
+    
+        Returns:
+            (image, fresh): image is None when there is no usable cache; fresh is False when the source changed
+        """
+        name = self._cache_name(path)
+        try:
+            meta = json.loads((self.cache_path / f"{name}.json").read_text())
+            npy_name = meta['file']
+            if Path(npy_name).name != npy_name:
+                return None, False
+            img = np.load(self.cache_path / npy_name, mmap_mode='r')
+        except (OSError, ValueError, KeyError, TypeError):
+            return None, False
+        if img.shape != (self.resolution[1], self.resolution[0], 3) or img.dtype != np.uint8:
+            return None, False
+        stat = path.stat()
+        fresh = meta.get('mtime_ns') == stat.st_mtime_ns and meta.get('size') == stat.st_size
+        # Touched but not necessarily changed (e.g. a fresh checkout): the content hash decides
+        if not fresh and meta.get('sha1') == self._file_hash(path):
+            self._write_meta(path, meta['sha1'], npy_name)
+            fresh = True
+        if fresh:
+            # Images a previous run couldn't delete because they were still mapped
+            self._remove_old_files(name, npy_name)
+        return img, fresh
+    
+    def _write_meta(self, path, sha1, npy_name):
+        stat = path.stat()
+        meta_path = self.cache_path / f"{self._cache_name(path)}.json"
+        tmp = meta_path.with_suffix('.json.tmp')
+        tmp.write_text(json.dumps({'source': str(path), 'file': npy_name, 'mtime_ns': stat.st_mtime_ns,
+                                   'size': stat.st_size, 'sha1': sha1}))
+        os.replace(tmp, meta_path)
     
-    def _placeholder(self, map_num):
+    def _save_cached(self, path, img):
+        """
+        Write the image and then its metadata, each atomically, so a crash never leaves a valid-looking stale pair.
+        The image goes to a file named after the source's hash and is never overwritten: the previous version
+        may still be memory-mapped (replacing or deleting a mapped file fails on Windows)
+        """
+        self.cache_path.mkdir(parents=True, exist_ok=True)
+        sha1 = self._file_hash(path)
+        name = self._cache_name(path)
+        npy_name = f"{name}-{sha1}.npy"
+        npy_path = self.cache_path / npy_name
+        # Same name, same source: an existing file already holds this image
+        if not npy_path.exists():
+            tmp = self.cache_path / f"{npy_name}.tmp"
+            with open(tmp, 'wb') as f:
+                np.save(f, np.ascontiguousarray(img))
+            os.replace(tmp, npy_path)
+        self._write_meta(path, sha1, npy_name)
+        self._remove_old_files(name, npy_name)
+    
+    def _remove_old_files(self, name, keep):
+        """Delete superseded images of one source; a file that is still mapped is left for a later save"""
+        for old in self.cache_path.glob(f"{name}*.npy"):
+            suffix = old.stem[len(name):]
+            if old.name == keep or not (suffix == "" or (len(suffix) == 41 and suffix[0] == "-")):
+                continue
+            try:
+                old.unlink()
+            except OSError:
+                pass
+    
+    def poll_updates(self):
+        """Indices of maps whose background was replaced since the last call (loaded or rebuilt by the worker)"""
+        if not self.updated:
+            return ()
+        with self.lock:
+            updated, self.updated = self.updated, []
+        return updated
+    
+    def _placeholder(self, text):
         img = np.ones((self.resolution[1], self.resolution[0], 3), dtype=np.uint8) * 30
-        text = f"Add background.png to img/map{map_num}/"
         size = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 1.0, 2)[0]
         x, y = (self.resolution[0] - size[0]) // 2, (self.resolution[1] - size[1]) // 2
         cv2.putText(img, text, (x, y), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (100, 200, 255), 2)
+        return self._freeze(img)
+    
+    def _get_placeholder(self, text):
+        """Placeholder frame, rendered once per text"""
+        img = self.placeholders.get(text)
+        if img is None:
+            img = self.placeholders[text] = self._placeholder(text)
+        return img
+    
+    def get_background(self, map_index, writable=False):
+        """
+        Background for a map, shared and read-only (no pixels are copied). Never waits for disk or decoding:
+        a map that isn't resident yet is queued first for the worker and a loading frame is returned meanwhile
+    
+        Args:
+            map_index: Index of the map
+            writable: Return a private copy the caller may draw on (copy-on-write)
+        """
+        with self.lock:
+            img = self.backgrounds.get(map_index)
+            if img is not None:
+                self.backgrounds.move_to_end(map_index)
+            else:
+                self.misses += 1
+                if map_index not in self.wanted:
+                    self.wanted.insert(0, map_index)
+                    self.lock.notify_all()
+        if img is None:
+            img = self._get_placeholder("Loading...")
+        if writable:
+            self.copies += 1
+            self.copied_bytes += img.nbytes
+            return np.array(img)
         return img
     
-    def get_background(self, map_index):
-        return self.backgrounds.get(map_index, self._placeholder(map_index + 1)).copy()
+    def reset_stats(self):
+        self.misses = 0
+        self.copies = 0
+        self.copied_bytes = 0
+
+
+def measure_copy_traffic(frames=300, resolution=(1280, 720)):
+    """
+    Per-frame copy traffic of the main loop's background access: the old copy on every call
+    (writable=True everywhere) against shared read-only views
+    """
+    loader = BackgroundLoader(resolution)
+    loader.wait_idle()
+    # The old get_background also rendered a placeholder on every call, even for maps that exist
+    start = time.perf_counter()
+    for _ in range(frames):
+        loader._placeholder("Add background.png to img/map1/")
+    placeholder_ms = (time.perf_counter() - start) / frames * 1000
+    print(f"{'access':<10} {'copies/frame':>13} {'MiB/frame':>10} {'us/frame':>9}")
+    for name, writable in (("copy", True), ("view", False)):
+        loader.reset_stats()
+        start = time.perf_counter()
+        for f in range(frames):
+            # main.py fetches the current map once per frame; maps change every second
+            index = (f // 30) % len(loader.catalogue)
+            loader.prefetch(index)
+            loader.get_background(index, writable=writable)
+        us = (time.perf_counter() - start) / frames * 1e6
+        print(f"{name:<10} {loader.copies / frames:>13.2f} {loader.copied_bytes / frames / 2**20:>10.2f} {us:>9.1f}")
+    print(f"placeholder re-render avoided per call: {placeholder_ms:.2f} ms")
+
+
+def measure_startup(resolution=(1280, 720), runs=5):
+    """Time to the first frame and until every map is resident: decoding every PNG against memory-mapping the cache"""
+    catalogue = MapCatalogue.load()
+    BackgroundLoader(resolution, catalogue=catalogue).wait_idle()
+    print(f"{'source':<8} {'first frame ms':>15} {'all maps ms':>12}")
+    for name, use_cache in (("decode", False), ("cache", True)):
+        first = total = 0.0
+        for _ in range(runs):
+            start = time.perf_counter()
+            loader = BackgroundLoader(resolution, use_cache=use_cache, catalogue=catalogue, prefetch_radius=len(catalogue))
+            # Read every pixel, as the first rendered frames will
+            cv2.mean(loader.get_background(0))
+            first += time.perf_counter() - start
+            loader.wait_idle()
+            total += time.perf_counter() - start
+        print(f"{name:<8} {first / runs * 1000:>15.2f} {total / runs * 1000:>12.2f}")
+
+
+def measure_navigation(maps=36, steps=12, fps=30.0, step_frames=12, resident=6, resolution=(1280, 720)):
+    """
+    Walk a large synthetic catalogue with NEXT every step_frames frames, decoding from PNG (no cache),
+    with and without neighbour prefetch. Reports frames shown as 'Loading...', the slowest get_background
+    call and the peak resident memory (bounded to `resident` backgrounds)
+    """
+    import shutil
+    import tempfile
+    sources = [MapCatalogue.load().background_path(i) for i in range(3)]
+    with tempfile.TemporaryDirectory() as tmp:
+        entries = []
+        for i in range(maps):
+            name = f"venue{i:02d}/background.png"
+            os.makedirs(os.path.join(tmp, f"venue{i:02d}"))
+            shutil.copy(sources[i % len(sources)], os.path.join(tmp, name))
+            entries.append({"name": f"Venue {i}", "background": name})
+        catalogue = MapCatalogue(entries, tmp)
+        frame_bytes = resolution[0] * resolution[1] * 3
+        print(f"{'prefetch':<9} {'loading frames':>15} {'worst call us':>14} {'peak MiB':>9}")
+        for radius in (0, 1):
+            loader = BackgroundLoader(resolution, use_cache=False, catalogue=catalogue,
+                                      max_bytes=resident * frame_bytes, prefetch_radius=radius)
+            loader.wait_idle()
+            loader.reset_stats()
+            worst = peak = 0
+            index = 0
+            for f in range(steps * step_frames):
+                frame_start = time.perf_counter()
+                if f and f % step_frames == 0:
+                    index = (index + 1) % maps
+                loader.prefetch(index)
+                start = time.perf_counter()
+                loader.get_background(index)
+                worst = max(worst, time.perf_counter() - start)
+                peak = max(peak, loader.resident_bytes)
+                time.sleep(max(0.0, 1 / fps - (time.perf_counter() - frame_start)))
+            print(f"{radius:<9} {loader.misses:>15} {worst * 1e6:>14.0f} {peak / 2**20:>9.1f}")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ['startup']:
+        measure_startup()
+    elif sys.argv[1:] == ['navigation']:
+        measure_navigation()
+    else:
+        measure_copy_traffic()
@@ -0,0 +1,85 @@
+"""
+Compositing primitives for the Renderer
+Every operation writes into an existing buffer (in place, or into a preallocated destination),
+so a steady-state frame allocates no full-size images
+"""
+
+import cv2
+import numpy as np
+
+
+def tint(img, color, weight, dst=None):
+    """
+    Blend an image towards a constant colour in one pass: dst = img * (1 - weight) + color * weight
+
+    Args:
+        img: BGR image (or ROI view)
+        color: BGR color tuple
+        weight: Weight of the colour, 0..1
+        dst: Destination buffer with img's shape (default: img itself, in place)
+
+    Returns:
+        dst
+    """
+    if dst is None:
+        dst = img
+    keep = 1.0 - weight
+    matrix = np.array([[keep, 0, 0, color[0] * weight],
+                       [0, keep, 0, color[1] * weight],
+                       [0, 0, keep, color[2] * weight]])
+    # Same rounding as cv2.addWeighted against a frame filled with the colour
+    cv2.transform(img, matrix, dst=dst)
+    return dst
+
+
+def crossfade(a, b, t, dst):
+    """
+    Crossfade two frames into a preallocated buffer: dst = a * (1 - t) + b * t
+
+    Args:
+        a, b: BGR images of the same shape
+        t: Progress, 0 (all a) .. 1 (all b)
+        dst: Destination buffer
+
+    Returns:
+        dst
+    """
+    cv2.addWeighted(a, 1.0 - t, b, t, 0, dst=dst)
+    return dst
+
+
+def blend(dst, src, alpha):
+    """
+    Blend src over dst in place: dst = src * alpha + dst * (1 - alpha)
+
+    Args:
+        dst: BGR image or ROI view - MODIFIED IN-PLACE
+        src: BGR image with dst's shape
+        alpha: Opacity of src, 0..1
+
+    Returns:
+        dst
+    """
+    cv2.addWeighted(src, alpha, dst, 1.0 - alpha, 0, dst=dst)
+    return dst
+
+
+def clip_rect(x0, y0, x1, y1, width, height):
+    """Clip a rectangle to the image; returns (x0, y0, x1, y1), empty when x0 >= x1 or y0 >= y1"""
+    return max(x0, 0), max(y0, 0), min(x1, width), min(y1, height)
+
+
+class FrameBuffers:
+    """Named buffers that are allocated once and reused; a buffer is replaced only when its shape changes"""
+
+    def __init__(self):
+        self.buffers = {}
+        self.allocations = 0
+
+    def get(self, name, shape, dtype=np.uint8):
+        buf = self.buffers.get(name)
+        if buf is None or buf.shape != tuple(shape) or buf.dtype != dtype:
+            buf = np.empty(shape, dtype=dtype)
+            self.buffers[name] = buf
+            self.allocations += 1
+        return buf
@@ -0,0 +1,170 @@
+import time
+
+import numpy as np
+
+# Landmarks used to rank candidates (MediaPipe pose indices)
+NOSE, LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_HIP, RIGHT_HIP = 0, 11, 12, 23, 24
+POLICIES = ('proximity', 'centre', 'claim')
+
+
+def candidate_scores(poses, policy):
+    """Rank each person for an automatic election. poses: (N, 33, C) normalised image coordinates.
+
+    'proximity' prefers the biggest body (closest to the kiosk), 'centre' the person nearest the
+    middle of the frame. 'claim' never elects automatically, so every score is -inf.
+    """
+    poses = np.asarray(poses, dtype=np.float64)
+    if policy == 'claim' or not len(poses):
+        return np.full(len(poses), -np.inf)
+    xy = poses[:, :, :2]
+    if policy == 'proximity':
+        shoulders = np.hypot(*(xy[:, LEFT_SHOULDER] - xy[:, RIGHT_SHOULDER]).T)
+        hip = (xy[:, LEFT_HIP] + xy[:, RIGHT_HIP]) / 2
+        torso = np.hypot(*(xy[:, [LEFT_SHOULDER, RIGHT_SHOULDER]].mean(axis=1) - hip).T)
+        return shoulders + torso
+    centre_x = xy[:, [LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_HIP, RIGHT_HIP], 0].mean(axis=1)
+    return -np.abs(centre_x - 0.5)
+
+
+class ControllerElection:
+    """Chooses which tracked person drives the menu.
+
+    Hand-off protocol:
+      1. Nobody in control: the first person holding a raised hand for `claim_hold` seconds wins;
+         otherwise (unless the policy is 'claim') the best-ranked person is elected.
+      2. Someone else claims: once the controller has held control for `min_tenure` seconds, the
+         claim becomes pending and is granted as soon as the controller is not mid-gesture, or after
+         `handoff_wait` seconds at the latest.
+      3. The controller leaves the frame: control is released and step 1 runs again. A person counts
+         as present while their track lives (live_ids), so a few missed detections don't move control.
+    Ranking changes alone never move control, so the menu does not jump between people in a crowd.
+    """
+
+    def __init__(self, policy='proximity', claim_hold=0.6, min_tenure=2.0, handoff_wait=1.5):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown election policy: {policy} (options: {', '.join(POLICIES)})")
+        self.policy = policy
+        self.claim_hold = claim_hold
+        self.min_tenure = min_tenure
+        self.handoff_wait = handoff_wait
+        self.controller = None
+        self.since = 0.0
+        self.claims = {}
+        self.pending = None
+        self.pending_since = 0.0
+        self.handoffs = 0
+
+    def update(self, track_ids, poses, raised, busy, t, live_ids=None):
+        """Advance the election by one frame.
+
+        track_ids: ids of the people in `poses`; raised: (N,) bool, someone has a hand up;
+        busy: the current controller has a gesture in progress; live_ids: tracks still alive but
+        not necessarily detected this frame (defaults to track_ids). Returns (controller, changed).
+        """
+        track_ids = [int(i) for i in track_ids]
+        raised = np.asarray(raised, dtype=bool)
+        for t_id, up in zip(track_ids, raised.tolist()):
+            if up:
+                self.claims.setdefault(t_id, t)
+            else:
+                self.claims.pop(t_id, None)
+        present = set(track_ids) if live_ids is None else set(track_ids) | {int(i) for i in live_ids}
+        self.claims = {k: v for k, v in self.claims.items() if k in present}
+        claimant = self._claimant(t)
+
+        if self.controller not in present:
+            if claimant is not None:
+                return self._grant(claimant, t)
+            scores = candidate_scores(poses, self.policy)
+            if len(scores) and np.isfinite(scores).any():
+                return self._grant(track_ids[int(np.argmax(scores))], t)
+            changed = self.controller is not None
+            self.controller = None
+            self.pending = None
+            return None, changed
+
+        if claimant is not None and claimant != self.controller and t - self.since >= self.min_tenure:
+            if self.pending != claimant:
+                self.pending, self.pending_since = claimant, t
+        elif self.pending is not None and self.pending not in self.claims:
+            self.pending = None
+        if self.pending is not None and (not busy or t - self.pending_since >= self.handoff_wait):
+            return self._grant(self.pending, t)
+        return self.controller, False
+
+    def _claimant(self, t):
+        """Longest-held claim that has lasted at least claim_hold seconds (the controller's own hand doesn't count)."""
+        held = [(since, t_id) for t_id, since in self.claims.items()
+                if t_id != self.controller and t - since >= self.claim_hold]
+        return min(held)[1] if held else None
+
+    def _grant(self, t_id, t):
+        changed = t_id != self.controller
+        if changed and self.controller is not None:
+            self.handoffs += 1
+        self.controller = t_id
+        self.since = t
+        self.pending = None
+        self.claims.pop(t_id, None)
+        return t_id, changed
+
+
+# ------------------------ SIMULATION ------------------------
+
+def _crowd(n, rng):
+    """Synthetic standing people spread across the frame, nearer ones drawn bigger."""
+    poses = np.zeros((n, 33, 4))
+    poses[..., 3] = 1.0
+    for i in range(n):
+        cx, scale = 0.15 + 0.7 * i / max(n - 1, 1), rng.uniform(0.6, 1.2)
+        poses[i, LEFT_SHOULDER, :2] = (cx + 0.08 * scale, 0.35)
+        poses[i, RIGHT_SHOULDER, :2] = (cx - 0.08 * scale, 0.35)
+        poses[i, LEFT_HIP, :2] = (cx + 0.05 * scale, 0.35 + 0.25 * scale)
+        poses[i, RIGHT_HIP, :2] = (cx - 0.05 * scale, 0.35 + 0.25 * scale)
+        poses[i, NOSE, :2] = (cx, 0.35 - 0.1 * scale)
+    return poses
+
+
+def simulate(policy='proximity', people=5, fps=30.0, seconds=8.0, seed=0, track_ttl=1.0):
+    """Scripted crowd: person 3 claims at 2 s while the controller keeps gesturing until 4 s.
+
+    The controller is not detected for a few frames at 1 s and 5 s (control must stay), and person 0
+    leaves at 6 s; tracks live for track_ttl seconds after their last detection, as in the engine.
+    Prints the hand-offs and returns the mean election cost per frame in microseconds.
+    """
+    rng = np.random.default_rng(seed)
+    poses = _crowd(people, rng)
+    election = ControllerElection(policy)
+    ids = list(range(people))
+    last_seen = {}
+    elapsed = 0.0
+    frames = int(seconds * fps)
+    for f in range(frames):
+        t = f / fps
+        raised = np.zeros(people, dtype=bool)
+        raised[3] = 2.0 <= t < 5.0
+        if policy == 'claim':
+            raised[1] = 0.5 <= t < 1.5
+        busy = t < 4.0
+        # Person 0 leaves at 6 s; the controller drops out of detection for 3 frames at 1 s and 5 s
+        dropout = 1.0 <= t < 1.0 + 3 / fps or 5.0 <= t < 5.0 + 3 / fps
+        visible = [i for i in ids if not (i == 0 and t >= 6.0) and not (dropout and i == election.controller)]
+        last_seen.update((i, t) for i in visible)
+        live = [i for i, seen in last_seen.items() if t - seen <= track_ttl]
+        start = time.perf_counter()
+        controller, changed = election.update(visible, poses[visible], raised[visible], busy, t, live)
+        elapsed += time.perf_counter() - start
+        if changed:
+            print(f"  t={t:4.2f}s controller -> {controller}")
+    return elapsed / frames * 1e6
+
+
+def main():
+    for policy in POLICIES:
+        print(f"policy '{policy}':")
+        us = simulate(policy)
+        print(f"  {us:.1f} us per frame")
+
+
+if __name__ == '__main__':
+    main()
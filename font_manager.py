@@ -1,21 +1,91 @@
 """
 Font Manager for OpenCV
 Handles loading and using .ttf fonts with OpenCV using PIL
-Optimized: Uses PIL for rendering, converts back to OpenCV efficiently
+Optimized: each string is rendered once by PIL into a cached premultiplied-alpha sprite,
+then alpha-blended into the destination region only
 """
 
 import cv2
 import numpy as np
+from collections import OrderedDict
 from pathlib import Path
 from PIL import Image, ImageDraw, ImageFont
 import os
 
 
+class TextSprite:
+    """A rendered string: premultiplied BGR colour, inverse alpha and its offset from the draw position"""
+
+    __slots__ = ('premul', 'inv_alpha', 'offset', 'nbytes')
+
+    def __init__(self, premul, inv_alpha, offset):
+        self.premul = premul
+        self.inv_alpha = inv_alpha
+        self.offset = offset
+        self.nbytes = premul.nbytes + inv_alpha.nbytes
+
+    @property
+    def size(self):
+        return self.premul.shape[1], self.premul.shape[0]
+
+
+class SpriteCache:
+    """LRU cache of TextSprites bounded by total bytes rather than entry count"""
+
+    def __init__(self, max_bytes=16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        sprite = self.entries.get(key)
+        if sprite is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return sprite
+
+    def put(self, key, sprite):
+        if sprite.nbytes > self.max_bytes:
+            return
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.nbytes -= old.nbytes
+        self.entries[key] = sprite
+        self.nbytes += sprite.nbytes
+        while self.nbytes > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.nbytes = 0
+
+    def stats(self):
+        return {'entries': len(self.entries), 'bytes': self.nbytes, 'hits': self.hits,
+                'misses': self.misses, 'evictions': self.evictions}
+
+
 class FontManager:
     """Manages .ttf fonts for OpenCV rendering using PIL - OPTIMIZED"""
     
     _fonts_cache = {}
     _default_font_path = os.path.join(os.path.dirname(__file__), 'fonts', 'Roboto-VariableFont_wdth,wght.ttf')
+    # Rendered strings keyed by (text, size, colour, font, outline)
+    sprite_cache = SpriteCache()
+    # False falls back to the old full-frame PIL round trip (kept for benchmarks)
+    use_sprites = True
+    # 16-bit working buffer shared by every blend, grown to the largest region drawn so far; it is not
+    # part of any sprite, so it doesn't count towards the cache limit
+    _blend_scratch = np.empty(0, dtype=np.uint16)
     
     @staticmethod
     def load_font(font_path=None, font_size=30):
@@ -47,7 +117,8 @@ class FontManager:
         return FontManager._fonts_cache[cache_key]
     
     @staticmethod
-    def put_text(img, text, position, font_size=24, color=(255, 255, 255), font_path=None, thickness=1):
+    def put_text(img, text, position, font_size=24, color=(255, 255, 255), font_path=None, thickness=1,
+                 outline_width=0, outline_color=(0, 0, 0)):
         """
         Draw text on image using .ttf font (PIL) or fallback to OpenCV
         
@@ -59,6 +130,8 @@ class FontManager:
             color: BGR color tuple
             font_path: Path to .ttf font (default: Roboto)
             thickness: Ignored (kept for API compatibility)
+            outline_width: Outline thickness in pixels (0 = no outline)
+            outline_color: BGR color of the outline
         """
         if font_path is None:
             font_path = FontManager._default_font_path
@@ -70,6 +143,23 @@ class FontManager:
                        max(0.5, font_size / 25), color, thickness)
             return img
         
+        if FontManager.use_sprites:
+            outline = (outline_width, tuple(int(c) for c in outline_color)) if outline_width else None
+            sprite = FontManager.get_sprite(text, font_size, color, font_path, outline)
+            return FontManager.blend_sprite(img, sprite, position)
+        
+        if outline_width:
+            # Old outline: one full-frame pass per offset copy
+            x, y = position
+            for dx in range(-outline_width, outline_width + 1):
+                for dy in range(-outline_width, outline_width + 1):
+                    if dx != 0 or dy != 0:
+                        FontManager._put_text_pil(img, text, (x + dx, y + dy), font, outline_color)
+        return FontManager._put_text_pil(img, text, position, font, color)
+    
+    @staticmethod
+    def _put_text_pil(img, text, position, font, color):
+        """Full-frame PIL round trip (the path used before sprites)"""
         # Convert BGR to RGB for PIL
         img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
         pil_img = Image.fromarray(img_rgb)
@@ -87,6 +177,110 @@ class FontManager:
         img[:] = img_bgr
         return img
     
+    @staticmethod
+    def get_sprite(text, font_size=24, color=(255, 255, 255), font_path=None, outline=None):
+        """
+        Get the cached sprite for a string, rendering it on a miss
+        
+        Args:
+            text: Text to render
+            font_size: Size of font in pixels
+            color: BGR color tuple
+            font_path: Path to .ttf font (default: Roboto)
+            outline: (width, BGR color) or None for plain text
+            
+        Returns:
+            TextSprite, or None if the font can't be loaded
+        """
+        if font_path is None:
+            font_path = FontManager._default_font_path
+        color = tuple(int(c) for c in color)
+        key = (text, font_size, color, font_path, outline)
+        sprite = FontManager.sprite_cache.get(key)
+        if sprite is None:
+            font = FontManager.load_font(font_path, font_size)
+            if font is None:
+                return None
+            sprite = FontManager.render_sprite(text, font, color, outline)
+            FontManager.sprite_cache.put(key, sprite)
+        return sprite
+    
+    @staticmethod
+    def render_sprite(text, font, color, outline=None):
+        """
+        Render a string once with PIL into a premultiplied-alpha sprite
+        
+        Args:
+            text: Text to render
+            font: PIL ImageFont object
+            color: BGR color tuple
+            outline: (width, BGR color) or None; the glyph coverage is dilated by a square of
+                that radius and composited under the fill, all in the same sprite
+            
+        Returns:
+            TextSprite placed where draw.text(position, ...) would put the glyphs
+        """
+        pad = outline[0] if outline else 0
+        left, top, right, bottom = font.getbbox(text)
+        width, height = max(right - left, 1) + 2 * pad, max(bottom - top, 1) + 2 * pad
+        mask = Image.new('L', (width, height), 0)
+        ImageDraw.Draw(mask).text((pad - left, pad - top), text, font=font, fill=255)
+        fill = np.asarray(mask, dtype=np.uint8)
+        # Done once per cache miss, so plain float maths
+        fill_a = fill[:, :, None] / np.float32(255)
+        premul = fill_a * np.array(color, dtype=np.float32)
+        alpha = fill_a
+        if outline:
+            kernel = np.ones((2 * pad + 1, 2 * pad + 1), dtype=np.uint8)
+            # Outline shows only where the fill doesn't cover: A = Af + As * (1 - Af)
+            under = cv2.dilate(fill, kernel)[:, :, None] / np.float32(255) * (1 - fill_a)
+            premul = premul + under * np.array(outline[1], dtype=np.float32)
+            alpha = alpha + under
+        premul = np.rint(premul).astype(np.uint8)
+        alpha = np.rint(alpha * 255).astype(np.uint8)
+        return TextSprite(premul, 255 - alpha, (left - pad, top - pad))
+    
+    @staticmethod
+    def blend_sprite(img, sprite, position):
+        """
+        Alpha-blend a sprite into the image, touching only the covered region
+        
+        Args:
+            img: OpenCV image (BGR) - MODIFIED IN-PLACE
+            sprite: TextSprite from get_sprite
+            position: (x, y) tuple, as passed to put_text
+        """
+        if sprite is None:
+            return img
+        h, w = img.shape[:2]
+        sw, sh = sprite.size
+        x0, y0 = position[0] + sprite.offset[0], position[1] + sprite.offset[1]
+        # Clip the sprite to the image
+        cx0, cy0 = max(x0, 0), max(y0, 0)
+        cx1, cy1 = min(x0 + sw, w), min(y0 + sh, h)
+        if cx0 >= cx1 or cy0 >= cy1:
+            return img
+        sx, sy = cx0 - x0, cy0 - y0
+        roi = img[cy0:cy1, cx0:cx1]
+        premul = sprite.premul[sy:sy + cy1 - cy0, sx:sx + cx1 - cx0]
+        inv_alpha = sprite.inv_alpha[sy:sy + cy1 - cy0, sx:sx + cx1 - cx0]
+        # dst = src_premul + dst * (1 - alpha), in 16-bit integers in the shared scratch buffer
+        blended = FontManager._scratch(cy1 - cy0, cx1 - cx0, premul.shape[2])
+        np.multiply(roi, inv_alpha, out=blended, dtype=np.uint16)
+        blended += 127
+        blended //= 255
+        blended += premul
+        np.copyto(roi, blended, casting='unsafe')
+        return img
+    
+    @classmethod
+    def _scratch(cls, height, width, channels):
+        # A contiguous view of the flat buffer: ufuncs writing to it need no internal buffering
+        size = height * width * channels
+        if cls._blend_scratch.size < size:
+            cls._blend_scratch = np.empty(size, dtype=np.uint16)
+        return cls._blend_scratch[:size].reshape(height, width, channels)
+    
     @staticmethod
     def get_text_size(text, font):
         """
@@ -160,23 +354,12 @@ class UIFont:
             size_name: 'title', 'large', 'medium', 'small', 'tiny'
             color: BGR color tuple
             thickness: Text thickness (ignored for PIL but kept for API compatibility)
-            outline: If True, draw outline first
+            outline: If True, draw a 2 px outline around the text
             outline_color: Color for outline
         """
-        font = self.get_font(size_name)
-        
-        # Draw outline first if requested
-        if outline:
-            x, y = position
-            # Draw outline in 8 directions
-            for dx in [-2, -1, 0, 1, 2]:
-                for dy in [-2, -1, 0, 1, 2]:
-                    if dx != 0 or dy != 0:
-                        FontManager.put_text(img, text, (x + dx, y + dy), font, outline_color)
-        
-        # Draw main text
-        FontManager.put_text(img, text, position, font, color)
-        
+        # Text and its 2 px outline are one cached sprite, blended in a single pass
+        FontManager.put_text(img, text, position, self.get_size(size_name), color, self.font_path,
+                             outline_width=2 if outline else 0, outline_color=outline_color)
         return img
     
     def put_text_centered(self, img, text, y_pos, size_name='medium',
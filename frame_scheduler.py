@@ -0,0 +1,164 @@
+import time
+
+import numpy as np
+
+
+class FrameScheduler:
+    """
+    Paces the UI loop at a target frame rate, with inference on its own, usually slower, clock
+
+    Each frame starts on a fixed deadline grid. After the frame's work, end_frame() sleeps until the next
+    deadline (coarse sleep, then a short spin for precision). A frame that overruns by a whole period is
+    counted as missed and the grid restarts from now, so a slow frame never causes a burst of catch-up frames.
+    """
+
+    def __init__(self, fps=30.0, inference_fps=None, spin=0.0015, report_every=5.0, window=600):
+        self.period = 1.0 / fps
+        self.inference_period = 1.0 / inference_fps if inference_fps else self.period
+        self.spin = spin
+        self.report_every = report_every
+        self.deadline = None
+        self.next_inference = 0.0
+        self.frame_start = 0.0
+        self.cpu_start = 0.0
+        self.last_report = time.perf_counter()
+        # Per-frame samples (ring buffers): start lateness, work time and CPU time, in seconds
+        self.lateness = np.zeros(window)
+        self.work = np.zeros(window)
+        self.cpu = np.zeros(window)
+        self.frames = 0
+        self.window_frames = 0
+        self.missed = 0
+        self.inferences = 0
+
+    def begin_frame(self):
+        """
+        Start a render tick
+
+        Returns:
+            True if this frame is also an inference tick (decode the latest camera frame and run the pose model)
+        """
+        now = time.perf_counter()
+        if self.deadline is None:
+            self.deadline = now
+            self.next_inference = now
+        i = self.frames % len(self.lateness)
+        self.lateness[i] = now - self.deadline
+        self.frame_start = now
+        self.cpu_start = time.process_time()
+        inference = now >= self.next_inference
+        if inference:
+            self.inferences += 1
+            self.next_inference += self.inference_period
+            if now - self.next_inference > self.inference_period:
+                self.next_inference = now + self.inference_period
+        return inference
+
+    def end_frame(self):
+        """Finish the frame: record its cost, sleep until the next deadline and print the periodic report"""
+        now = time.perf_counter()
+        i = self.frames % len(self.work)
+        self.work[i] = now - self.frame_start
+        self.cpu[i] = time.process_time() - self.cpu_start
+        self.frames += 1
+        self.window_frames += 1
+
+        self.deadline += self.period
+        if now - self.deadline > self.period:
+            self.missed += 1
+            self.deadline = now
+        elif now > self.deadline:
+            # Late but within a period: start right away and keep the grid
+            self.missed += 1
+        else:
+            self._sleep_until(self.deadline)
+
+        if self.report_every and now - self.last_report >= self.report_every:
+            print(self.report(now - self.last_report))
+            self.last_report = now
+            self.window_frames = 0
+            self.missed = 0
+            self.inferences = 0
+
+    def _sleep_until(self, deadline):
+        remaining = deadline - time.perf_counter()
+        if remaining > self.spin:
+            time.sleep(remaining - self.spin)
+        while time.perf_counter() < deadline:
+            pass
+
+    def stats(self):
+        n = min(self.frames, len(self.work), max(self.window_frames, 1))
+        idx = (self.frames - 1 - np.arange(n)) % len(self.work)
+        lateness = self.lateness[idx] * 1000
+        return {
+            'frames': self.window_frames,
+            'missed': self.missed,
+            'inferences': self.inferences,
+            'jitter_p95_ms': float(np.percentile(np.abs(lateness), 95)) if n else 0.0,
+            'jitter_max_ms': float(np.abs(lateness).max()) if n else 0.0,
+            'work_ms': float(self.work[idx].mean() * 1000) if n else 0.0,
+            'cpu_ms': float(self.cpu[idx].mean() * 1000) if n else 0.0,
+        }
+
+    def report(self, elapsed):
+        s = self.stats()
+        return (f"[FPS] {s['frames'] / elapsed:.1f} fps (target {1 / self.period:.0f})  "
+                f"inference {s['inferences'] / elapsed:.1f}/s  jitter p95 {s['jitter_p95_ms']:.2f} ms "
+                f"max {s['jitter_max_ms']:.2f} ms  missed {s['missed']}/{s['frames']}  "
+                f"work {s['work_ms']:.1f} ms  cpu {s['cpu_ms']:.1f} ms/frame")
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def simulate(seconds=3.0, fps=30.0, inference_fps=15.0, inference_ms=(8.0, 26.0), render_ms=3.0, seed=0):
+    """
+    Synthetic UI loop: the old unpaced loop (inference + render + a 5 ms waitKey every frame) against
+    the scheduler. Inference time is uniform in inference_ms; jitter is the deviation of frame intervals
+    from their mean.
+
+    Returns:
+        {'unpaced': stats, 'paced': stats}
+    """
+    rng = np.random.default_rng(seed)
+    results = {}
+    for name in ('unpaced', 'paced'):
+        scheduler = FrameScheduler(fps, inference_fps, report_every=0) if name == 'paced' else None
+        starts = []
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            starts.append(time.perf_counter())
+            infer = scheduler.begin_frame() if scheduler else True
+            if infer:
+                _busy(rng.uniform(*inference_ms) / 1000)
+            _busy(render_ms / 1000)
+            if scheduler:
+                scheduler.end_frame()
+            else:
+                time.sleep(0.005)
+        elapsed = time.perf_counter() - start
+        intervals = np.diff(starts) * 1000
+        results[name] = {
+            'fps': len(starts) / elapsed,
+            'cpu_ms': (time.process_time() - cpu_start) * 1000 / len(starts),
+            'jitter_p95_ms': float(np.percentile(np.abs(intervals - intervals.mean()), 95)),
+            'missed': scheduler.missed if scheduler else 0,
+        }
+    return results
+
+
+def main():
+    results = simulate()
+    print(f"{'loop':<9} {'fps':>6} {'cpu ms/frame':>13} {'cpu ms/s':>9} {'jitter p95 ms':>14} {'missed':>7}")
+    for name, s in results.items():
+        print(f"{name:<9} {s['fps']:>6.1f} {s['cpu_ms']:>13.2f} {s['cpu_ms'] * s['fps']:>9.0f} "
+              f"{s['jitter_p95_ms']:>14.2f} {s['missed']:>7}")
+
+
+if __name__ == "__main__":
+    main()
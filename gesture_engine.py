@@ -1,50 +1,149 @@
+import os
+import sys
 import cv2
 import mediapipe as mp
+import numpy as np
 import time
 
+# The gesture rule table, its compiler, the state machine and the model download are shared with the arcade
+# scene in Projeto-DI-main/poseCenario. Only these light modules are imported from there, never its tracker
+RULES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Projeto-DI-main', 'poseCenario')
+if RULES_DIR not in sys.path:
+    sys.path.append(RULES_DIR)
+from gesture_rules import load_rules
+from gesture_state import GestureStateMachine, END
+from model_files import ensure_model
+from controller import ControllerElection
+
+RULES_FILE = os.environ.get('GESTURE_RULES', os.path.join(RULES_DIR, 'gesture_rules.json'))
+# Who drives the menu when several people are in front of the kiosk: proximity, centre or claim
+CONTROLLER_POLICY = os.environ.get('GESTURE_CONTROLLER', 'proximity')
+MAX_PEOPLE = 5
+# The lite landmarker for up to MAX_PEOPLE people costs less per frame than Holistic's pose + face + hands
+MODEL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pose_landmarker_lite.task')
+MODEL_URL = 'https://storage.googleapis.com/mediapipe-models/pose_landmarker/pose_landmarker_lite/float16/1/pose_landmarker_lite.task'
+# Tracks unseen for longer than this are dropped (and lose control of the menu)
+TRACK_TTL = 1.0
+# Largest centroid jump (normalised image units) still matched to the same person
+TRACK_MAX_JUMP = 0.25
+
+
 class GestureEngine:
-    def __init__(self):
-        self.holistic = mp.solutions.holistic.Holistic(
-            min_detection_confidence=0.5,
+    def __init__(self, max_people=MAX_PEOPLE, policy=CONTROLLER_POLICY, cooldown=0.4, handoff_cooldown=0.5):
+        from mediapipe.tasks.python import BaseOptions
+        from mediapipe.tasks.python.vision import PoseLandmarker, PoseLandmarkerOptions, RunningMode
+
+        ensure_model(MODEL_FILE, MODEL_URL)
+        self.detector = PoseLandmarker.create_from_options(PoseLandmarkerOptions(
+            base_options=BaseOptions(model_asset_path=MODEL_FILE),
+            running_mode=RunningMode.VIDEO,
+            num_poses=max_people,
+            min_pose_detection_confidence=0.5,
+            min_pose_presence_confidence=0.5,
             min_tracking_confidence=0.5,
-            model_complexity=1
-        )
-        self.shoulder_threshold = 0.05
-        self.last_trigger_time = 0
-        self.cooldown_duration = 0.8
-        
+        ))
+        self.last_timestamp = -1
+        # NEXT/PREV/SELECT come from the 'menu' rule set (thresholds are tuned in the JSON file)
+        self.rules = load_rules(RULES_FILE, 'menu')
+        # Hysteresis, dwell and repeat rate per tracked person; a track keeps its slot while it lives
+        self.states = GestureStateMachine.from_rules(self.rules, max_people)
+        self.tracks = {}
+        self.next_track_id = 0
+        self.free_slots = list(range(max_people))
+        self.election = ControllerElection(policy)
+        self.controller = None
+        # Per-track cooldown after each accepted gesture, and after a hand-off so the claiming hand
+        # doesn't trigger anything: the new controller is armed once both hands are down
+        self.cooldown = cooldown
+        self.handoff_cooldown = handoff_cooldown
+        self.cooldown_until = np.zeros(max_people)
+        self.armed = np.zeros(max_people, dtype=bool)
+
     def process_frame(self, image):
         image.flags.writeable = False
-        results = self.holistic.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
         image.flags.writeable = True
-        return results
+        # VIDEO mode needs strictly increasing timestamps in milliseconds
+        timestamp = max(int(time.perf_counter() * 1000), self.last_timestamp + 1)
+        self.last_timestamp = timestamp
+        return self.detector.detect_for_video(mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb), timestamp)
+
+    def _update_tracks(self, results, t):
+        """Match detected people to tracks by nearest centroid. Returns (track ids, slots, poses) of visible tracks."""
+        people = results.pose_landmarks if results is not None and results.pose_landmarks else []
+        poses = np.array([[(lm.x, lm.y, lm.z, lm.visibility) for lm in person] for person in people],
+                         dtype=np.float64).reshape(len(people), 33, 4)
+        centroids = poses[:, :, :2].mean(axis=1) if len(poses) else np.zeros((0, 2))
+
+        track_ids = list(self.tracks)
+        if track_ids and len(poses):
+            last = np.array([self.tracks[t_id]['centroid'] for t_id in track_ids])
+            dist = np.hypot(*(last[:, None] - centroids[None]).transpose(2, 0, 1))
+        else:
+            dist = np.zeros((len(track_ids), len(poses)))
+        owner = [None] * len(poses)
+        # Greedy closest-first assignment (at most MAX_PEOPLE x MAX_PEOPLE)
+        while dist.size and dist.min() < TRACK_MAX_JUMP:
+            i, j = np.unravel_index(np.argmin(dist), dist.shape)
+            owner[j] = track_ids[i]
+            dist[i, :] = np.inf
+            dist[:, j] = np.inf
+
+        for j, t_id in enumerate(owner):
+            if t_id is None:
+                if not self.free_slots:
+                    continue
+                t_id = self.next_track_id
+                self.next_track_id += 1
+                slot = self.free_slots.pop()
+                self.states.reset(slot, t)
+                self.cooldown_until[slot] = 0.0
+                self.armed[slot] = True
+                self.tracks[t_id] = {'slot': slot}
+                owner[j] = t_id
+            self.tracks[t_id]['centroid'] = centroids[j]
+            self.tracks[t_id]['last_seen'] = t
+
+        for t_id in [k for k, v in self.tracks.items() if t - v['last_seen'] > TRACK_TTL]:
+            self.free_slots.append(self.tracks.pop(t_id)['slot'])
+
+        visible = [j for j, t_id in enumerate(owner) if t_id is not None]
+        ids = [owner[j] for j in visible]
+        return ids, [self.tracks[t_id]['slot'] for t_id in ids], poses[visible]
 
     def detect_gesture(self, results):
-        current_time = time.time()
-        if (current_time - self.last_trigger_time) < self.cooldown_duration:
-            return None
-        if not results.pose_landmarks:
-            return None
+        t = time.perf_counter()
+        ids, slots, poses = self._update_tracks(results, t)
 
-        landmarks = results.pose_landmarks.landmark
-        l_shoulder, r_shoulder = landmarks[11], landmarks[12]
-        l_wrist, r_wrist = landmarks[15], landmarks[16]
+        # Everyone is classified in one vectorised pass; only the controller's events reach the menu
+        evidence = np.zeros((len(ids), len(self.rules.names)))
+        if len(ids):
+            codes, _ = self.rules.classify(poses)
+            hit = codes >= 0
+            evidence[np.flatnonzero(hit), codes[hit]] = 1.0
+        events = self.states.update(slots, ids, evidence, t)
 
-        if l_wrist.visibility < 0.5 or r_wrist.visibility < 0.5:
+        busy = self.controller in self.tracks and bool(self.states.active[self.tracks[self.controller]['slot']].any())
+        # Live tracks (seen within TRACK_TTL) keep control through a missed detection
+        controller, changed = self.election.update(ids, poses, evidence.any(axis=1), busy, t, live_ids=self.tracks)
+        self.controller = controller
+        if controller is None:
             return None
+        slot = self.tracks[controller]['slot']
+        if changed:
+            print(f"Controller: track {controller} ({self.election.handoffs} hand-offs)")
+            self.states.reset(slot, t)
+            self.armed[slot] = False
+            self.cooldown_until[slot] = t + self.handoff_cooldown
+        if controller in ids and not evidence[ids.index(controller)].any():
+            self.armed[slot] = True
 
-        l_up = l_wrist.y < (l_shoulder.y - self.shoulder_threshold)
-        r_up = r_wrist.y < (r_shoulder.y - self.shoulder_threshold)
-
-        if l_up and r_up:
-            event = 'SELECT'
-        elif l_up:
-            event = 'NEXT'
-        elif r_up:
-            event = 'PREV'
-        else:
+        # Only START/REPEAT trigger; a held pose repeats at the configured rate, whatever the frame rate
+        events = [e for e in events if e.track_id == controller and e.kind != END]
+        if not events or not self.armed[slot] or t < self.cooldown_until[slot]:
             return None
+        self.cooldown_until[slot] = t + self.cooldown
+        event = events[0].gesture
 
-        self.last_trigger_time = current_time
         print(f"Gesture: {event}")
-        return event
\ No newline at end of file
+        return event
@@ -1,15 +1,22 @@
+import os
 import cv2
 from gesture_engine import GestureEngine
 from renderer import Renderer
-from game_logic import Map1Game, Map2Game, Map3Game
 from background_loader import BackgroundLoader
+from map_catalogue import MapCatalogue
 from lobby import Lobby
+from frame_scheduler import FrameScheduler
+
+# The UI animates at UI_FPS; the camera and pose model run on their own INFERENCE_FPS clock
+UI_FPS = float(os.environ.get('UI_FPS', 30))
+INFERENCE_FPS = float(os.environ.get('INFERENCE_FPS', 30))
 
 
 class InterfaceManager:
-    def __init__(self):
-        self.maps = ["Paris", "Berlim", "Amesterdão"]
-        self.locked_maps = [1, 2]
+    def __init__(self, catalogue):
+        self.catalogue = catalogue
+        self.maps = catalogue.names
+        self.locked_maps = catalogue.locked
         self.current_index = 0
         self.state = "SELECTOR"
     
@@ -32,14 +39,19 @@ def main():
     cap = cv2.VideoCapture(0)
     cap.set(3, 1280)
     cap.set(4, 720)
+    # Keep at most one frame queued in the driver (not every backend honours it, hence the grab below)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
 
-    bg_loader = BackgroundLoader((1280, 720))
+    catalogue = MapCatalogue.load()
+    bg_loader = BackgroundLoader((1280, 720), catalogue=catalogue)
     engine = GestureEngine()
-    interface = InterfaceManager()
+    interface = InterfaceManager(catalogue)
     renderer = Renderer()
     renderer.set_backgrounds(bg_loader, interface.maps)
     game = None
     window_created = False
+    scheduler = FrameScheduler(UI_FPS, INFERENCE_FPS)
+    results = None
     
     cv2.namedWindow('Interactive Project Python', cv2.WINDOW_NORMAL)
     cv2.setWindowProperty('Interactive Project Python', cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
@@ -47,19 +59,24 @@ def main():
     print("Sistema iniciado. Comandos: Braço direito (NEXT), Braço esquerdo (PREV), Ambos (SELECT)")
 
     while cap.isOpened():
+        event = None
+        inference = scheduler.begin_frame()
+        # Grab every tick so frames don't queue up when INFERENCE_FPS is below the camera rate (latency
+        # would grow); only inference ticks pay for decoding the frame and running the pose model
         if not cap.grab():
             break
-        success, frame = cap.retrieve()
-        if not success:
-            continue
-
-        frame = cv2.flip(frame, 1)
-        results = engine.process_frame(frame)
-        event = engine.detect_gesture(results)
+        if inference:
+            success, frame = cap.retrieve()
+            if success:
+                frame = cv2.flip(frame, 1)
+                results = engine.process_frame(frame)
+                event = engine.detect_gesture(results)
         display_frame = bg_loader.get_background(interface.current_index)
 
         prev_state = interface.state
         interface.update(event)
+        # Neighbours of the current map are decoded in the background, so NEXT/PREV never wait for disk
+        bg_loader.prefetch(interface.current_index)
         
         if prev_state == "SELECTOR" and interface.state == "MULTIPLAYER_LOBBY":
             renderer.init_multiplayer_lobby()
@@ -67,7 +84,7 @@ def main():
         if interface.state == "MULTIPLAYER_LOBBY":
             renderer.update_multiplayer_lobby(event)
             if renderer.multiplayer_lobby_finished():
-                game = [Map1Game(), Map2Game(), Map3Game()][interface.current_index]
+                game = interface.catalogue.create_game(interface.current_index)
                 interface.state = "LOBBY"
                 renderer.init_lobby(interface.current_index)
         
@@ -85,11 +102,14 @@ def main():
                                       state_data['current_index'], is_locked=state_data['is_locked'], 
                                       mp_lobby_data=mp_data)
 
-        cv2.imshow('Interactive Project Python', final_frame)
+        # An unchanged frame is already on screen; waitKey below keeps the window responsive
+        if renderer.frame_changed or not window_created:
+            cv2.imshow('Interactive Project Python', final_frame)
         if not window_created:
             window_created = True
 
-        key = cv2.waitKey(5) & 0xFF
+        # waitKey only pumps window events; the scheduler sleeps for the rest of the frame budget
+        key = cv2.waitKey(1) & 0xFF
         if key == 27:
             break
         elif key == 8:
@@ -102,6 +122,7 @@ def main():
                 interface.state = "SELECTOR"
         elif key == 13 and interface.state == "MULTIPLAYER_LOBBY":
             renderer.set_player_ready()
+        scheduler.end_frame()
 
     cap.release()
     cv2.destroyAllWindows()
@@ -0,0 +1,68 @@
+import json
+from pathlib import Path
+
+import game_logic
+
+MANIFEST_FILE = Path("img") / "maps.json"
+# Used when there is no manifest: the original three venues
+DEFAULT_MAPS = [
+    {"name": "Paris", "background": "map1/background.png", "game": "Map1Game"},
+    {"name": "Berlim", "background": "map2/background.png", "locked": True, "game": "Map2Game"},
+    {"name": "Amesterdão", "background": "map3/background.png", "locked": True, "game": "Map3Game"},
+]
+
+
+class MapCatalogue:
+    """
+    Venues shown in the carousel, in order
+
+    Manifest format (img/maps.json):
+        {"maps": [{"name": "Paris", "background": "map1/background.png", "locked": false, "game": "Map1Game"}, ...]}
+    background is relative to the manifest's directory and must stay inside it (no absolute paths or ..);
+    locked (default false) and game (default GameLogic) are optional
+    """
+
+    def __init__(self, entries, base_path=Path("img")):
+        if not entries:
+            raise ValueError("Map catalogue is empty")
+        for i, entry in enumerate(entries):
+            if not entry.get("name") or not entry.get("background"):
+                raise ValueError(f"Map {i} needs a name and a background: {entry}")
+            background = Path(entry["background"])
+            if background.is_absolute() or background.drive or ".." in background.parts:
+                raise ValueError(f"Background of map {entry['name']} must be inside the manifest's directory: "
+                                 f"{entry['background']}")
+            game = entry.get("game", "GameLogic")
+            if not isinstance(getattr(game_logic, game, None), type):
+                raise ValueError(f"Unknown game class for map {entry['name']}: {game}")
+        self.entries = entries
+        self.base_path = Path(base_path)
+
+    @classmethod
+    def load(cls, path=MANIFEST_FILE):
+        path = Path(path)
+        if not path.exists():
+            print(f"[WARN] No map manifest at {path}, using the default maps")
+            return cls(DEFAULT_MAPS, path.parent)
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        catalogue = cls(data.get("maps", []), path.parent)
+        print(f"[OK] Map catalogue loaded: {path} ({len(catalogue)} maps)")
+        return catalogue
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def names(self):
+        return [entry["name"] for entry in self.entries]
+
+    @property
+    def locked(self):
+        return [i for i, entry in enumerate(self.entries) if entry.get("locked", False)]
+
+    def background_path(self, index):
+        return self.base_path / self.entries[index]["background"]
+
+    def create_game(self, index):
+        return getattr(game_logic, self.entries[index].get("game", "GameLogic"))()
@@ -1,17 +1,21 @@
 import cv2
-import mediapipe as mp
 import time
 import numpy as np
 import os
+from collections import OrderedDict
 from font_manager import FontManager
+from compositing import FrameBuffers, tint, crossfade, blend, clip_rect
+
+# Margin around an animated arrow that covers its tip and the thickest pulse
+ARROW_PAD = 20
+# Largest rise in traced memory a steady-state frame may cause (see check_allocations)
+ALLOCATION_LIMIT = 64 * 1024
 
 class Renderer:
     def __init__(self):
         self.font = cv2.FONT_HERSHEY_DUPLEX
         font_path = os.path.join(os.path.dirname(__file__), 'fonts', 'Roboto-VariableFont_wdth,wght.ttf')
         self.font_path = font_path if os.path.exists(font_path) else None
-        self.mp_drawing = mp.solutions.drawing_utils
-        self.mp_pose = mp.solutions.pose
         self.transition_progress = 0.0
         self.transition_animating = False
         self.transition_start_time = 0
@@ -23,24 +27,43 @@ class Renderer:
         self.arrow_animation_active = False
         self.arrow_animation_start_time = 0
         self.arrow_animation_duration = 0.6
-        self.bg_images = {}
         self.loading_time = time.time()
         self.multiplayer_lobby_state = "WAITING"
         self.multiplayer_players_ready = 0
         self.multiplayer_countdown_start = 0
         self.lobby_state = "WAITING"
         self.lobby_countdown_start = 0
+        # Static parts of each screen, composited once per (state, map, title, locked, resolution)
+        self.layers = OrderedDict()
+        self.max_layers = 8
+        # Output frame and scratch buffers, reused every frame
+        self.buffers = FrameBuffers()
+        self.layers_version = 0
+        # Idle frames: when nothing visible changed, the last frame is returned as is
+        self.skip_idle = True
+        self.last_signature = None
+        self.last_frame = None
+        self.frame_changed = True
+        self.rendered_frames = 0
+        self.reused_frames = 0
+    
+    @property
+    def mp_drawing(self):
+        # MediaPipe is only imported if someone draws landmarks through these handles
+        import mediapipe as mp
+        return mp.solutions.drawing_utils
+    
+    @property
+    def mp_pose(self):
+        import mediapipe as mp
+        return mp.solutions.pose
     
     def _put_text_ttf(self, img, text, position, font_size, color, outline=False):
         if self.font_path:
             try:
-                x, y = position
-                if outline:
-                    for dx in [-1, 0, 1]:
-                        for dy in [-1, 0, 1]:
-                            if dx != 0 or dy != 0:
-                                FontManager.put_text(img, text, (x + dx, y + dy), font_size, (0, 0, 0), self.font_path)
-                FontManager.put_text(img, text, position, font_size, color, self.font_path)
+                # Text and its 1 px black outline are one cached sprite
+                FontManager.put_text(img, text, position, font_size, color, self.font_path,
+                                     outline_width=1 if outline else 0)
             except:
                 cv2.putText(img, text, position, self.font, 1.0, color, 2)
         else:
@@ -48,9 +71,40 @@ class Renderer:
         return img
     
     def set_backgrounds(self, bg_loader, maps):
+        # Backgrounds are fetched from the loader when a layer is built, so only resident maps are touched
         self.bg_loader = bg_loader
-        for i in range(len(maps)):
-            self.bg_images[i] = bg_loader.get_background(i)
+        self.invalidate_layers()
+    
+    def invalidate_layers(self, map_index=None):
+        """Drop cached static layers: all of them, or only those built from one map's background"""
+        self.layers_version += 1
+        if map_index is None:
+            self.layers.clear()
+        else:
+            for key in [k for k in self.layers if k[1] == map_index]:
+                del self.layers[key]
+    
+    def _layer(self, key, build):
+        """Cached static layer for key, built on first use (least recently used layers are dropped)"""
+        layer = self.layers.get(key)
+        if layer is None:
+            layer = build()
+            self.layers[key] = layer
+            while len(self.layers) > self.max_layers:
+                self.layers.popitem(last=False)
+        else:
+            self.layers.move_to_end(key)
+        return layer
+    
+    def _static(self, key, img, map_index, build):
+        """Frame starting from the static layer, in the reused output buffer; build(base, dst) composites into dst.
+        Without a bg_loader the passed image is used and nothing is cached"""
+        if not hasattr(self, 'bg_loader'):
+            return build(img, self.buffers.get('frame', img.shape))
+        layer = self._layer(key, lambda: build(self.bg_loader.get_background(map_index), None))
+        out = self.buffers.get('frame', layer.shape)
+        np.copyto(out, layer)
+        return out
     
     def update_transition(self, current_index, force_reset=False, num_maps=4):
         current_time = time.time()
@@ -82,8 +136,57 @@ class Renderer:
                 self.arrow_animation_progress = 0.0
     
     def render(self, image, state, maps, current_index, lobby_state=None, lobby_countdown=None, mp_lobby_data=None, pose_landmarks=None, is_locked=False, lobby_obj=None):
+        """
+        Render one frame. The returned image belongs to the Renderer and is reused by later calls;
+        frame_changed tells whether it differs from the previous call's (if not, there is nothing to present)
+        """
         h, w = image.shape[:2]
+        if hasattr(self, 'bg_loader'):
+            # Backgrounds rebuilt by the loader's worker: drop the layers built from the old images
+            for index in self.bg_loader.poll_updates():
+                self.invalidate_layers(index)
+        if state == "SELECTOR":
+            self.update_transition(current_index, num_maps=len(maps))
+        
+        signature = self._frame_signature(state, maps, current_index, w, h, is_locked, mp_lobby_data, pose_landmarks)
+        if self.skip_idle and signature is not None and signature == self.last_signature:
+            self.frame_changed = False
+            self.reused_frames += 1
+            return self.last_frame
+        self.frame_changed = True
+        self.rendered_frames += 1
+        frame = self._render_state(image, state, maps, current_index, w, h, mp_lobby_data, pose_landmarks, is_locked)
+        self.last_signature = signature
+        self.last_frame = frame
+        return frame
+    
+    def _frame_signature(self, state, maps, current_index, w, h, is_locked, mp_lobby_data, pose_landmarks):
+        """
+        Everything that affects the rendered frame, or None when the frame can't be reused
+        (the skeleton or the input image itself is drawn)
+        """
+        if pose_landmarks or not hasattr(self, 'bg_loader'):
+            return None
+        arrows = (self.arrow_animation_active, self.arrow_direction,
+                  self.arrow_animation_progress if self.arrow_animation_active else None)
+        common = (state, current_index, maps[current_index], w, h, self.layers_version)
+        if state == "SELECTOR":
+            transition = (self.previous_index, self.transition_progress) if self.transition_animating else None
+            return common + (is_locked, transition, arrows)
+        elif state == "MULTIPLAYER_LOBBY":
+            confirmed = mp_lobby_data.get('confirmed_players', 0) if mp_lobby_data else 0
+            countdown = mp_lobby_data.get('countdown') if mp_lobby_data else None
+            return common + (self._loading_dot_count(), confirmed,
+                             int(countdown) if countdown is not None else None, arrows)
+        elif state == "LOBBY":
+            return common + (self._lobby_countdown(),)
+        return None
+    
+    def _render_state(self, image, state, maps, current_index, w, h, mp_lobby_data, pose_landmarks, is_locked):
         if pose_landmarks:
+            # Backgrounds are shared read-only arrays: copy on write
+            if not image.flags.writeable:
+                image = image.copy()
             self._draw_skeleton(image, pose_landmarks, w, h)
         
         if state == "SELECTOR":
@@ -106,81 +209,106 @@ class Renderer:
             if landmark.visibility > 0.3:
                 cv2.circle(image, (int(landmark.x * w), int(landmark.y * h)), 4, (255, 0, 0), -1)
     
-    def _draw_instructions(self, image, w, h):
-        if self.arrow_animation_active and self.arrow_direction == -1:
-            pulse = 1.0 + 0.3 * (1 - abs(self.arrow_animation_progress - 0.5) * 2)
-            thickness, alpha = max(1, int(3 * pulse)), max(100, int(255 * (1 - self.arrow_animation_progress)))
-            overlay = image.copy()
-            cv2.arrowedLine(overlay, (70, 35), (30, 35), (255, 255, 0), thickness, tipLength=0.4)
-            cv2.addWeighted(overlay, alpha / 255.0, image, 1 - alpha / 255.0, 0, image)
-        else:
-            cv2.arrowedLine(image, (70, 35), (30, 35), (255, 255, 0), 3, tipLength=0.4)
-        
+    def _draw_arrow(self, image, start, end, animated):
+        if not animated:
+            cv2.arrowedLine(image, start, end, (255, 255, 0), 3, tipLength=0.4)
+            return
+        pulse = 1.0 + 0.3 * (1 - abs(self.arrow_animation_progress - 0.5) * 2)
+        thickness, alpha = max(1, int(3 * pulse)), max(100, int(255 * (1 - self.arrow_animation_progress)))
+        # Only the arrow's neighbourhood is blended, through a reused scratch buffer
+        h, w = image.shape[:2]
+        x0, y0, x1, y1 = clip_rect(min(start[0], end[0]) - ARROW_PAD, start[1] - ARROW_PAD,
+                                   max(start[0], end[0]) + ARROW_PAD, start[1] + ARROW_PAD, w, h)
+        roi = image[y0:y1, x0:x1]
+        overlay = self.buffers.get('arrow', roi.shape)
+        np.copyto(overlay, roi)
+        cv2.arrowedLine(overlay, (start[0] - x0, start[1] - y0), (end[0] - x0, end[1] - y0),
+                        (255, 255, 0), thickness, tipLength=0.4)
+        blend(roi, overlay, alpha / 255.0)
+    
+    def _draw_arrows(self, image, w):
+        self._draw_arrow(image, (70, 35), (30, 35), self.arrow_animation_active and self.arrow_direction == -1)
+        self._draw_arrow(image, (w - 70, 35), (w - 30, 35), self.arrow_animation_active and self.arrow_direction == 1)
+    
+    def _draw_instruction_texts(self, image, w):
         self._put_text_ttf(image, "Suba o braco esquerdo", (100, 30), 20, (15, 15, 15))
         self._put_text_ttf(image, "para recuar", (100, 48), 20, (15, 15, 15))
-        
-        if self.arrow_animation_active and self.arrow_direction == 1:
-            pulse = 1.0 + 0.3 * (1 - abs(self.arrow_animation_progress - 0.5) * 2)
-            thickness, alpha = max(1, int(3 * pulse)), max(100, int(255 * (1 - self.arrow_animation_progress)))
-            overlay = image.copy()
-            cv2.arrowedLine(overlay, (w - 70, 35), (w - 30, 35), (255, 255, 0), thickness, tipLength=0.4)
-            cv2.addWeighted(overlay, alpha / 255.0, image, 1 - alpha / 255.0, 0, image)
-        else:
-            cv2.arrowedLine(image, (w - 70, 35), (w - 30, 35), (255, 255, 0), 3, tipLength=0.4)
-        
         right_x = w - 90 - int(len("Suba o braco direito") * 8) - 20
         self._put_text_ttf(image, "Suba o braco direito", (right_x, 30), 20, (15, 15, 15))
         right_x2 = w - 90 - int(len("para avancar") * 8) - 20
         self._put_text_ttf(image, "para avancar", (right_x2, 48), 20, (15, 15, 15))
     
-    def _draw_loading_dots(self, img, x, y, font_size=24):
+    def _draw_instructions(self, image, w, h):
+        self._draw_arrows(image, w)
+        self._draw_instruction_texts(image, w)
+    
+    def _loading_dot_count(self):
         elapsed = (time.time() - self.loading_time) * 2.5
-        dots = (int(elapsed) % 3) + 1
-        text = "." * dots
+        return (int(elapsed) % 3) + 1
+    
+    def _lobby_countdown(self):
+        elapsed = time.time() - self.lobby_countdown_start
+        return max(0, 3 - int(elapsed))
+    
+    def _draw_loading_dots(self, img, x, y, font_size=24):
+        text = "." * self._loading_dot_count()
         self._put_text_ttf(img, text, (x, y), font_size, (255, 255, 0))
     
-    def _render_selector(self, img, maps, current_index, w, h, is_locked=False):
-        self.update_transition(current_index, num_maps=len(maps))
-        current_bg = self.bg_loader.get_background(current_index) if hasattr(self, 'bg_loader') else None
-        previous_bg = self.bg_loader.get_background(self.previous_index) if hasattr(self, 'bg_loader') else None
-        
-        if self.transition_animating and previous_bg is not None and current_bg is not None:
-            alpha = self.transition_progress
-            carousel_img = cv2.addWeighted(previous_bg, 1 - alpha, current_bg, alpha, 0)
-        elif current_bg is not None:
-            carousel_img = current_bg.copy()
-        else:
-            carousel_img = img.copy()
-        
-        img = carousel_img
-        overlay = img.copy()
-        overlay[:] = (20, 20, 25)
-        img = cv2.addWeighted(overlay, 0.2, img, 0.8, 0)
-        
+    def _dimmed_background(self, index, w, h):
+        """Map background under the selector's dark tint, cached per map"""
+        def build():
+            base = self.bg_loader.get_background(index)
+            return tint(base, (20, 20, 25), 0.2, dst=np.empty_like(base))
+        return self._layer(('BACKGROUND', index, None, False, (w, h)), build)
+    
+    def _selector_decorations(self, img, maps, current_index, w, h, is_locked):
+        """Title, border, lock and instruction texts: everything on the selector except the arrows"""
         self._put_text_ttf(img, maps[current_index], (100, h - 170), 100, (255, 255, 255), outline=True)
         cv2.rectangle(img, (0, 0), (w, h), (255, 255, 0), 3)
         
         if is_locked:
-            lock_overlay = np.zeros((h, w, 3), dtype=np.uint8)
-            lock_overlay[:] = (0, 0, 0)
-            img = cv2.addWeighted(img, 0.3, lock_overlay, 0.7, 0)
+            tint(img, (0, 0, 0), 0.7)
             locked_text = "BLOQUEADO"
             text_width = len(locked_text) * int(56 * 0.65)
             self._put_text_ttf(img, locked_text, ((w - text_width) // 2, h // 2), 56, (0, 0, 255), outline=True)
         
-        self._draw_instructions(img, w, h)
+        self._draw_instruction_texts(img, w)
         return img
     
+    def _render_selector(self, img, maps, current_index, w, h, is_locked=False):
+        out = self.buffers.get('frame', img.shape)
+        if not hasattr(self, 'bg_loader'):
+            tint(img, (20, 20, 25), 0.2, dst=out)
+            self._selector_decorations(out, maps, current_index, w, h, is_locked)
+        elif self.transition_animating:
+            # Crossfade of the already dimmed backgrounds (the tint is linear, so the result is the same)
+            crossfade(self._dimmed_background(self.previous_index, w, h),
+                      self._dimmed_background(current_index, w, h), self.transition_progress, out)
+            self._selector_decorations(out, maps, current_index, w, h, is_locked)
+        else:
+            key = ('SELECTOR', current_index, maps[current_index], is_locked, (w, h))
+            np.copyto(out, self._layer(key, lambda: self._selector_decorations(
+                self._dimmed_background(current_index, w, h).copy(), maps, current_index, w, h, is_locked)))
+        
+        self._draw_arrows(out, w)
+        return out
+    
+    def _tinted(self, img, dst):
+        """Lobby tint; dst=None builds a new image (for cached layers)"""
+        return tint(img, (180, 100, 50), 0.4, dst=np.empty_like(img) if dst is None else dst)
+    
     def _render_multiplayer_lobby(self, img, maps, current_index, w, h, mp_lobby_data):
-        overlay = img.copy()
-        overlay[:] = (180, 100, 50)
-        img = cv2.addWeighted(overlay, 0.4, img, 0.6, 0)
+        def build(base, dst):
+            layer = self._tinted(base, dst)
+            self._put_text_ttf(layer, maps[current_index], (20, h - 30), 30, (255, 255, 255))
+            self._put_text_ttf(layer, "Press Backspace to Cancel", (50, h-50), 20, (150, 150, 150))
+            self._draw_instruction_texts(layer, w)
+            return layer
+        img = self._static(('MULTIPLAYER_LOBBY', current_index, maps[current_index], False, (w, h)),
+                           img, current_index, build)
         
-        elapsed = (time.time() - self.loading_time) * 2.5
-        dots = (int(elapsed) % 3) + 1
-        waiting_text = "AGUARDANDO JOGADORES" + "." * dots
+        waiting_text = "AGUARDANDO JOGADORES" + "." * self._loading_dot_count()
         self._put_text_ttf(img, waiting_text, (w//2 - 265, 100), 40, (255, 255, 0), outline=True)
-        self._put_text_ttf(img, maps[current_index], (20, h - 30), 30, (255, 255, 255))
         
         confirmed = mp_lobby_data.get('confirmed_players', 0) if mp_lobby_data else 0
         required = 5
@@ -203,29 +331,24 @@ class Renderer:
             color = (255, 255, 0)
             self._put_text_ttf(img, status, ((w - int(len(status) * 12)) // 2, h // 2 + 150), 24, color)
         
-        self._put_text_ttf(img, "Press Backspace to Cancel", (50, h-50), 20, (150, 150, 150))
-        self._draw_instructions(img, w, h)
+        self._draw_arrows(img, w)
         return img
     
     def _render_lobby(self, img, maps, current_index, w, h):
-        overlay = img.copy()
-        overlay[:] = (180, 100, 50)
-        img = cv2.addWeighted(overlay, 0.4, img, 0.6, 0)
-        
-        elapsed = time.time() - self.lobby_countdown_start
-        countdown = max(0, 3 - int(elapsed))
-        
-        self._put_text_ttf(img, f"JOGO COMEÇA EM: {countdown}", (w//2 - 300, 100), 48, (255, 255, 0), outline=True)
-        self._put_text_ttf(img, maps[current_index], (20, h - 30), 30, (255, 255, 255))
-        
         slot_y, slot_size, slot_spacing = 280, 50, 100
         start_x = (w - (5 * slot_spacing - slot_spacing // 2)) // 2
         
-        for i in range(5):
-            slot_x = start_x + i * slot_spacing
-            cv2.circle(img, (slot_x, slot_y), slot_size // 2, (255, 255, 0), -1)
-            self._put_text_ttf(img, str(i+1), (slot_x - 10, slot_y + 15), 32, (0, 0, 0))
+        def build(base, dst):
+            layer = self._tinted(base, dst)
+            self._put_text_ttf(layer, maps[current_index], (20, h - 30), 30, (255, 255, 255))
+            for i in range(5):
+                slot_x = start_x + i * slot_spacing
+                cv2.circle(layer, (slot_x, slot_y), slot_size // 2, (255, 255, 0), -1)
+                self._put_text_ttf(layer, str(i+1), (slot_x - 10, slot_y + 15), 32, (0, 0, 0))
+            return layer
+        img = self._static(('LOBBY', current_index, maps[current_index], False, (w, h)), img, current_index, build)
         
+        self._put_text_ttf(img, f"JOGO COMEÇA EM: {self._lobby_countdown()}", (w//2 - 300, 100), 48, (255, 255, 0), outline=True)
         return img
     
     def render_game(self, image, game_data):
@@ -269,3 +392,159 @@ class Renderer:
     
     def lobby_finished(self):
         return self.lobby_state == "FINISHED"
+
+
+class _FixedBackgrounds:
+    """Stand-in for BackgroundLoader in the benchmark: every map shares the same read-only frame"""
+
+    def __init__(self, frame):
+        self.frame = frame.copy()
+        self.frame.flags.writeable = False
+
+    def get_background(self, map_index, writable=False):
+        return self.frame.copy() if writable else self.frame
+
+    def poll_updates(self):
+        return ()
+
+
+def benchmark_states(frames=60, size=(1280, 720)):
+    """Time Renderer.render in each state: old full-frame text, cached sprites, and sprites plus static layers."""
+    w, h = size
+    frame = np.random.default_rng(0).integers(0, 255, (h, w, 3), dtype=np.uint8)
+    maps = ["Paris", "Berlim", "Amesterdão"]
+    states = [
+        ("SELECTOR", dict(is_locked=False)),
+        ("SELECTOR (locked)", dict(is_locked=True)),
+        ("MULTIPLAYER_LOBBY", dict(mp_lobby_data={'confirmed_players': 5, 'countdown': 2.0})),
+        ("LOBBY", dict()),
+    ]
+    modes = [(False, 0), (True, 0), (True, 8)]
+    print(f"{'state':<20} {'full-frame ms':>14} {'sprites ms':>11} {'layers ms':>10}")
+    for name, kwargs in states:
+        state = name.split()[0]
+        timings = []
+        for use_sprites, max_layers in modes:
+            FontManager.use_sprites = use_sprites
+            FontManager.sprite_cache.clear()
+            renderer = Renderer()
+            renderer.set_backgrounds(_FixedBackgrounds(frame), maps)
+            renderer.max_layers = max_layers
+            renderer.skip_idle = False
+            renderer.render(frame.copy(), state, maps, 0, **kwargs)
+            start = time.perf_counter()
+            for _ in range(frames):
+                renderer.render(frame.copy(), state, maps, 0, **kwargs)
+            timings.append((time.perf_counter() - start) / frames * 1000)
+        print(f"{name:<20} {timings[0]:>14.2f} {timings[1]:>11.2f} {timings[2]:>10.2f}")
+    FontManager.use_sprites = True
+    stats = FontManager.sprite_cache.stats()
+    print(f"sprite cache: {stats['entries']} entries, {stats['bytes'] / 1024:.0f} KiB, "
+          f"{stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions")
+
+
+# States checked for steady-state allocations: (name, render kwargs, restart a transition every frame)
+ALLOCATION_STATES = [
+    ("SELECTOR", dict(is_locked=False), False),
+    ("SELECTOR (locked)", dict(is_locked=True), False),
+    ("SELECTOR (transition)", dict(is_locked=False), True),
+    ("MULTIPLAYER_LOBBY", dict(mp_lobby_data={'confirmed_players': 5, 'countdown': 2.0}), False),
+    ("LOBBY", dict(), False),
+]
+
+
+def measure_allocations(name, kwargs, transition, frames=30, size=(1280, 720)):
+    """
+    Largest rise in traced memory over one Renderer.render call, after a warm-up
+
+    Returns:
+        (worst bytes, number of frame buffers)
+    """
+    import tracemalloc
+    w, h = size
+    frame = np.random.default_rng(0).integers(0, 255, (h, w, 3), dtype=np.uint8)
+    maps = ["Paris", "Berlim", "Amesterdão"]
+    state = name.split()[0]
+    renderer = Renderer()
+    renderer.set_backgrounds(_FixedBackgrounds(frame), maps)
+    renderer.skip_idle = False
+    
+    def render(i):
+        # A transition restarts every frame by alternating between two maps
+        renderer.render(frame, state, maps, i % 2 if transition else 0, **kwargs)
+    
+    # Warm-up: static layers, every loading-dots variant in the sprite cache, the output buffers
+    for i in range(6):
+        renderer.loading_time -= 0.4
+        render(i)
+    tracemalloc.start()
+    worst = 0
+    try:
+        for i in range(frames):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            render(i)
+            worst = max(worst, tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    return worst, len(renderer.buffers.buffers)
+
+
+def check_allocations(frames=30, size=(1280, 720), limit=ALLOCATION_LIMIT):
+    """
+    Check that steady-state frames allocate no large buffers: after a warm-up, no Renderer.render call
+    may raise traced memory by `limit` bytes or more (transitions and arrow animations included)
+
+    Returns:
+        True when every state passes
+    """
+    passed = True
+    print(f"{'state':<22} {'worst frame KiB':>16} {'buffers':>8}")
+    for name, kwargs, transition in ALLOCATION_STATES:
+        worst, buffers = measure_allocations(name, kwargs, transition, frames, size)
+        ok = worst < limit
+        passed = passed and ok
+        print(f"{name:<22} {worst / 1024:>16.1f} {buffers:>8}  {'ok' if ok else 'FAIL'}")
+    return passed
+
+
+def measure_idle(seconds=3.0, fps=30.0, size=(1280, 720)):
+    """
+    Selector at a steady frame rate with one NEXT gesture a third of the way in: CPU per frame with and
+    without idle-frame reuse, and the delay between the gesture and the first changed frame
+    """
+    w, h = size
+    frame = np.random.default_rng(0).integers(0, 255, (h, w, 3), dtype=np.uint8)
+    maps = ["Paris", "Berlim", "Amesterdão"]
+    frames = int(seconds * fps)
+    gesture_frame = frames // 3
+    print(f"{'idle reuse':<11} {'cpu ms/frame':>13} {'rendered':>9} {'reused':>7} {'gesture latency':>16}")
+    for skip_idle in (False, True):
+        renderer = Renderer()
+        renderer.set_backgrounds(_FixedBackgrounds(frame), maps)
+        renderer.skip_idle = skip_idle
+        renderer.render(frame, "SELECTOR", maps, 0)
+        renderer.rendered_frames = renderer.reused_frames = 0
+        cpu = 0.0
+        latency = None
+        for f in range(frames):
+            frame_start = time.perf_counter()
+            index = 1 if f >= gesture_frame else 0
+            cpu_start = time.process_time()
+            renderer.render(frame, "SELECTOR", maps, index)
+            cpu += time.process_time() - cpu_start
+            if f == gesture_frame:
+                latency = "same frame" if renderer.frame_changed else "late"
+            time.sleep(max(0.0, 1 / fps - (time.perf_counter() - frame_start)))
+        print(f"{'on' if skip_idle else 'off':<11} {cpu / frames * 1000:>13.2f} {renderer.rendered_frames:>9} "
+              f"{renderer.reused_frames:>7} {latency:>16}")
+
+
+if __name__ == "__main__":
+    import sys
+    if sys.argv[1:] == ['alloc']:
+        sys.exit(0 if check_allocations() else 1)
+    if sys.argv[1:] == ['idle']:
+        measure_idle()
+    else:
+        benchmark_states()
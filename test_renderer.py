@@ -0,0 +1,17 @@
+import unittest
+
+from renderer import ALLOCATION_LIMIT, ALLOCATION_STATES, measure_allocations
+
+
+class AllocationTest(unittest.TestCase):
+    """Steady-state frames reuse their buffers: no render call allocates ALLOCATION_LIMIT bytes or more."""
+
+    def test_states(self):
+        for name, kwargs, transition in ALLOCATION_STATES:
+            with self.subTest(state=name):
+                worst, _ = measure_allocations(name, kwargs, transition)
+                self.assertLess(worst, ALLOCATION_LIMIT, f"{name}: {worst / 1024:.1f} KiB in one frame")
+
+
+if __name__ == '__main__':
+    unittest.main()